@@ -0,0 +1,254 @@
+"""
+Comandos administrativos da API
+
+Uso:
+    python -m app.cli migrate
+    python -m app.cli migrate --check
+    python -m app.cli index-report --strict
+    python -m app.cli backup all_decks.ndjson.gz
+    python -m app.cli restore all_decks.ndjson.gz --resume-from 1500
+    python -m app.cli recompute-stats
+    python -m app.cli revalidate
+    python -m app.cli rebuild-cooccurrence --workers 4
+    python -m app.cli rebuild-signatures
+    python -m app.cli bench-serialization --items 100
+    STORAGE_BACKEND=memory python -m app.cli bench-similarity --sizes 1000 10000 100000
+    python -m app.cli import-text deck.txt --name "Red Deck Wins" --format modern
+    python -m app.cli jobs
+    python -m app.cli run-job card-refresh
+"""
+import argparse
+import asyncio
+import json
+
+from app.core import migrations, scheduler
+from app.core.config import STORAGE_BACKEND
+from app.crud import deck as crud_deck
+from app.services import (
+    card_cooccurrence,
+    deck_backup,
+    deck_validation,
+    decklist_import,
+    index_report,
+    serialization_benchmark,
+    similarity_benchmark
+)
+from app.services.jobs import register_jobs
+from app.utils import iter_ndjson_lines
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+async def _read_file_chunks(path: str):
+    with open(path, "rb") as file:
+        while True:
+            chunk = file.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+async def migrate(args: argparse.Namespace) -> None:
+    if args.check:
+        version = await migrations.get_schema_version()
+        print(f"Esquema do banco na versão {version} (código: {migrations.SCHEMA_VERSION})")
+        if version < migrations.SCHEMA_VERSION:
+            raise SystemExit(1)
+        return
+    
+    try:
+        applied = await migrations.run_migrations(target=args.target)
+    except migrations.MigrationLockError as e:
+        raise SystemExit(str(e))
+    
+    for record in applied:
+        print(f"Migração {record['_id']} aplicada em {record['duration_ms']} ms: {record['description']}")
+    print(f"Esquema do banco na versão {await migrations.get_schema_version()}")
+
+
+async def index_report_command(args: argparse.Namespace) -> None:
+    if STORAGE_BACKEND == "memory":
+        raise SystemExit("Relatório de índices indisponível no backend em memória (sem explain)")
+    
+    report = await index_report.build_index_report()
+    
+    for query in report["queries"]:
+        problems = ", ".join(query["problems"]) or "ok"
+        print(f"{query['name']}: {problems} [{query['plan']}]")
+    for collection in report["collections"]:
+        for key in ("missing", "unused", "unmanaged"):
+            if collection[key]:
+                print(f"{collection['collection']} {key}: {', '.join(collection[key])}")
+    print(f"{report['problems']} problema(s) encontrado(s)")
+    
+    if args.strict and not report["ok"]:
+        raise SystemExit(1)
+
+
+async def backup(args: argparse.Namespace) -> None:
+    compress = args.output.endswith(".gz")
+    
+    with open(args.output, "wb") as file:
+        async for chunk in deck_backup.iter_backup(format="ndjson", compress=compress):
+            file.write(chunk)
+    
+    print(f"Backup salvo em {args.output}")
+
+
+async def restore(args: argparse.Namespace) -> None:
+    lines = iter_ndjson_lines(deck_backup.gunzip_chunks(_read_file_chunks(args.input)))
+    
+    async for event in deck_backup.import_decks_ndjson(lines, resume_from=args.resume_from):
+        print(json.dumps(event, ensure_ascii=False))
+
+
+async def recompute_stats(args: argparse.Namespace) -> None:
+    updated = await crud_deck.recompute_all_deck_stats()
+    print(f"Estatísticas recalculadas para {updated} decks")
+
+
+async def revalidate(args: argparse.Namespace) -> None:
+    summary = await deck_validation.revalidate_all_decks()
+    print(json.dumps(summary))
+
+
+async def rebuild_cooccurrence(args: argparse.Namespace) -> None:
+    summary = await card_cooccurrence.rebuild_cooccurrence(workers=args.workers)
+    print(json.dumps(summary))
+
+
+async def rebuild_signatures(args: argparse.Namespace) -> None:
+    updated = await crud_deck.recompute_all_deck_signatures()
+    print(f"Assinaturas MinHash recalculadas para {updated} decks")
+
+
+async def bench_serialization(args: argparse.Namespace) -> None:
+    for result in serialization_benchmark.run_benchmark(items=args.items, iterations=args.iterations):
+        print(json.dumps(result, ensure_ascii=False))
+
+
+async def bench_similarity(args: argparse.Namespace) -> None:
+    try:
+        async for result in similarity_benchmark.run_benchmark(
+            sizes=tuple(args.sizes),
+            queries=args.queries,
+            repeats=args.repeats,
+            max_swaps=args.max_swaps
+        ):
+            print(json.dumps(result, ensure_ascii=False), flush=True)
+    except similarity_benchmark.SimilarityBenchmarkError as e:
+        raise SystemExit(str(e))
+
+
+async def import_text(args: argparse.Namespace) -> None:
+    with open(args.input, encoding="utf-8") as file:
+        text = file.read()
+    
+    try:
+        result = await decklist_import.import_decklist(
+            name=args.name,
+            format=args.format,
+            text=text,
+            include_sideboard=args.include_sideboard
+        )
+    except decklist_import.DecklistImportError as e:
+        raise SystemExit(str(e))
+    
+    deck = result.pop("deck")
+    print(f"Deck '{deck['name']}' criado com ID {deck['_id']}")
+    print(json.dumps(result))
+
+
+async def jobs(args: argparse.Namespace) -> None:
+    status = await scheduler.get_jobs_status()
+    print(f"Líder do agendador: {status['leader'] or '-'}")
+    for job in status["jobs"]:
+        print(json.dumps(job, default=str, ensure_ascii=False))
+
+
+async def run_job(args: argparse.Namespace) -> None:
+    try:
+        job = scheduler.get_job(args.name)
+    except scheduler.JobNotFoundError:
+        raise SystemExit(f"Tarefa '{args.name}' não encontrada (disponíveis: {', '.join(scheduler.JOBS) or '-'})")
+    
+    for _ in range(args.times):
+        status = await scheduler.run_job(job)
+        print(json.dumps({key: status.get(key) for key in ("last_status", "last_error", "last_result")}, default=str, ensure_ascii=False))
+        if status.get("last_status") != "ok":
+            raise SystemExit(1)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Comandos administrativos da MTG Deck Storage API")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    migrate_parser = subparsers.add_parser("migrate", help="Aplica as migrações pendentes do banco (índices e esquema)")
+    migrate_parser.add_argument("--check", action="store_true", help="Apenas mostra a versão do esquema (sai com erro se houver migrações pendentes)")
+    migrate_parser.add_argument("--target", type=int, default=None, help="Versão máxima a aplicar (padrão: a última)")
+    migrate_parser.set_defaults(handler=migrate)
+    
+    index_report_parser = subparsers.add_parser("index-report", help="Explain das consultas canônicas: COLLSCAN, ordenação em memória e índices não usados")
+    index_report_parser.add_argument("--strict", action="store_true", help="Sai com erro se algum problema for encontrado (para o CI)")
+    index_report_parser.set_defaults(handler=index_report_command)
+    
+    backup_parser = subparsers.add_parser("backup", help="Exporta todos os decks em NDJSON (gzip se o arquivo terminar em .gz)")
+    backup_parser.add_argument("output", help="Arquivo de destino")
+    backup_parser.set_defaults(handler=backup)
+    
+    restore_parser = subparsers.add_parser("restore", help="Restaura decks de um backup NDJSON (gzip ou não)")
+    restore_parser.add_argument("input", help="Arquivo de backup")
+    restore_parser.add_argument("--resume-from", type=int, default=0, help="Número de decks já processados a pular")
+    restore_parser.set_defaults(handler=restore)
+    
+    stats_parser = subparsers.add_parser("recompute-stats", help="Recalcula as estatísticas materializadas de todos os decks")
+    stats_parser.set_defaults(handler=recompute_stats)
+    
+    revalidate_parser = subparsers.add_parser("revalidate", help="Revalida todos os decks contra as regras de formato")
+    revalidate_parser.set_defaults(handler=revalidate)
+    
+    cooccurrence_parser = subparsers.add_parser("rebuild-cooccurrence", help="Recalcula o índice de cartas usadas juntas")
+    cooccurrence_parser.add_argument("--workers", type=int, default=None, help="Processos para a contagem dos pares (padrão: número de CPUs)")
+    cooccurrence_parser.set_defaults(handler=rebuild_cooccurrence)
+    
+    signatures_parser = subparsers.add_parser("rebuild-signatures", help="Recalcula as assinaturas MinHash/LSH de todos os decks")
+    signatures_parser.set_defaults(handler=rebuild_signatures)
+    
+    bench_parser = subparsers.add_parser("bench-serialization", help="Compara o tempo de CPU da serialização padrão e orjson das listagens")
+    bench_parser.add_argument("--items", type=int, default=100, help="Documentos por página")
+    bench_parser.add_argument("--iterations", type=int, default=200, help="Páginas serializadas em cada caminho")
+    bench_parser.set_defaults(handler=bench_serialization)
+    
+    similarity_parser = subparsers.add_parser("bench-similarity", help="Mede candidatos LSH e latência de /similar e /admin/duplicates com decks sintéticos (backend em memória)")
+    similarity_parser.add_argument("--sizes", type=int, nargs="+", default=list(similarity_benchmark.DEFAULT_SIZES), help="Tamanhos da coleção de decks")
+    similarity_parser.add_argument("--queries", type=int, default=50, help="Decks consultados em /similar por tamanho")
+    similarity_parser.add_argument("--repeats", type=int, default=3, help="Execuções de /admin/duplicates por tamanho (mediana)")
+    similarity_parser.add_argument("--max-swaps", type=int, default=6, help="Máximo de cartas trocadas entre decks do mesmo arquétipo")
+    similarity_parser.set_defaults(handler=bench_similarity)
+    
+    import_text_parser = subparsers.add_parser("import-text", help="Cria um deck a partir de uma lista em texto (MTGO/Arena)")
+    import_text_parser.add_argument("input", help="Arquivo com a lista do deck")
+    import_text_parser.add_argument("--name", required=True, help="Nome do deck")
+    import_text_parser.add_argument("--format", required=True, help="Formato do deck")
+    import_text_parser.add_argument("--include-sideboard", action="store_true", help="Incluir sideboard/maybeboard no deck")
+    import_text_parser.set_defaults(handler=import_text)
+    
+    jobs_parser = subparsers.add_parser("jobs", help="Estado das tarefas periódicas do agendador")
+    jobs_parser.set_defaults(handler=jobs)
+    
+    run_job_parser = subparsers.add_parser("run-job", help="Executa uma tarefa periódica agora, fora do agendador (ex: card-refresh)")
+    run_job_parser.add_argument("name", help="Nome da tarefa")
+    run_job_parser.add_argument("--times", type=int, default=1, help="Número de execuções seguidas (ex: lotes do card-refresh)")
+    run_job_parser.set_defaults(handler=run_job)
+    
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    register_jobs()
+    asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,11 +9,82 @@ MONGO_DB = os.getenv("MONGO_DB", "mtg_database")
 MONGO_HOST = os.getenv("MONGO_HOST", "mongo")
 MONGO_PORT = os.getenv("MONGO_PORT", "27017")
 
+# Cliente do MongoDB: pool de conexões, timeouts (ms, 0 = sem limite) e compressão do protocolo
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "0"))
+MONGO_TIMEOUT_MS = int(os.getenv("MONGO_TIMEOUT_MS", "0"))
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zstd,zlib")
+
+# Leituras pesadas (backup, exportação em zip, catálogo completo): cliente com pool próprio
+MONGO_HEAVY_READ_PREFERENCE = os.getenv("MONGO_HEAVY_READ_PREFERENCE", "secondaryPreferred")
+MONGO_HEAVY_MAX_POOL_SIZE = int(os.getenv("MONGO_HEAVY_MAX_POOL_SIZE", "10"))
+MONGO_HEAVY_TIMEOUT_MS = int(os.getenv("MONGO_HEAVY_TIMEOUT_MS", "0"))
+
+# Armazenamento: "mongo" (padrão) ou "memory" (em processo, sem MongoDB; ver app/core/memory_db.py)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo").lower()
+
+# Cache das buscas de cartas: "memory" (LRU por processo), "mongo" (compartilhado entre workers) ou "off"
+QUERY_CACHE_BACKEND = os.getenv("QUERY_CACHE_BACKEND", "memory").lower()
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL_SECONDS = int(os.getenv("QUERY_CACHE_TTL_SECONDS", "600"))
+
+# Agendador de tarefas em segundo plano (um worker líder executa as tarefas; ver app/core/scheduler.py).
+# Desligado por padrão (desenvolvimento, testes e CLI); o docker-compose.prod.yml liga
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "false").lower() in ("1", "true", "yes")
+SCHEDULER_TICK_SECONDS = float(os.getenv("SCHEDULER_TICK_SECONDS", "5"))
+SCHEDULER_LEASE_SECONDS = int(os.getenv("SCHEDULER_LEASE_SECONDS", "60"))
+
+# Atualização contínua do catálogo pela Scryfall: um lote por execução; cada passada completa
+# pelo catálogo começa no máximo a cada CARD_REFRESH_MAX_AGE_HOURS. Desligada por padrão, como o agendador:
+# sem ela, nenhum processo de desenvolvimento ou teste chama a Scryfall por conta própria
+CARD_REFRESH_ENABLED = os.getenv("CARD_REFRESH_ENABLED", "false").lower() in ("1", "true", "yes")
+CARD_REFRESH_INTERVAL_SECONDS = int(os.getenv("CARD_REFRESH_INTERVAL_SECONDS", "30"))
+CARD_REFRESH_BATCH_SIZE = int(os.getenv("CARD_REFRESH_BATCH_SIZE", "75"))
+CARD_REFRESH_MAX_AGE_HOURS = float(os.getenv("CARD_REFRESH_MAX_AGE_HOURS", "24"))
+
 API_PORT = int(os.getenv("API_PORT", "8000"))
 
+# Processos usados nas simulações de decks (0 = número de CPUs)
+SIMULATION_WORKERS = int(os.getenv("SIMULATION_WORKERS", "0"))
+
+# Listagens codificadas direto com orjson, sem revalidar pelo response_model
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "false").lower() in ("1", "true", "yes")
+
+# Métricas em /metrics (rotas, comandos do MongoDB e chamadas à Scryfall)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Com vários workers: diretório compartilhado onde cada worker grava suas métricas a cada
+# METRICS_FLUSH_SECONDS, somadas em /metrics (o gunicorn.conf.py define um por padrão)
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR") or None
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+# Diagnóstico: requisições e consultas acima destes tempos são registradas (0 = desligado)
+SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", "1000"))
+SLOW_QUERY_MS = int(os.getenv("SLOW_QUERY_MS", "100"))
+
+# Token das operações administrativas de diagnóstico (?profile=1, /decks/admin/slow-log); sem ele ficam desligadas
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
 SCRYFALL_API_URL = "https://api.scryfall.com"
 
-if not MONGO_USER or not MONGO_PASS:
+if STORAGE_BACKEND not in ("mongo", "memory"):
+    raise ValueError(f"STORAGE_BACKEND inválido: '{STORAGE_BACKEND}' (use 'mongo' ou 'memory')")
+
+if QUERY_CACHE_BACKEND not in ("memory", "mongo", "off"):
+    raise ValueError(f"QUERY_CACHE_BACKEND inválido: '{QUERY_CACHE_BACKEND}' (use 'memory', 'mongo' ou 'off')")
+
+READ_PREFERENCES = ("primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest")
+if MONGO_HEAVY_READ_PREFERENCE not in READ_PREFERENCES:
+    raise ValueError(
+        f"MONGO_HEAVY_READ_PREFERENCE inválido: '{MONGO_HEAVY_READ_PREFERENCE}' "
+        f"(use um de: {', '.join(READ_PREFERENCES)})"
+    )
+
+if STORAGE_BACKEND == "mongo" and (not MONGO_USER or not MONGO_PASS):
     raise ValueError(
         "Variáveis de ambiente MONGO_USER e MONGO_PASS devem estar definidas no arquivo .env"
     )
@@ -1,6 +1,74 @@
 import motor.motor_asyncio
-from app.core.config import MONGO_USER, MONGO_PASS, MONGO_DB, MONGO_HOST, MONGO_PORT
+from app.core.config import (
+    MONGO_USER,
+    MONGO_PASS,
+    MONGO_DB,
+    MONGO_HOST,
+    MONGO_PORT,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_CONNECT_TIMEOUT_MS,
+    MONGO_SOCKET_TIMEOUT_MS,
+    MONGO_TIMEOUT_MS,
+    MONGO_COMPRESSORS,
+    MONGO_HEAVY_READ_PREFERENCE,
+    MONGO_HEAVY_MAX_POOL_SIZE,
+    MONGO_HEAVY_TIMEOUT_MS,
+    STORAGE_BACKEND
+)
+from app.core.health import PoolStats
+from app.core.memory_db import MemoryDatabase
+from app.core.metrics import mongo_event_listeners
+from app.core.profiling import profiling_event_listeners
 
-MONGO_URL = f"mongodb://{MONGO_USER}:{MONGO_PASS}@{MONGO_HOST}:{MONGO_PORT}/"
-client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL)
-db = client[MONGO_DB]
+
+def _client(name: str, max_pool_size: int, min_pool_size: int, timeout_ms: int, read_preference: str):
+    stats = PoolStats(name, max_pool_size, min_pool_size, MONGO_WAIT_QUEUE_TIMEOUT_MS, read_preference)
+    pool_stats[name] = stats
+
+    options = {
+        "appname": f"mtg-deck-storage-{name}",
+        "minPoolSize": min_pool_size,
+        "maxPoolSize": max_pool_size,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "readPreference": read_preference,
+        "event_listeners": mongo_event_listeners(name) + profiling_event_listeners() + [stats],
+    }
+    # 0 = sem limite (padrão do driver)
+    if MONGO_WAIT_QUEUE_TIMEOUT_MS:
+        options["waitQueueTimeoutMS"] = MONGO_WAIT_QUEUE_TIMEOUT_MS
+    if MONGO_SOCKET_TIMEOUT_MS:
+        options["socketTimeoutMS"] = MONGO_SOCKET_TIMEOUT_MS
+    if timeout_ms:
+        # Timeout por operação do lado do cliente (inclui espera no pool e seleção de servidor)
+        options["timeoutMS"] = timeout_ms
+    if MONGO_COMPRESSORS:
+        # Compressores sem o módulo instalado são ignorados pelo driver
+        options["compressors"] = MONGO_COMPRESSORS
+
+    return motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL, **options)
+
+
+pool_stats = {}
+
+if STORAGE_BACKEND == "memory":
+    # Mesma interface das coleções do Motor, sem processo de banco
+    client = None
+    db = MemoryDatabase(MONGO_DB)
+    heavy_db = db
+else:
+    MONGO_URL = f"mongodb://{MONGO_USER}:{MONGO_PASS}@{MONGO_HOST}:{MONGO_PORT}/"
+    client = _client("main", MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_TIMEOUT_MS, "primary")
+    db = client[MONGO_DB]
+
+    # Backup, exportações e catálogo completo: pool separado (não disputam conexões
+    # com as rotas interativas) e leitura em secundários conforme a read preference
+    heavy_client = _client("heavy", MONGO_HEAVY_MAX_POOL_SIZE, 0, MONGO_HEAVY_TIMEOUT_MS, MONGO_HEAVY_READ_PREFERENCE)
+    heavy_db = heavy_client[MONGO_DB]
+
+
+def get_db(heavy_read: bool = False):
+    return heavy_db if heavy_read else db
@@ -0,0 +1,131 @@
+"""
+Saúde da API (GET /health): ping do banco e ocupação dos pools de conexões
+
+PoolStats é registrado em cada cliente do MongoDB ("main" para as rotas,
+"heavy" para backup e exportações) e conta, somando todos os servidores,
+conexões abertas, em uso e operações esperando uma conexão. Um pool está
+saturado quando todas as conexões estão em uso e há operações na fila;
+nesse caso, ou se houver falhas recentes ao obter conexão, o status é
+"degraded".
+"""
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from pymongo import monitoring
+
+# Janela das falhas ao obter conexão consideradas recentes
+RECENT_FAILURES_SECONDS = 60
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    def __init__(self, name: str, max_pool_size: int, min_pool_size: int = 0,
+                 wait_queue_timeout_ms: int = 0, read_preference: str = "primary"):
+        self.name = name
+        self.max_pool_size = max_pool_size
+        self.min_pool_size = min_pool_size
+        self.wait_queue_timeout_ms = wait_queue_timeout_ms
+        self.read_preference = read_preference
+        self.servers = 0
+        self.open = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.peak_in_use = 0
+        self.checkout_failures = 0
+        self.last_failure: Optional[float] = None
+        self.last_failure_reason: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _add(self, field: str, amount: int) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+            if field == "in_use":
+                self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        self._add("servers", 1)
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        self._add("servers", -1)
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        self._add("open", 1)
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        self._add("open", -1)
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        self._add("waiting", 1)
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        with self._lock:
+            self.waiting -= 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        with self._lock:
+            self.waiting -= 1
+            self.checkout_failures += 1
+            self.last_failure = time.monotonic()
+            self.last_failure_reason = str(event.reason)
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        self._add("in_use", -1)
+
+    # Demais eventos do pool não alteram as contagens
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        pass
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            in_use, waiting = self.in_use, self.waiting
+            recent_failure = (
+                self.last_failure is not None
+                and time.monotonic() - self.last_failure < RECENT_FAILURES_SECONDS
+            )
+            # O limite do pool vale por servidor
+            capacity = self.max_pool_size * max(self.servers, 1) if self.max_pool_size else 0
+            return {
+                "read_preference": self.read_preference,
+                "min_pool_size": self.min_pool_size,
+                "max_pool_size": self.max_pool_size,
+                "wait_queue_timeout_ms": self.wait_queue_timeout_ms,
+                "servers": self.servers,
+                "open": self.open,
+                "in_use": in_use,
+                "peak_in_use": self.peak_in_use,
+                "waiting": max(waiting, 0),
+                "utilization": round(in_use / capacity, 3) if capacity else 0.0,
+                "saturated": bool(capacity) and in_use >= capacity and waiting > 0,
+                "checkout_failures": self.checkout_failures,
+                "recent_checkout_failure": self.last_failure_reason if recent_failure else None,
+            }
+
+
+async def check_health() -> Dict[str, Any]:
+    from app.core.config import STORAGE_BACKEND
+    from app.core.db import db, pool_stats
+
+    start = time.perf_counter()
+    try:
+        await db.command("ping")
+        database = {"ok": True, "ping_ms": round((time.perf_counter() - start) * 1000, 2)}
+    except Exception as e:
+        database = {"ok": False, "error": str(e)}
+
+    pools = {name: stats.snapshot() for name, stats in pool_stats.items()}
+    if not database["ok"]:
+        status = "error"
+    elif any(pool["saturated"] or pool["recent_checkout_failure"] for pool in pools.values()):
+        status = "degraded"
+    else:
+        status = "ok"
+
+    return {"status": status, "storage": STORAGE_BACKEND, "database": database, "pools": pools}
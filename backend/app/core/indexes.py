@@ -1,14 +1,107 @@
+"""
+Especificação declarativa dos índices do banco
+
+INDEXES lista, por coleção, os índices que as consultas de app/crud usam
+(o campo `serves` diz quais). Os compostos seguem a regra igualdade,
+ordenação, intervalo: campos comparados por igualdade primeiro, depois o
+campo da ordenação e por fim os filtros por intervalo ou regex.
+
+create_indexes() aplica a especificação de forma idempotente (índices já
+existentes com as mesmas chaves e opções são ignorados pelo MongoDB). As
+migrações não usam INDEXES: cada uma congela a lista dos índices que cria
+(app.core.migrations). Ao mudar INDEXES, acrescente uma migração com os
+índices novos e os removidos; tests/test_migrations.py confere que as
+migrações, juntas, chegam exatamente a esta especificação. As consultas
+canônicas que validam a especificação ficam em app.services.index_report.
+"""
+from typing import Dict, Any, List, NamedTuple, Tuple
+
+from pymongo import IndexModel
+
 from app.core.db import db
 
 
-async def create_indexes():
-    await db.cards.create_index("scryfall_id", unique=True)
-    await db.cards.create_index("name")
-    await db.cards.create_index("colors")
-    await db.cards.create_index("rarity")
-    await db.cards.create_index("type_line")
-    
-    await db.decks.create_index("name", unique=True)
-    await db.decks.create_index("format")
-    await db.decks.create_index("created_at")
+class IndexSpec(NamedTuple):
+    keys: List[Tuple[str, int]]
+    serves: str
+    unique: bool = False
+
+    @property
+    def name(self) -> str:
+        # Mesmo nome que o MongoDB gera por padrão (ex: format_1_created_at_-1)
+        return "_".join(f"{field}_{direction}" for field, direction in self.keys)
+
+    def model(self) -> IndexModel:
+        return IndexModel(self.keys, name=self.name, unique=self.unique)
+
+
+INDEXES: Dict[str, List[IndexSpec]] = {
+    "cards": [
+        IndexSpec([("scryfall_id", 1)], "busca por scryfall_id (cartas do deck, upsert)", unique=True),
+        IndexSpec([("oracle_id", 1)], "impressões de uma carta e nomes por oracle_id"),
+        IndexSpec([("name", 1)], "busca por nome exato e regex no nome"),
+        IndexSpec([("type_line", 1)], "busca só por tipo (regex)"),
+        # Busca com cores: $all usa a primeira cor como igualdade no índice multikey
+        IndexSpec([("colors", 1), ("rarity", 1), ("type_line", 1)], "busca por cores + raridade + tipo"),
+        IndexSpec([("rarity", 1), ("type_line", 1)], "busca por raridade + tipo"),
+    ],
+    "decks": [
+        IndexSpec([("name", 1)], "busca por nome", unique=True),
+        IndexSpec([("created_at", 1)], "listagem sem filtro ordenada por created_at"),
+        IndexSpec([("format", 1), ("created_at", -1)], "listagem e contagem por formato; ranking de cartas do formato"),
+        IndexSpec([("legality.valid", 1), ("created_at", -1)], "listagem por validade ordenada por created_at"),
+        # Multikey: decks que usam uma carta, paginados por _id
+        IndexSpec([("cards.scryfall_id", 1), ("_id", 1)], "decks que usam uma carta e uso por formato"),
+        IndexSpec([("lsh_bands", 1)], "candidatos a deck similar (bandas LSH)"),
+    ],
+    "deck_history": [
+        IndexSpec([("deck_id", 1), ("version", 1)], "versões de um deck", unique=True),
+        # Igualdade (deck_id), ordenação (version) e filtro por data no próprio índice
+        IndexSpec([("deck_id", 1), ("version", 1), ("at", 1)], "estado do deck em uma data"),
+    ],
+    "card_pairs": [
+        IndexSpec([("format", 1), ("card", 1), ("other", 1)], "upsert dos pares", unique=True),
+        IndexSpec([("format", 1), ("card", 1), ("count", -1)], "parceiros de uma carta ordenados por contagem"),
+    ],
+    "card_counts": [
+        IndexSpec([("format", 1), ("card", 1)], "decks por carta no formato", unique=True),
+    ],
+    "card_price_history": [
+        # Um bucket por carta por mês: consultas por intervalo leem um documento por mês
+        IndexSpec([("scryfall_id", 1), ("month", 1)], "histórico de preços de uma carta por intervalo de meses", unique=True),
+    ],
+}
+
+
+async def apply_collection_indexes(collection, specs: List[IndexSpec]) -> None:
+    await collection.create_indexes([spec.model() for spec in specs])
+
+
+async def apply_indexes(indexes: Dict[str, List[IndexSpec]]) -> None:
+    for collection, specs in indexes.items():
+        await apply_collection_indexes(db[collection], specs)
+
+
+async def create_indexes() -> None:
+    await apply_indexes(INDEXES)
+
+
+async def drop_indexes(names_by_collection: Dict[str, List[str]]) -> List[str]:
+    """Remove os índices listados que existirem; retorna os removidos."""
+    dropped = []
+    for collection, names in names_by_collection.items():
+        existing = await db[collection].index_information()
+        for name in names:
+            if name in existing:
+                await db[collection].drop_index(name)
+                dropped.append(f"{collection}.{name}")
+    return dropped
+
 
+async def list_indexes() -> Dict[str, Dict[str, Any]]:
+    """Índices existentes por coleção da especificação (nome -> chaves)."""
+    result = {}
+    for collection in INDEXES:
+        information = await db[collection].index_information()
+        result[collection] = {name: info["key"] for name, info in information.items()}
+    return result
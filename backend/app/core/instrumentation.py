@@ -0,0 +1,118 @@
+"""
+Instrumentação das rotas da API
+
+InstrumentedRoute envolve cada requisição pelo template da rota (ex:
+/decks/{deck_id}), do início até o envio do último byte da resposta,
+inclusive em respostas em streaming:
+
+- métricas de latência, status e requisições em andamento (app.core.metrics)
+- spans db/upstream/serialize e log de requisições lentas (app.core.profiling)
+- `?profile=1` com o header X-Admin-Token igual a ADMIN_TOKEN: a resposta
+  da rota é descartada e o relatório do profiler por amostragem é retornado
+"""
+import asyncio
+import hmac
+import time
+from functools import wraps
+from typing import Any, Callable, Optional
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, request_response
+from starlette.datastructures import Headers, QueryParams
+from starlette.types import Message, Receive, Scope, Send
+
+from app.core import metrics, profiling
+from app.core.config import ADMIN_TOKEN, METRICS_ENABLED, SLOW_REQUEST_MS
+
+ENABLED = METRICS_ENABLED or bool(SLOW_REQUEST_MS) or bool(ADMIN_TOKEN)
+
+
+def _timed_endpoint(call: Callable[..., Any]) -> Callable[..., Any]:
+    # Marca o fim da função da rota: daí em diante o tempo é de serialização
+    if asyncio.iscoroutinefunction(call):
+        @wraps(call)
+        async def endpoint(*args, **kwargs):
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                profiling.mark_endpoint_done()
+    else:
+        @wraps(call)
+        def endpoint(*args, **kwargs):
+            try:
+                return call(*args, **kwargs)
+            finally:
+                profiling.mark_endpoint_done()
+    return endpoint
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """X-Admin-Token confere com ADMIN_TOKEN (sempre False sem ADMIN_TOKEN definido)."""
+    if not ADMIN_TOKEN:
+        return False
+    return hmac.compare_digest((token or "").encode(), ADMIN_TOKEN.encode())
+
+
+def _profile_requested(scope: Scope) -> bool:
+    if not ADMIN_TOKEN or QueryParams(scope.get("query_string", b"")).get("profile") != "1":
+        return False
+    return is_admin_token(Headers(scope=scope).get("x-admin-token"))
+
+
+class InstrumentedRoute(APIRoute):
+    """APIRoute medida (ver docstring do módulo). Desligada, não altera a rota."""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        super().__init__(path, endpoint, **kwargs)
+        if ENABLED:
+            self.dependant.call = _timed_endpoint(self.dependant.call)
+            self.app = request_response(self.get_route_handler())
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not ENABLED:
+            await super().handle(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = "500"
+        profiler = profiling.SamplingProfiler() if _profile_requested(scope) else None
+        response_bytes = 0
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            if profiler is None:
+                await send(message)
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+
+        spans = profiling.RequestSpans()
+        token = profiling.current_spans.set(spans)
+        if METRICS_ENABLED:
+            metrics.http_requests_in_flight.inc(method, self.path)
+        if profiler is not None:
+            profiler.start()
+        try:
+            await super().handle(scope, receive, send_with_status)
+        finally:
+            end = time.perf_counter()
+            if profiler is not None:
+                profiler.stop()
+            profiling.current_spans.reset(token)
+            if METRICS_ENABLED:
+                metrics.http_request_duration_seconds.observe(end - spans.start, method, self.path)
+                metrics.http_requests_in_flight.dec(method, self.path)
+                metrics.http_requests_total.inc(method, self.path, status)
+            profiling.record_request(method, self.path, status, spans, end)
+
+        if profiler is not None:
+            report = {
+                "method": method,
+                "route": self.path,
+                "status": int(status),
+                "response_bytes": response_bytes,
+                "spans": spans.summary(end),
+                "profile": profiler.report(),
+            }
+            await JSONResponse(report)(scope, receive, send)
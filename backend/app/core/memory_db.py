@@ -0,0 +1,1017 @@
+"""
+Backend de armazenamento em memória (STORAGE_BACKEND=memory)
+
+Implementa, em processo, a parte da interface das coleções do Motor que o
+app usa (find/find_one com projeção, ordenação, skip e limit, contagens,
+distinct, inserts, updates com $set/$inc/$unset/$setOnInsert/$push,
+bulk_write, find_one_and_*, aggregate com $match/$project/$unwind/$group/
+$sort/$skip/$limit/$count e rename/drop). O código de app/crud roda sem
+mudanças sobre os dois backends.
+
+Os índices criados pelas migrações (app.core.indexes.INDEXES) viram índices
+hash: consultas com igualdade ou $in em todos os campos de um índice (ex:
+scryfall_id e name das cartas, name dos decks) acessam só os documentos do
+índice em vez de varrer a coleção, e os índices únicos são respeitados
+(DuplicateKeyError/BulkWriteError como no MongoDB).
+
+Os dados ficam na memória do processo e se perdem ao reiniciar: indicado
+para CI, benchmarks sem a latência do banco e instalações de um único
+processo (WEB_CONCURRENCY=1), com backup/restore para persistir os decks.
+"""
+import itertools
+import re
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, IndexModel, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+REGEX_FLAGS = {"i": re.IGNORECASE, "m": re.MULTILINE, "s": re.DOTALL, "x": re.VERBOSE}
+
+_MISSING = object()
+
+# Tipos imutáveis: não precisam ser copiados
+_SCALAR_TYPES = frozenset({str, int, float, bool, type(None), ObjectId, datetime, bytes})
+
+
+def _clone(value: Any) -> Any:
+    # Cópia dos documentos guardados: quem lê pode alterar o resultado à vontade
+    cls = type(value)
+    if cls is dict:
+        return {key: item if type(item) in _SCALAR_TYPES else _clone(item) for key, item in value.items()}
+    if cls is list:
+        return [item if type(item) in _SCALAR_TYPES else _clone(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _clone(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_clone(item) for item in value]
+    return value
+
+
+def _utc_naive(value: datetime) -> datetime:
+    # Como o pymongo ao codificar: datas com fuso viram UTC (e voltam do banco sem fuso)
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _hashable(value: Any) -> Any:
+    if isinstance(value, dict):
+        return tuple((key, _hashable(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(_hashable(item) for item in value)
+    if isinstance(value, datetime):
+        return _utc_naive(value)
+    return value
+
+
+def _field_values(value: Any, parts: List[str], expand_arrays: bool = True) -> List[Any]:
+    """
+    Valores de um caminho com pontos (ex: "cards.scryfall_id"), atravessando
+    listas como o MongoDB. Com expand_arrays, uma lista no fim do caminho
+    conta como ela mesma e como cada um dos seus elementos.
+    """
+    if not parts:
+        if isinstance(value, list) and expand_arrays:
+            return [value, *value]
+        return [value]
+    if isinstance(value, dict):
+        if parts[0] in value:
+            return _field_values(value[parts[0]], parts[1:], expand_arrays)
+        return []
+    if isinstance(value, list):
+        values = []
+        if parts[0].isdigit() and int(parts[0]) < len(value):
+            values.extend(_field_values(value[int(parts[0])], parts[1:], expand_arrays))
+        for item in value:
+            if isinstance(item, dict):
+                values.extend(_field_values(item, parts, expand_arrays))
+        return values
+    return []
+
+
+def _type_rank(value: Any) -> int:
+    # Ordem entre tipos do BSON (simplificada)
+    if value is None or value is _MISSING:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, bytes):
+        return 6
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+
+def _sort_value(value: Any) -> Tuple[int, Any]:
+    rank = _type_rank(value)
+    if rank == 1:
+        return rank, 0
+    if rank in (4, 5, 10):
+        return rank, repr(value)
+    if rank == 9:
+        return rank, _utc_naive(value)
+    return rank, value
+
+
+def _compare(value: Any, target: Any, operator: str) -> bool:
+    rank = _type_rank(value)
+    if rank != _type_rank(target) or rank in (1, 4, 5, 10):
+        return False
+    if rank == 9:
+        value, target = _utc_naive(value), _utc_naive(target)
+    if operator == "$gt":
+        return value > target
+    if operator == "$gte":
+        return value >= target
+    if operator == "$lt":
+        return value < target
+    return value <= target
+
+
+@lru_cache(maxsize=256)
+def _regex(pattern: Any, options: str = "") -> "re.Pattern":
+    if isinstance(pattern, re.Pattern):
+        return pattern
+    flags = 0
+    for option in options or "":
+        flags |= REGEX_FLAGS.get(option, 0)
+    return re.compile(pattern, flags)
+
+
+Predicate = Callable[[List[Any]], bool]
+
+
+def _value_key(value: Any) -> Tuple[bool, Any]:
+    # Chave de igualdade: bool não é igual a 1/0 no MongoDB
+    return isinstance(value, bool), _hashable(value)
+
+
+def _compile_equals(targets: List[Any]) -> Predicate:
+    """Igualdade com algum dos alvos ($eq ou $in), com os alvos pré-processados."""
+    patterns = [target for target in targets if isinstance(target, re.Pattern)]
+    keys = {_value_key(target) for target in targets if not isinstance(target, re.Pattern)}
+    matches_missing = (False, None) in keys
+
+    def predicate(values: List[Any]) -> bool:
+        if not values:
+            return matches_missing
+        for value in values:
+            if _value_key(value) in keys:
+                return True
+            if patterns and isinstance(value, str) and any(pattern.search(value) for pattern in patterns):
+                return True
+        return False
+    return predicate
+
+
+def _compile_condition(condition: Dict[str, Any]) -> Predicate:
+    predicates: List[Predicate] = []
+    for operator, target in condition.items():
+        if operator == "$eq":
+            predicates.append(_compile_equals([target]))
+        elif operator == "$ne":
+            equals = _compile_equals([target])
+            predicates.append(lambda values, equals=equals: not equals(values))
+        elif operator == "$in":
+            predicates.append(_compile_equals(list(target)))
+        elif operator == "$nin":
+            equals = _compile_equals(list(target))
+            predicates.append(lambda values, equals=equals: not equals(values))
+        elif operator in ("$gt", "$gte", "$lt", "$lte"):
+            predicates.append(lambda values, target=target, operator=operator: any(
+                _compare(value, target, operator) for value in values
+            ))
+        elif operator == "$exists":
+            predicates.append(lambda values, target=target: bool(values) == bool(target))
+        elif operator == "$regex":
+            predicates.append(_compile_equals([_regex(target, condition.get("$options", ""))]))
+        elif operator == "$options":
+            continue
+        elif operator == "$all":
+            items = [_compile_equals([item]) for item in target]
+            predicates.append(lambda values, items=items: bool(items) and all(item(values) for item in items))
+        elif operator == "$size":
+            predicates.append(lambda values, target=target: any(
+                isinstance(value, list) and len(value) == target for value in values
+            ))
+        elif operator == "$not":
+            negated = _compile_condition(target if isinstance(target, dict) else {"$regex": target})
+            predicates.append(lambda values, negated=negated: not negated(values))
+        elif operator == "$elemMatch":
+            document_match = _compile_query(target)
+            value_match = _compile_condition(target) if _is_operator_dict(target) else None
+
+            def elem_match(values: List[Any], document_match=document_match, value_match=value_match) -> bool:
+                return any(
+                    isinstance(value, list) and any(
+                        document_match(item) if isinstance(item, dict) else bool(value_match and value_match([item]))
+                        for item in value
+                    )
+                    for value in values
+                )
+            predicates.append(elem_match)
+        else:
+            raise OperationFailure(f"Operador {operator} não suportado no backend em memória")
+    return lambda values: all(predicate(values) for predicate in predicates)
+
+
+def _is_operator_dict(condition: Any) -> bool:
+    return isinstance(condition, dict) and bool(condition) and all(key.startswith("$") for key in condition)
+
+
+def _compile_query(query: Optional[Dict[str, Any]]) -> Callable[[Dict[str, Any]], bool]:
+    """Compila o filtro uma vez por consulta em uma função documento -> bool."""
+    predicates: List[Callable[[Dict[str, Any]], bool]] = []
+    for key, condition in (query or {}).items():
+        if key in ("$or", "$and", "$nor"):
+            clauses = [_compile_query(clause) for clause in condition]
+            if key == "$or":
+                predicates.append(lambda document, clauses=clauses: any(clause(document) for clause in clauses))
+            elif key == "$and":
+                predicates.append(lambda document, clauses=clauses: all(clause(document) for clause in clauses))
+            else:
+                predicates.append(lambda document, clauses=clauses: not any(clause(document) for clause in clauses))
+            continue
+        if key.startswith("$"):
+            raise OperationFailure(f"Operador {key} não suportado no backend em memória")
+
+        field_predicate = _compile_condition(condition) if _is_operator_dict(condition) else _compile_equals([condition])
+        parts = key.split(".")
+        predicates.append(
+            lambda document, parts=parts, field_predicate=field_predicate: field_predicate(_field_values(document, parts))
+        )
+
+    if len(predicates) == 1:
+        return predicates[0]
+    return lambda document: all(predicate(document) for predicate in predicates)
+
+
+def _projection_tree(fields: Iterable[str]) -> Dict[str, Any]:
+    tree: Dict[str, Any] = {}
+    for field in fields:
+        node = tree
+        parts = field.split(".")
+        for part in parts[:-1]:
+            child = node.setdefault(part, {})
+            if child is True:
+                break
+            node = child
+        else:
+            node[parts[-1]] = True
+    return tree
+
+
+def _include(value: Any, tree: Dict[str, Any]) -> Any:
+    if isinstance(value, list):
+        return [_include(item, tree) for item in value if isinstance(item, (dict, list))]
+    result = {}
+    for key, item in value.items():
+        subtree = tree.get(key)
+        if subtree is True:
+            result[key] = _clone(item)
+        elif subtree and isinstance(item, (dict, list)):
+            result[key] = _include(item, subtree)
+    return result
+
+
+def _exclude(value: Any, tree: Dict[str, Any]) -> Any:
+    if isinstance(value, list):
+        return [_exclude(item, tree) if isinstance(item, (dict, list)) else _clone(item) for item in value]
+    result = {}
+    for key, item in value.items():
+        subtree = tree.get(key)
+        if subtree is True:
+            continue
+        if subtree and isinstance(item, (dict, list)):
+            result[key] = _exclude(item, subtree)
+        else:
+            result[key] = _clone(item)
+    return result
+
+
+def _project(document: Dict[str, Any], projection: Any) -> Dict[str, Any]:
+    if not projection:
+        return _clone(document)
+    if not isinstance(projection, dict):
+        projection = {field: 1 for field in projection}
+
+    include_id = bool(projection.get("_id", 1))
+    fields = {key: value for key, value in projection.items() if key != "_id"}
+    if fields and any(fields.values()):
+        result = {"_id": document["_id"]} if include_id and "_id" in document else {}
+        result.update(_include(document, _projection_tree(key for key, value in fields.items() if value)))
+        return result
+
+    result = _exclude(document, _projection_tree(fields))
+    if not include_id:
+        result.pop("_id", None)
+    return result
+
+
+def _normalize_sort(key_or_list: Any, direction: Optional[int] = None) -> List[Tuple[str, int]]:
+    if key_or_list is None:
+        return []
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return [(key, value) for key, value in key_or_list]
+
+
+def _sort_documents(documents: List[Dict[str, Any]], sort: List[Tuple[str, int]]) -> List[Dict[str, Any]]:
+    # Ordenações estáveis da última chave para a primeira
+    for key, direction in reversed(sort):
+        def sort_key(document: Dict[str, Any], key=key, direction=direction) -> Tuple[int, Any]:
+            values = _field_values(document, key.split("."), expand_arrays=False)
+            if values and isinstance(values[0], list) and values[0]:
+                # Arrays ordenam pelo menor (crescente) ou maior (decrescente) elemento
+                ranked = [_sort_value(item) for item in values[0]]
+                return min(ranked) if direction > 0 else max(ranked)
+            return _sort_value(values[0] if values else None)
+        documents.sort(key=sort_key, reverse=direction < 0)
+    return documents
+
+
+def _set_path(document: Dict[str, Any], path: str, value: Any) -> None:
+    parts = path.split(".")
+    target: Any = document
+    for part in parts[:-1]:
+        if isinstance(target, list):
+            target = target[int(part)]
+            continue
+        if not isinstance(target.get(part), (dict, list)):
+            target[part] = {}
+        target = target[part]
+    if isinstance(target, list):
+        target[int(parts[-1])] = value
+    else:
+        target[parts[-1]] = value
+
+
+def _get_path(document: Dict[str, Any], path: str) -> Any:
+    target: Any = document
+    for part in path.split("."):
+        if isinstance(target, dict):
+            target = target.get(part, _MISSING)
+        elif isinstance(target, list) and part.isdigit() and int(part) < len(target):
+            target = target[int(part)]
+        else:
+            return _MISSING
+        if target is _MISSING:
+            return _MISSING
+    return target
+
+
+def _unset_path(document: Dict[str, Any], path: str) -> None:
+    parts = path.split(".")
+    parent = _get_path(document, ".".join(parts[:-1])) if len(parts) > 1 else document
+    if isinstance(parent, dict):
+        parent.pop(parts[-1], None)
+
+
+def _apply_update(document: Dict[str, Any], update: Dict[str, Any], inserting: bool = False) -> None:
+    if not any(key.startswith("$") for key in update):
+        # Substituição do documento inteiro (mantém o _id)
+        document_id = document.get("_id")
+        document.clear()
+        document.update(_clone(update))
+        if document_id is not None:
+            document["_id"] = document_id
+        return
+
+    for operator, fields in update.items():
+        if operator == "$setOnInsert" and not inserting:
+            continue
+        for path, value in fields.items():
+            if operator in ("$set", "$setOnInsert"):
+                _set_path(document, path, _clone(value))
+            elif operator == "$unset":
+                _unset_path(document, path)
+            elif operator == "$inc":
+                current = _get_path(document, path)
+                _set_path(document, path, value if current is _MISSING else current + value)
+            elif operator in ("$push", "$addToSet"):
+                current = _get_path(document, path)
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                array = [] if current is _MISSING else current
+                for item in items:
+                    if operator == "$push" or item not in array:
+                        array.append(_clone(item))
+                _set_path(document, path, array)
+            elif operator == "$min":
+                current = _get_path(document, path)
+                if current is _MISSING or _compare(value, current, "$lt"):
+                    _set_path(document, path, value)
+            elif operator == "$max":
+                current = _get_path(document, path)
+                if current is _MISSING or _compare(value, current, "$gt"):
+                    _set_path(document, path, value)
+            else:
+                raise OperationFailure(f"Operador de update {operator} não suportado no backend em memória")
+
+
+def _upsert_document(query: Dict[str, Any]) -> Dict[str, Any]:
+    # Campos de igualdade do filtro entram no documento criado pelo upsert
+    document: Dict[str, Any] = {}
+    for key, condition in query.items():
+        if key.startswith("$"):
+            continue
+        if _is_operator_dict(condition):
+            if "$eq" in condition:
+                _set_path(document, key, _clone(condition["$eq"]))
+            continue
+        _set_path(document, key, _clone(condition))
+    return document
+
+
+def _path_value(value: Any, parts: List[str]) -> Any:
+    # Caminho em expressão de agregação: atravessar uma lista gera a lista dos valores
+    if not parts:
+        return value
+    if isinstance(value, dict):
+        return _path_value(value.get(parts[0], _MISSING), parts[1:]) if parts[0] in value else _MISSING
+    if isinstance(value, list):
+        values = (_path_value(item, parts) for item in value if isinstance(item, dict))
+        return [item for item in values if item is not _MISSING]
+    return _MISSING
+
+
+def _expression(document: Dict[str, Any], expression: Any) -> Any:
+    """Expressões de agregação suportadas: caminhos ("$campo"), literais e objetos."""
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = _path_value(document, expression[1:].split("."))
+        return None if value is _MISSING else value
+    if isinstance(expression, dict):
+        if _is_operator_dict(expression):
+            if "$literal" in expression:
+                return expression["$literal"]
+            raise OperationFailure(f"Expressão {next(iter(expression))} não suportada no backend em memória")
+        return {key: _expression(document, value) for key, value in expression.items()}
+    return expression
+
+
+def _group(documents: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    groups: Dict[Any, Dict[str, Any]] = {}
+    for document in documents:
+        group_id = _expression(document, spec["_id"])
+        group = groups.get(_hashable(group_id))
+        if group is None:
+            group = groups[_hashable(group_id)] = {"_id": group_id}
+            for field, accumulator in spec.items():
+                if field != "_id":
+                    operator = next(iter(accumulator))
+                    group[field] = [] if operator in ("$push", "$addToSet", "$avg") else _MISSING
+
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            operator, expression = next(iter(accumulator.items()))
+            value = _expression(document, expression)
+            current = group[field]
+            if operator == "$sum":
+                if isinstance(value, list):
+                    value = sum(item for item in value if isinstance(item, (int, float)))
+                elif not isinstance(value, (int, float)) or isinstance(value, bool):
+                    value = 0
+                group[field] = value if current is _MISSING else current + value
+            elif operator == "$push":
+                current.append(value)
+            elif operator == "$addToSet":
+                if value not in current:
+                    current.append(value)
+            elif operator == "$avg":
+                if isinstance(value, (int, float)):
+                    current.append(value)
+            elif operator == "$first":
+                if current is _MISSING:
+                    group[field] = value
+            elif operator == "$last":
+                group[field] = value
+            elif operator in ("$min", "$max"):
+                if value is not None and (current is _MISSING or _compare(value, current, "$lt" if operator == "$min" else "$gt")):
+                    group[field] = value
+            else:
+                raise OperationFailure(f"Acumulador {operator} não suportado no backend em memória")
+
+    results = []
+    for group in groups.values():
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            if next(iter(accumulator)) == "$avg":
+                values = group[field]
+                group[field] = sum(values) / len(values) if values else None
+            elif group[field] is _MISSING:
+                group[field] = None
+        results.append(group)
+    return results
+
+
+def _unwind(documents: List[Dict[str, Any]], spec: Any) -> List[Dict[str, Any]]:
+    if isinstance(spec, str):
+        spec = {"path": spec}
+    path = spec["path"][1:]
+    preserve = spec.get("preserveNullAndEmptyArrays", False)
+
+    results = []
+    for document in documents:
+        value = _get_path(document, path)
+        if isinstance(value, list) and value:
+            for item in value:
+                unwound = dict(document)
+                _set_path(unwound, path, item)
+                results.append(unwound)
+        elif isinstance(value, list) or value is _MISSING or value is None:
+            if preserve:
+                results.append(document)
+        else:
+            results.append(document)
+    return results
+
+
+def _project_stage(documents: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # 0/1/True/False são inclusão ou exclusão; o resto são expressões calculadas
+    computed = {key: value for key, value in spec.items() if not isinstance(value, (bool, int))}
+    projection = {key: value for key, value in spec.items() if key not in computed}
+    results = []
+    for document in documents:
+        result = _project(document, projection) if projection else {"_id": document.get("_id")}
+        for key, expression in computed.items():
+            _set_path(result, key, _expression(document, expression))
+        results.append(result)
+    return results
+
+
+class _HashIndex:
+    """Índice hash sobre um ou mais campos (multikey: um registro por elemento)."""
+
+    def __init__(self, name: str, fields: List[str], unique: bool = False):
+        self.name = name
+        self.fields = fields
+        self.unique = unique
+        self.entries: Dict[Tuple, Set[Any]] = {}
+
+    def keys(self, document: Dict[str, Any]) -> Set[Tuple]:
+        per_field = []
+        for field in self.fields:
+            values = _field_values(document, field.split("."), expand_arrays=False)
+            expanded = []
+            for value in values or [None]:
+                expanded.extend(value if isinstance(value, list) else [value])
+            per_field.append({_hashable(value) for value in expanded})
+        return set(itertools.product(*per_field))
+
+    def check(self, document: Dict[str, Any], document_id: Any) -> None:
+        if not self.unique:
+            return
+        for key in self.keys(document):
+            if self.entries.get(key, set()) - {document_id}:
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error index: {self.name} dup key: {dict(zip(self.fields, key))}",
+                    11000
+                )
+
+    def add(self, document: Dict[str, Any], document_id: Any) -> None:
+        for key in self.keys(document):
+            self.entries.setdefault(key, set()).add(document_id)
+
+    def remove(self, document: Dict[str, Any], document_id: Any) -> None:
+        for key in self.keys(document):
+            ids = self.entries.get(key)
+            if ids:
+                ids.discard(document_id)
+                if not ids:
+                    del self.entries[key]
+
+    def lookup(self, query: Dict[str, Any]) -> Optional[Set[Any]]:
+        """Documentos candidatos para o filtro, ou None se o índice não se aplica."""
+        per_field = []
+        for field in self.fields:
+            condition = query.get(field, _MISSING)
+            if condition is _MISSING:
+                return None
+            if _is_operator_dict(condition):
+                if set(condition) == {"$in"}:
+                    values = condition["$in"]
+                elif "$eq" in condition:
+                    values = [condition["$eq"]]
+                else:
+                    return None
+            else:
+                values = [condition]
+            if any(isinstance(value, (dict, list, re.Pattern)) for value in values):
+                return None
+            per_field.append([_hashable(value) for value in values])
+
+        candidates: Set[Any] = set()
+        for key in itertools.product(*per_field):
+            candidates |= self.entries.get(key, set())
+        return candidates
+
+
+class MemoryCursor:
+    """Cursor com a interface usada do AsyncIOMotorCursor (sort/skip/limit, to_list e async for)."""
+
+    def __init__(self, load: Callable[[], List[Dict[str, Any]]], projection: Any = None, clone: bool = True):
+        self._load = load
+        self._projection = projection
+        self._clone = clone
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._results: Optional[Iterator[Dict[str, Any]]] = None
+
+    def sort(self, key_or_list: Any, direction: Optional[int] = None) -> "MemoryCursor":
+        self._sort = _normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, skip: int) -> "MemoryCursor":
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int) -> "MemoryCursor":
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size: int) -> "MemoryCursor":
+        return self
+
+    def _execute(self) -> Iterator[Dict[str, Any]]:
+        documents = self._load()
+        if self._sort:
+            documents = _sort_documents(list(documents), self._sort)
+        end = self._skip + self._limit if self._limit else None
+        documents = documents[self._skip:end]
+        if not self._clone:
+            return iter(documents)
+        return (_project(document, self._projection) for document in documents)
+
+    def __aiter__(self) -> "MemoryCursor":
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        if self._results is None:
+            self._results = self._execute()
+        try:
+            return next(self._results)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        if self._results is None:
+            self._results = self._execute()
+        if length is None:
+            return list(self._results)
+        return list(itertools.islice(self._results, length))
+
+
+class MemoryCollection:
+    def __init__(self, database: "MemoryDatabase", name: str):
+        self.database = database
+        self.name = name
+        self._documents: Dict[Any, Dict[str, Any]] = {}
+        # Posição de inserção de cada documento (ordem natural)
+        self._positions: Dict[Any, int] = {}
+        self._next_position = 0
+        self._indexes: Dict[str, _HashIndex] = {}
+        self._index_specs: Dict[str, Dict[str, Any]] = {}
+
+    # Leitura
+
+    def _find(self, query: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        query = query or {}
+        candidates: Optional[Iterable[Dict[str, Any]]] = None
+
+        id_condition = query.get("_id", _MISSING)
+        if id_condition is not _MISSING and not _is_operator_dict(id_condition):
+            document = self._documents.get(_hashable(id_condition))
+            candidates = [document] if document else []
+        elif _is_operator_dict(id_condition) and set(id_condition) == {"$in"}:
+            found = (self._documents.get(_hashable(value)) for value in id_condition["$in"])
+            candidates = [document for document in found if document]
+        else:
+            best: Optional[Set[Any]] = None
+            for index in self._indexes.values():
+                ids = index.lookup(query)
+                if ids is not None and (best is None or len(ids) < len(best)):
+                    best = ids
+            if best is not None:
+                # Mantém a ordem natural (de inserção) dos documentos
+                candidates = [self._documents[key] for key in sorted(best, key=self._positions.__getitem__)]
+
+        if candidates is None:
+            candidates = self._documents.values()
+        matches = _compile_query(query)
+        return [document for document in candidates if matches(document)]
+
+    def find(self, filter: Optional[Dict[str, Any]] = None, projection: Any = None, **kwargs: Any) -> MemoryCursor:
+        cursor = MemoryCursor(lambda: self._find(filter), projection)
+        if kwargs.get("sort"):
+            cursor.sort(kwargs["sort"])
+        cursor.skip(kwargs.get("skip", 0)).limit(kwargs.get("limit", 0))
+        return cursor
+
+    async def find_one(self, filter: Optional[Dict[str, Any]] = None, projection: Any = None, sort: Any = None, **kwargs: Any) -> Optional[Dict[str, Any]]:
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        documents = await self.find(filter, projection, sort=sort).limit(1).to_list(length=1)
+        return documents[0] if documents else None
+
+    async def count_documents(self, filter: Dict[str, Any], limit: Optional[int] = None, skip: int = 0, **kwargs: Any) -> int:
+        count = max(len(self._find(filter)) - skip, 0)
+        return min(count, limit) if limit else count
+
+    async def estimated_document_count(self, **kwargs: Any) -> int:
+        return len(self._documents)
+
+    async def distinct(self, key: str, filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Any]:
+        seen: Dict[Any, Any] = {}
+        for document in self._find(filter):
+            for value in _field_values(document, key.split("."), expand_arrays=False):
+                for item in value if isinstance(value, list) else [value]:
+                    seen.setdefault(_hashable(item), item)
+        return [_clone(value) for value in seen.values()]
+
+    def aggregate(self, pipeline: List[Dict[str, Any]], **kwargs: Any) -> MemoryCursor:
+        return MemoryCursor(lambda: self._aggregate(pipeline), clone=False)
+
+    def _aggregate(self, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        stages = list(pipeline)
+        # O primeiro $match usa os índices, como no MongoDB
+        query = stages.pop(0)["$match"] if stages and "$match" in stages[0] else {}
+        documents = [_clone(document) for document in self._find(query)]
+
+        for stage in stages:
+            operator, spec = next(iter(stage.items()))
+            if operator == "$match":
+                matches = _compile_query(spec)
+                documents = [document for document in documents if matches(document)]
+            elif operator == "$project":
+                documents = _project_stage(documents, spec)
+            elif operator == "$unwind":
+                documents = _unwind(documents, spec)
+            elif operator == "$group":
+                documents = _group(documents, spec)
+            elif operator == "$sort":
+                documents = _sort_documents(documents, _normalize_sort(spec))
+            elif operator == "$skip":
+                documents = documents[spec:]
+            elif operator == "$limit":
+                documents = documents[:spec]
+            elif operator == "$count":
+                documents = [{spec: len(documents)}] if documents else []
+            else:
+                raise OperationFailure(f"Estágio {operator} não suportado no backend em memória")
+        return documents
+
+    # Escrita
+
+    def _store(self, document: Dict[str, Any], previous: Optional[Dict[str, Any]] = None) -> None:
+        key = _hashable(document["_id"])
+        for index in self._indexes.values():
+            index.check(document, key)
+        if previous is not None:
+            for index in self._indexes.values():
+                index.remove(previous, key)
+        for index in self._indexes.values():
+            index.add(document, key)
+        if key not in self._positions:
+            self._positions[key] = self._next_position
+            self._next_position += 1
+        self._documents[key] = document
+
+    def _insert(self, document: Dict[str, Any]) -> Any:
+        if "_id" not in document:
+            # Como o pymongo: o _id gerado é gravado no documento recebido
+            document["_id"] = ObjectId()
+        if _hashable(document["_id"]) in self._documents:
+            raise DuplicateKeyError(f"E11000 duplicate key error index: _id_ dup key: {document['_id']}", 11000)
+        self._store(_clone(document))
+        return document["_id"]
+
+    def _update(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool, multi: bool,
+                sort: Any = None) -> Tuple[int, int, Any, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Retorna (encontrados, alterados, _id do upsert, documento antes, documento depois)."""
+        documents = self._find(filter)
+        if sort:
+            documents = _sort_documents(documents, _normalize_sort(sort))
+        if not multi:
+            documents = documents[:1]
+
+        if not documents:
+            if not upsert:
+                return 0, 0, None, None, None
+            document = _upsert_document(filter)
+            _apply_update(document, update, inserting=True)
+            document_id = self._insert(document)
+            return 0, 0, document_id, None, self._documents[_hashable(document_id)]
+
+        modified = 0
+        before = after = None
+        for current in documents:
+            updated = _clone(current)
+            _apply_update(updated, update)
+            if updated != current:
+                self._store(updated, current)
+                modified += 1
+            before, after = current, updated
+        return len(documents), modified, None, before, after
+
+    async def insert_one(self, document: Dict[str, Any], **kwargs: Any) -> InsertOneResult:
+        return InsertOneResult(self._insert(document), True)
+
+    async def insert_many(self, documents: Iterable[Dict[str, Any]], ordered: bool = True, **kwargs: Any) -> InsertManyResult:
+        inserted_ids = []
+        errors = []
+        for position, document in enumerate(documents):
+            try:
+                inserted_ids.append(self._insert(document))
+            except DuplicateKeyError as e:
+                errors.append({"index": position, "code": 11000, "errmsg": str(e), "op": document})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError(_bulk_result(nInserted=len(inserted_ids), writeErrors=errors))
+        return InsertManyResult(inserted_ids, True)
+
+    async def update_one(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False, **kwargs: Any) -> UpdateResult:
+        matched, modified, upserted_id, _, _ = self._update(filter, update, upsert, multi=False)
+        return UpdateResult({"n": matched or int(upserted_id is not None), "nModified": modified, "upserted": upserted_id}, True)
+
+    async def update_many(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False, **kwargs: Any) -> UpdateResult:
+        matched, modified, upserted_id, _, _ = self._update(filter, update, upsert, multi=True)
+        return UpdateResult({"n": matched or int(upserted_id is not None), "nModified": modified, "upserted": upserted_id}, True)
+
+    async def replace_one(self, filter: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False, **kwargs: Any) -> UpdateResult:
+        return await self.update_one(filter, replacement, upsert=upsert)
+
+    async def find_one_and_update(self, filter: Dict[str, Any], update: Dict[str, Any], projection: Any = None,
+                                  sort: Any = None, upsert: bool = False, return_document: bool = False,
+                                  **kwargs: Any) -> Optional[Dict[str, Any]]:
+        _, _, _, before, after = self._update(filter, update, upsert, multi=False, sort=sort)
+        document = after if return_document else before
+        return _project(document, projection) if document is not None else None
+
+    async def find_one_and_replace(self, filter: Dict[str, Any], replacement: Dict[str, Any], **kwargs: Any) -> Optional[Dict[str, Any]]:
+        return await self.find_one_and_update(filter, replacement, **kwargs)
+
+    def _delete(self, filter: Dict[str, Any], multi: bool, sort: Any = None) -> List[Dict[str, Any]]:
+        documents = self._find(filter)
+        if sort:
+            documents = _sort_documents(documents, _normalize_sort(sort))
+        if not multi:
+            documents = documents[:1]
+        for document in documents:
+            key = _hashable(document["_id"])
+            for index in self._indexes.values():
+                index.remove(document, key)
+            del self._documents[key]
+            del self._positions[key]
+        return documents
+
+    async def delete_one(self, filter: Dict[str, Any], **kwargs: Any) -> DeleteResult:
+        return DeleteResult({"n": len(self._delete(filter, multi=False))}, True)
+
+    async def delete_many(self, filter: Dict[str, Any], **kwargs: Any) -> DeleteResult:
+        return DeleteResult({"n": len(self._delete(filter, multi=True))}, True)
+
+    async def find_one_and_delete(self, filter: Dict[str, Any], projection: Any = None, sort: Any = None, **kwargs: Any) -> Optional[Dict[str, Any]]:
+        documents = self._delete(filter, multi=False, sort=sort)
+        return _project(documents[0], projection) if documents else None
+
+    async def bulk_write(self, requests: List[Any], ordered: bool = True, **kwargs: Any) -> BulkWriteResult:
+        result = _bulk_result()
+        for position, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    self._insert(request._doc)
+                    result["nInserted"] += 1
+                elif isinstance(request, (UpdateOne, UpdateMany, ReplaceOne)):
+                    matched, modified, upserted_id, _, _ = self._update(
+                        request._filter, request._doc, bool(request._upsert), multi=isinstance(request, UpdateMany)
+                    )
+                    result["nMatched"] += matched
+                    result["nModified"] += modified
+                    if upserted_id is not None:
+                        result["nUpserted"] += 1
+                        result["upserted"].append({"index": position, "_id": upserted_id})
+                elif isinstance(request, (DeleteOne, DeleteMany)):
+                    result["nRemoved"] += len(self._delete(request._filter, multi=isinstance(request, DeleteMany)))
+                else:
+                    raise OperationFailure(f"Operação {type(request).__name__} não suportada no backend em memória")
+            except DuplicateKeyError as e:
+                result["writeErrors"].append({"index": position, "code": 11000, "errmsg": str(e), "op": request})
+                if ordered:
+                    break
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    # Índices e coleção
+
+    async def create_index(self, keys: Any, **kwargs: Any) -> str:
+        return (await self.create_indexes([IndexModel(keys, **kwargs)]))[0]
+
+    async def create_indexes(self, indexes: List[IndexModel], **kwargs: Any) -> List[str]:
+        self.database._collections.setdefault(self.name, self)
+        names = []
+        for model in indexes:
+            spec = model.document
+            name = spec["name"]
+            if name not in self._indexes:
+                index = _HashIndex(name, list(spec["key"]), unique=bool(spec.get("unique")))
+                for key, document in self._documents.items():
+                    index.check(document, key)
+                    index.add(document, key)
+                self._indexes[name] = index
+                self._index_specs[name] = {"key": list(spec["key"].items()), **({"unique": True} if index.unique else {})}
+            names.append(name)
+        return names
+
+    async def index_information(self) -> Dict[str, Dict[str, Any]]:
+        return {"_id_": {"key": [("_id", 1)]}, **{name: dict(spec) for name, spec in self._index_specs.items()}}
+
+    async def drop_index(self, name: str, **kwargs: Any) -> None:
+        if name not in self._indexes:
+            raise OperationFailure(f"index not found with name [{name}]", 27)
+        del self._indexes[name]
+        del self._index_specs[name]
+
+    async def drop(self, **kwargs: Any) -> None:
+        self._documents.clear()
+        self._positions.clear()
+        self._indexes.clear()
+        self._index_specs.clear()
+        self.database._collections.pop(self.name, None)
+
+    async def rename(self, new_name: str, dropTarget: bool = False, **kwargs: Any) -> None:
+        collections = self.database._collections
+        if new_name in collections and collections[new_name]._documents and not dropTarget:
+            raise OperationFailure(f"target namespace exists: {new_name}", 48)
+        collections.pop(self.name, None)
+        self.name = new_name
+        collections[new_name] = self
+
+
+def _bulk_result(**values: Any) -> Dict[str, Any]:
+    result = {
+        "writeErrors": [],
+        "writeConcernErrors": [],
+        "nInserted": 0,
+        "nUpserted": 0,
+        "nMatched": 0,
+        "nModified": 0,
+        "nRemoved": 0,
+        "upserted": [],
+    }
+    result.update(values)
+    return result
+
+
+class MemoryDatabase:
+    """Banco em memória: coleções criadas no primeiro acesso (db.cards ou db["cards"])."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = MemoryCollection(self, name)
+        return collection
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def get_collection(self, name: str, **kwargs: Any) -> MemoryCollection:
+        return self[name]
+
+    async def list_collection_names(self, **kwargs: Any) -> List[str]:
+        return [name for name, collection in self._collections.items() if collection._documents or collection._indexes]
+
+    async def drop_collection(self, name: str, **kwargs: Any) -> None:
+        if name in self._collections:
+            await self._collections[name].drop()
+
+    async def command(self, command: Any, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        name = command if isinstance(command, str) else next(iter(command))
+        if name == "ping":
+            return {"ok": 1.0}
+        raise OperationFailure(f"Comando {name} não suportado no backend em memória", 115)
@@ -0,0 +1,473 @@
+"""
+Métricas da API no formato de texto do Prometheus (GET /metrics)
+
+Contadores, gauges e histogramas simples, guardados em memória por processo
+e protegidos por lock (os listeners do pymongo rodam nas threads do Motor).
+São coletados:
+
+- rotas: latência e requisições por método, rota e status, e requisições em andamento
+- MongoDB: duração dos comandos por coleção e comando (CommandListener) e
+  espera por conexão do pool (ConnectionPoolListener)
+- cache das buscas de cartas: acertos e faltas por consulta e formato do filtro
+- Scryfall: latência, status e retentativas das chamadas à API
+
+Tudo é desligado com METRICS_ENABLED=false: as rotas não são medidas, os
+listeners não são registrados no cliente e /metrics não é exposto.
+
+Com vários workers (gunicorn), METRICS_MULTIPROC_DIR aponta um diretório
+compartilhado: cada worker grava um snapshot dos seus valores em
+`worker-<pid>.json` (a cada METRICS_FLUSH_SECONDS e a cada /metrics que
+atende) e /metrics soma os snapshots de todos. Contadores e histogramas de
+workers que terminaram continuam somados (o master do gunicorn os junta em
+`archive.json`), então os totais nunca diminuem entre scrapes; gauges
+contam só os workers vivos.
+"""
+import asyncio
+import fcntl
+import json
+import os
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+from app.core.config import METRICS_ENABLED, METRICS_FLUSH_SECONDS, METRICS_MULTIPROC_DIR
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def snapshot(self) -> Dict[LabelValues, Any]:
+        with self._lock:
+            return {key: self._copy(value) for key, value in self._values.items()}
+
+    @staticmethod
+    def _copy(value: Any) -> Any:
+        return value
+
+    def merge(self, snapshots: List[Tuple[int, bool, Dict[LabelValues, Any]]]) -> Dict[LabelValues, Any]:
+        """Soma os snapshots (pid, vivo, valores) de todos os processos."""
+        raise NotImplementedError
+
+    def _samples(self, values: Dict[LabelValues, Any]) -> List[str]:
+        raise NotImplementedError
+
+    def render(self, values: Optional[Dict[LabelValues, Any]] = None) -> str:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples(self.snapshot() if values is None else values))
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        super().__init__(name, description, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def merge(self, snapshots: List[Tuple[int, bool, Dict[LabelValues, Any]]]) -> Dict[LabelValues, Any]:
+        merged: Dict[LabelValues, float] = {}
+        for _, _, values in snapshots:
+            for key, value in values.items():
+                merged[key] = merged.get(key, 0.0) + value
+        return merged
+
+    def _label_names(self) -> Tuple[str, ...]:
+        return self.labels
+
+    def _samples(self, values: Dict[LabelValues, Any]) -> List[str]:
+        labels = self._label_names()
+        return [f"{self.name}{_format_labels(labels, key)} {_format_value(value)}" for key, value in sorted(values.items())]
+
+
+class Gauge(Counter):
+    """
+    Com vários processos, `multiprocess_mode` define a agregação entre os
+    workers vivos: "sum" (ex: requisições em andamento) ou "all" (uma série
+    por worker, com o label pid).
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (), multiprocess_mode: str = "sum"):
+        super().__init__(name, description, labels)
+        self.multiprocess_mode = multiprocess_mode
+
+    def merge(self, snapshots: List[Tuple[int, bool, Dict[LabelValues, Any]]]) -> Dict[LabelValues, Any]:
+        live = [(pid, alive, values) for pid, alive, values in snapshots if alive]
+        if self.multiprocess_mode == "sum":
+            return super().merge(live)
+        return {key + (str(pid),): value for pid, _, values in live for key, value in values.items()}
+
+    def _label_names(self) -> Tuple[str, ...]:
+        if METRICS_MULTIPROC_DIR and self.multiprocess_mode == "all":
+            return self.labels + ("pid",)
+        return self.labels
+
+    def dec(self, *label_values: str, amount: float = 1.0) -> None:
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            self._values[label_values] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Por conjunto de labels: [contagem por bucket (não acumulada) + overflow, soma, total]
+        self._values: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(label_values)
+            if state is None:
+                state = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @staticmethod
+    def _copy(value: Any) -> Any:
+        return [list(value[0]), value[1], value[2]]
+
+    def merge(self, snapshots: List[Tuple[int, bool, Dict[LabelValues, Any]]]) -> Dict[LabelValues, Any]:
+        merged: Dict[LabelValues, List[Any]] = {}
+        for _, _, values in snapshots:
+            for key, (counts, total, count) in values.items():
+                state = merged.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0, 0])
+                state[0] = [a + b for a, b in zip(state[0], counts)]
+                state[1] += total
+                state[2] += count
+        return merged
+
+    def _samples(self, values: Dict[LabelValues, Any]) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+http_requests_total = Counter(
+    "http_requests_total", "Requisições HTTP concluídas", ("method", "route", "status")
+)
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "Latência das requisições HTTP (até o fim do corpo)", ("method", "route")
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "Requisições HTTP em andamento", ("method", "route")
+)
+
+worker_startup_seconds = Gauge(
+    "worker_startup_seconds", "Cold start do worker: do início do processo (ou fork) até o fim do startup da API",
+    multiprocess_mode="all"
+)
+
+mongo_command_duration_seconds = Histogram(
+    "mongo_command_duration_seconds", "Duração dos comandos do MongoDB", ("collection", "command"), MONGO_BUCKETS
+)
+mongo_command_failures_total = Counter(
+    "mongo_command_failures_total", "Comandos do MongoDB que falharam", ("collection", "command")
+)
+mongo_pool_wait_seconds = Histogram(
+    "mongo_pool_wait_seconds", "Espera por uma conexão do pool do MongoDB", ("client", "address"), MONGO_BUCKETS
+)
+mongo_pool_checked_out = Gauge(
+    "mongo_pool_checked_out", "Conexões do pool do MongoDB em uso", ("client", "address")
+)
+mongo_pool_waiting = Gauge(
+    "mongo_pool_waiting", "Operações esperando uma conexão do pool do MongoDB", ("client", "address")
+)
+mongo_pool_checkout_failures_total = Counter(
+    "mongo_pool_checkout_failures_total", "Falhas ao obter conexão do pool do MongoDB", ("client", "address", "reason")
+)
+
+query_cache_requests_total = Counter(
+    "query_cache_requests_total", "Consultas ao cache das buscas de cartas", ("query", "shape", "result")
+)
+
+scryfall_request_duration_seconds = Histogram(
+    "scryfall_request_duration_seconds", "Latência das chamadas à API da Scryfall", ("endpoint",)
+)
+scryfall_requests_total = Counter(
+    "scryfall_requests_total", "Chamadas à API da Scryfall por status (error = falha de rede)", ("endpoint", "status")
+)
+scryfall_retries_total = Counter(
+    "scryfall_retries_total", "Retentativas de chamadas à API da Scryfall", ("endpoint",)
+)
+
+
+ARCHIVE_FILE = "archive.json"
+LOCK_FILE = ".lock"
+
+
+def _worker_file(pid: int) -> str:
+    return os.path.join(METRICS_MULTIPROC_DIR, f"worker-{pid}.json")
+
+
+@contextmanager
+def _locked(exclusive: bool) -> Iterator[None]:
+    # Leitores (shared) não veem um worker somado duas vezes (ou nenhuma) enquanto o master arquiva
+    with open(os.path.join(METRICS_MULTIPROC_DIR, LOCK_FILE), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _encode(snapshots: Dict[str, Dict[LabelValues, Any]]) -> Dict[str, list]:
+    return {name: [[list(key), value] for key, value in values.items()] for name, values in snapshots.items()}
+
+
+def _decode(data: Dict[str, list]) -> Dict[str, Dict[LabelValues, Any]]:
+    return {name: {tuple(key): value for key, value in values} for name, values in data.items()}
+
+
+def _read(path: str) -> Dict[str, Dict[LabelValues, Any]]:
+    try:
+        with open(path) as file:
+            return _decode(json.load(file))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write(path: str, snapshots: Dict[str, Dict[LabelValues, Any]]) -> None:
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as file:
+        json.dump(_encode(snapshots), file)
+    os.replace(temporary, path)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def write_snapshot() -> None:
+    """Grava os valores deste processo em METRICS_MULTIPROC_DIR."""
+    if METRICS_MULTIPROC_DIR:
+        os.makedirs(METRICS_MULTIPROC_DIR, exist_ok=True)
+        _write(_worker_file(os.getpid()), {metric.name: metric.snapshot() for metric in REGISTRY})
+
+
+def _collect() -> Dict[str, Dict[LabelValues, Any]]:
+    write_snapshot()
+    snapshots: List[Tuple[int, bool, Dict[str, Dict[LabelValues, Any]]]] = []
+    with _locked(exclusive=False):
+        # Arquivo de workers que terminaram: pid 0, nunca vivo (só contadores e histogramas)
+        snapshots.append((0, False, _read(os.path.join(METRICS_MULTIPROC_DIR, ARCHIVE_FILE))))
+        for filename in os.listdir(METRICS_MULTIPROC_DIR):
+            if filename.startswith("worker-") and filename.endswith(".json"):
+                pid = int(filename[len("worker-"):-len(".json")])
+                snapshots.append((pid, _alive(pid), _read(os.path.join(METRICS_MULTIPROC_DIR, filename))))
+
+    return {
+        metric.name: metric.merge([(pid, alive, values.get(metric.name, {})) for pid, alive, values in snapshots])
+        for metric in REGISTRY
+    }
+
+
+def render_metrics() -> str:
+    if not METRICS_MULTIPROC_DIR:
+        return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+    merged = _collect()
+    return "\n".join(metric.render(merged[metric.name]) for metric in REGISTRY) + "\n"
+
+
+def reset_multiprocess_dir() -> None:
+    """Esvazia METRICS_MULTIPROC_DIR (início do servidor: pids de execuções anteriores se repetem)."""
+    os.makedirs(METRICS_MULTIPROC_DIR, exist_ok=True)
+    for filename in os.listdir(METRICS_MULTIPROC_DIR):
+        if filename != LOCK_FILE:
+            os.remove(os.path.join(METRICS_MULTIPROC_DIR, filename))
+
+
+def archive_process(pid: int) -> None:
+    """
+    Junta contadores e histogramas de um worker que terminou em archive.json
+    e remove o arquivo dele (chamado pelo master do gunicorn em child_exit).
+    """
+    path = _worker_file(pid)
+    if not os.path.exists(path):
+        return
+
+    with _locked(exclusive=True):
+        archive_path = os.path.join(METRICS_MULTIPROC_DIR, ARCHIVE_FILE)
+        archive, worker = _read(archive_path), _read(path)
+        merged = {}
+        for metric in REGISTRY:
+            if isinstance(metric, Gauge):
+                continue
+            merged[metric.name] = metric.merge([
+                (0, False, archive.get(metric.name, {})),
+                (pid, False, worker.get(metric.name, {})),
+            ])
+        _write(archive_path, merged)
+        os.remove(path)
+
+
+async def _flush_loop() -> None:
+    while True:
+        await asyncio.sleep(METRICS_FLUSH_SECONDS)
+        write_snapshot()
+
+
+_flush_task: Optional[asyncio.Task] = None
+
+
+def start_flush() -> None:
+    global _flush_task
+    if METRICS_ENABLED and METRICS_MULTIPROC_DIR and _flush_task is None:
+        write_snapshot()
+        _flush_task = asyncio.get_running_loop().create_task(_flush_loop())
+
+
+async def stop_flush() -> None:
+    global _flush_task
+    if _flush_task is None:
+        return
+    _flush_task.cancel()
+    try:
+        await _flush_task
+    except asyncio.CancelledError:
+        pass
+    _flush_task = None
+    write_snapshot()
+
+
+def _address(address: Optional[Tuple[str, int]]) -> str:
+    return f"{address[0]}:{address[1]}" if address else ""
+
+
+def _command_collection(event: monitoring.CommandStartedEvent) -> str:
+    # Em find/insert/update/aggregate... o valor do comando é a coleção; em getMore é o cursor
+    collection = event.command.get(event.command_name)
+    if isinstance(collection, str):
+        return collection
+    collection = event.command.get("collection")
+    return collection if isinstance(collection, str) else ""
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    def __init__(self):
+        self._pending: Dict[Tuple[Any, int], str] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        self._pending[(event.connection_id, event.request_id)] = _command_collection(event)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        collection = self._pending.pop((event.connection_id, event.request_id), "")
+        mongo_command_duration_seconds.observe(event.duration_micros / 1_000_000, collection, event.command_name)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        collection = self._pending.pop((event.connection_id, event.request_id), "")
+        mongo_command_duration_seconds.observe(event.duration_micros / 1_000_000, collection, event.command_name)
+        mongo_command_failures_total.inc(collection, event.command_name)
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Métricas do pool de um cliente ("main" ou "heavy", ver app.core.db)."""
+
+    def __init__(self, client: str):
+        self.client = client
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        mongo_pool_waiting.inc(self.client, _address(event.address))
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        address = _address(event.address)
+        mongo_pool_waiting.dec(self.client, address)
+        mongo_pool_wait_seconds.observe(event.duration, self.client, address)
+        mongo_pool_checked_out.inc(self.client, address)
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        mongo_pool_checked_out.dec(self.client, _address(event.address))
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        address = _address(event.address)
+        mongo_pool_waiting.dec(self.client, address)
+        mongo_pool_wait_seconds.observe(event.duration, self.client, address)
+        mongo_pool_checkout_failures_total.inc(self.client, address, str(event.reason))
+
+    # Demais eventos do pool não são medidos
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        pass
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        pass
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        pass
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        pass
+
+
+def mongo_event_listeners(client: str = "main") -> list:
+    """Listeners a registrar em um cliente do MongoDB (nenhum com as métricas desligadas)."""
+    if not METRICS_ENABLED:
+        return []
+    return [MongoCommandListener(), MongoPoolListener(client)]
@@ -0,0 +1,215 @@
+"""
+Migrações versionadas do banco (índices e ajustes de esquema)
+
+As migrações rodam uma única vez, pelo comando `python -m app.cli migrate`
+(no entrypoint do container, antes de subir os workers). Cada migração
+aplicada fica registrada em `schema_migrations`; a versão do esquema é a
+maior versão aplicada. Os workers da API apenas conferem, no startup, se o
+banco está na versão esperada pelo código.
+
+Para alterar índices ou dados, acrescente uma migração ao final de
+MIGRATIONS com a próxima versão; nunca altere uma migração já aplicada.
+Por isso cada migração lista os próprios índices em vez de aplicar a
+especificação viva (app.core.indexes.INDEXES), que muda com as consultas.
+"""
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Any, List, NamedTuple, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from app.core.db import db
+from app.core.indexes import IndexSpec, apply_indexes, drop_indexes
+from app.crud.card_prices import record_prices
+
+LOCK_ID = "migrations"
+LOCK_TIMEOUT = timedelta(minutes=30)
+PRICE_HISTORY_BATCH_SIZE = 1000
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[], Awaitable[None]]
+
+
+V1_INDEXES: Dict[str, List[IndexSpec]] = {
+    "cards": [
+        IndexSpec([("scryfall_id", 1)], "busca por scryfall_id", unique=True),
+        IndexSpec([("name", 1)], "busca por nome"),
+        IndexSpec([("colors", 1)], "busca por cores"),
+        IndexSpec([("rarity", 1)], "busca por raridade"),
+        IndexSpec([("type_line", 1)], "busca por tipo"),
+        IndexSpec([("oracle_id", 1)], "impressões de uma carta"),
+    ],
+    "decks": [
+        IndexSpec([("name", 1)], "busca por nome", unique=True),
+        IndexSpec([("format", 1)], "listagem por formato"),
+        IndexSpec([("created_at", 1)], "listagem ordenada por created_at"),
+        IndexSpec([("cards.scryfall_id", 1)], "decks que usam uma carta"),
+        IndexSpec([("lsh_bands", 1)], "candidatos a deck similar"),
+    ],
+    "deck_history": [
+        IndexSpec([("deck_id", 1), ("version", 1)], "versões de um deck", unique=True),
+        IndexSpec([("deck_id", 1), ("at", 1)], "estado do deck em uma data"),
+    ],
+    "card_pairs": [
+        IndexSpec([("format", 1), ("card", 1), ("other", 1)], "upsert dos pares", unique=True),
+        IndexSpec([("format", 1), ("card", 1), ("count", -1)], "parceiros de uma carta"),
+    ],
+    "card_counts": [
+        IndexSpec([("format", 1), ("card", 1)], "decks por carta no formato", unique=True),
+    ],
+}
+
+V2_INDEXES: Dict[str, List[IndexSpec]] = {
+    "cards": [
+        IndexSpec([("colors", 1), ("rarity", 1), ("type_line", 1)], "busca por cores + raridade + tipo"),
+        IndexSpec([("rarity", 1), ("type_line", 1)], "busca por raridade + tipo"),
+    ],
+    "decks": [
+        IndexSpec([("format", 1), ("created_at", -1)], "listagem e contagem por formato"),
+        IndexSpec([("legality.valid", 1), ("created_at", -1)], "listagem por validade"),
+        IndexSpec([("cards.scryfall_id", 1), ("_id", 1)], "decks que usam uma carta"),
+    ],
+    "deck_history": [
+        IndexSpec([("deck_id", 1), ("version", 1), ("at", 1)], "estado do deck em uma data"),
+    ],
+}
+
+# Índices simples cobertos pelos compostos da migração 2 (prefixo)
+V2_SUPERSEDED_INDEXES: Dict[str, List[str]] = {
+    "cards": ["colors_1", "rarity_1"],
+    "decks": ["format_1", "cards.scryfall_id_1"],
+    "deck_history": ["deck_id_1_at_1"],
+}
+
+V4_INDEXES: Dict[str, List[IndexSpec]] = {
+    "card_price_history": [
+        IndexSpec([("scryfall_id", 1), ("month", 1)], "histórico de preços por intervalo de meses", unique=True),
+    ],
+}
+
+
+async def _initial_indexes() -> None:
+    await apply_indexes(V1_INDEXES)
+
+
+async def _compound_indexes() -> None:
+    await apply_indexes(V2_INDEXES)
+    await drop_indexes(V2_SUPERSEDED_INDEXES)
+
+
+async def _query_cache_ttl() -> None:
+    # Entradas do cache compartilhado das buscas (QUERY_CACHE_BACKEND=mongo) expiram em expires_at
+    await db.query_cache.create_index("expires_at", expireAfterSeconds=0)
+
+
+async def _price_history() -> None:
+    # Índice dos buckets e um primeiro ponto com os preços atuais de cada carta, base do histórico
+    await apply_indexes(V4_INDEXES)
+    at = datetime.utcnow()
+    batch = []
+    async for card in db.cards.find({}, {"_id": 0, "scryfall_id": 1, "prices": 1}):
+        batch.append(card)
+        if len(batch) >= PRICE_HISTORY_BATCH_SIZE:
+            await record_prices(batch, at)
+            batch = []
+    if batch:
+        await record_prices(batch, at)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Índices de cartas, decks, histórico, co-ocorrência e assinaturas LSH", _initial_indexes),
+    Migration(2, "Índices compostos pelas consultas reais (app.core.indexes.INDEXES); remove os simples substituídos", _compound_indexes),
+    Migration(3, "Índice TTL do cache compartilhado das buscas de cartas (query_cache)", _query_cache_ttl),
+    Migration(4, "Histórico de preços: índice dos buckets mensais e preços atuais como primeiro ponto", _price_history),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+
+class MigrationLockError(RuntimeError):
+    pass
+
+
+async def get_schema_version() -> int:
+    latest = await db.schema_migrations.find_one({}, sort=[("_id", -1)])
+    return latest["_id"] if latest else 0
+
+
+async def verify_schema_version() -> int:
+    """
+    Confere se o banco já recebeu todas as migrações do código. Versões
+    maiores (banco migrado por um deploy mais novo) são aceitas, já que as
+    migrações só acrescentam índices e campos.
+    """
+    version = await get_schema_version()
+    if version < SCHEMA_VERSION:
+        raise SchemaVersionError(
+            f"Esquema do banco na versão {version}, esperado {SCHEMA_VERSION}: "
+            "rode 'python -m app.cli migrate' antes de iniciar a API"
+        )
+    return version
+
+
+async def _acquire_lock(owner: str) -> None:
+    now = datetime.utcnow()
+    try:
+        await db.schema_lock.insert_one({"_id": LOCK_ID, "owner": owner, "at": now})
+        return
+    except DuplicateKeyError:
+        pass
+
+    # Trava abandonada (processo que morreu no meio da migração)
+    stale = await db.schema_lock.find_one_and_update(
+        {"_id": LOCK_ID, "at": {"$lt": now - LOCK_TIMEOUT}},
+        {"$set": {"owner": owner, "at": now}}
+    )
+    if not stale:
+        lock = await db.schema_lock.find_one({"_id": LOCK_ID}) or {}
+        raise MigrationLockError(
+            f"Migração já em andamento por '{lock.get('owner')}' desde {lock.get('at')}"
+        )
+
+
+async def run_migrations(target: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Aplica, em ordem, as migrações ainda não registradas até `target`
+    (padrão: a última). Apenas um processo migra por vez (trava em
+    `schema_lock`). Retorna as migrações aplicadas nesta execução.
+    """
+    target = SCHEMA_VERSION if target is None else target
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    await _acquire_lock(owner)
+
+    applied = []
+    try:
+        current = await get_schema_version()
+        for migration in MIGRATIONS:
+            if migration.version <= current or migration.version > target:
+                continue
+
+            start = time.perf_counter()
+            await migration.apply()
+            duration_ms = round((time.perf_counter() - start) * 1000, 1)
+
+            record = {
+                "_id": migration.version,
+                "description": migration.description,
+                "applied_at": datetime.utcnow(),
+                "duration_ms": duration_ms,
+                "applied_by": owner,
+            }
+            await db.schema_migrations.insert_one(record)
+            applied.append(record)
+    finally:
+        await db.schema_lock.delete_one({"_id": LOCK_ID, "owner": owner})
+
+    return applied
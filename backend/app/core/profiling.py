@@ -0,0 +1,346 @@
+"""
+Diagnóstico de requisições lentas
+
+- Spans por requisição: tempo somado dos comandos do MongoDB (db), das
+  chamadas à Scryfall (upstream) e da serialização da resposta (do retorno
+  da rota até o último byte). Guardados em um ContextVar; o Motor copia o
+  contexto para as threads onde roda o pymongo, então o listener de comandos
+  enxerga o span da requisição que fez a consulta.
+- Log de requisições lentas: requisições acima de SLOW_REQUEST_MS são
+  registradas (logger "app.slow") com os spans.
+- Consultas lentas: comandos de leitura acima de SLOW_QUERY_MS são
+  registrados com o formato do filtro (valores trocados por "?") e, uma vez
+  por formato, com o resumo do explain (plano vencedor, chaves e documentos
+  examinados).
+- Profiler por amostragem: amostra a pilha da thread do event loop durante
+  uma requisição (`?profile=1` com o header X-Admin-Token).
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Dict, Any, Deque, List, Optional, Tuple
+
+from pymongo import monitoring
+
+from app.core.config import ADMIN_TOKEN, SLOW_QUERY_MS, SLOW_REQUEST_MS
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger("app.slow")
+
+SLOW_LOG_SIZE = 100
+PROFILE_INTERVAL_SECONDS = 0.002
+PROFILE_TOP = 30
+
+# Comando -> campo com o filtro (ou pipeline) da consulta
+QUERY_FIELDS = {
+    "find": "filter",
+    "aggregate": "pipeline",
+    "count": "query",
+    "distinct": "query",
+    "findAndModify": "query",
+}
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct"}
+# Campos do comando que não podem ir dentro de um explain
+COMMAND_SESSION_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction", "readConcern", "writeConcern"}
+
+slow_requests: Deque[Dict[str, Any]] = deque(maxlen=SLOW_LOG_SIZE)
+slow_queries: Deque[Dict[str, Any]] = deque(maxlen=SLOW_LOG_SIZE)
+
+_explained_shapes = LRUCache(maxsize=256)
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+class RequestSpans:
+    __slots__ = ("start", "endpoint_done", "db", "db_commands", "upstream", "upstream_calls")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.endpoint_done: Optional[float] = None
+        self.db = 0.0
+        self.db_commands = 0
+        self.upstream = 0.0
+        self.upstream_calls = 0
+
+    def summary(self, end: float) -> Dict[str, Any]:
+        return {
+            "total_ms": round((end - self.start) * 1000, 2),
+            "db_ms": round(self.db * 1000, 2),
+            "db_commands": self.db_commands,
+            "upstream_ms": round(self.upstream * 1000, 2),
+            "upstream_calls": self.upstream_calls,
+            "serialize_ms": round((end - self.endpoint_done) * 1000, 2) if self.endpoint_done else None,
+        }
+
+
+current_spans: ContextVar[Optional[RequestSpans]] = ContextVar("current_spans", default=None)
+
+
+def add_upstream_time(seconds: float) -> None:
+    spans = current_spans.get()
+    if spans is not None:
+        spans.upstream += seconds
+        spans.upstream_calls += 1
+
+
+def mark_endpoint_done() -> None:
+    spans = current_spans.get()
+    if spans is not None:
+        spans.endpoint_done = time.perf_counter()
+
+
+def record_request(method: str, route: str, status: str, spans: RequestSpans, end: float) -> None:
+    if not SLOW_REQUEST_MS or (end - spans.start) * 1000 < SLOW_REQUEST_MS:
+        return
+    entry = {"method": method, "route": route, "status": status, **spans.summary(end)}
+    slow_requests.append(entry)
+    logger.warning("Requisição lenta: %s", entry)
+
+
+def query_shape(value: Any) -> Any:
+    """
+    Formato de um filtro do MongoDB: mantém campos e operadores e troca os
+    valores por "?" (listas de valores viram ["?"]).
+
+    Exemplo:
+        >>> query_shape({"name": {"$regex": "bolt", "$options": "i"}, "colors": {"$all": ["R"]}})
+        {"name": {"$regex": "?", "$options": "?"}, "colors": {"$all": ["?"]}}
+    """
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        if any(isinstance(item, (dict, list)) for item in value):
+            return [query_shape(item) for item in value]
+        return ["?"] if value else []
+    return "?"
+
+
+def _plan_stages(plan: Optional[Dict[str, Any]]) -> List[str]:
+    stages = []
+    while plan:
+        stage = plan.get("stage", "?")
+        if plan.get("indexName"):
+            stage += f"({plan['indexName']})"
+        stages.append(stage)
+        children = plan.get("inputStages") or ([plan["inputStage"]] if plan.get("inputStage") else [])
+        plan = children[0] if children else None
+    return stages
+
+
+def explain_summary(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Resumo de um explain em executionStats: estágios do plano vencedor (do
+    topo para a folha) e quantidade de chaves e documentos examinados.
+    """
+    # Em aggregate o plano da consulta fica no primeiro estágio ($cursor)
+    if "queryPlanner" not in explain and explain.get("stages"):
+        explain = explain["stages"][0].get("$cursor", {})
+
+    winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+    stats = explain.get("executionStats", {})
+    return {
+        "plan": " <- ".join(_plan_stages(winning_plan.get("queryPlan", winning_plan))),
+        "returned": stats.get("nReturned"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "execution_ms": stats.get("executionTimeMillis"),
+    }
+
+
+async def _explain(database: str, command: Dict[str, Any], entry: Dict[str, Any]) -> None:
+    from app.core.db import client
+
+    try:
+        explain = await client[database].command({"explain": command, "verbosity": "executionStats"})
+    except Exception as e:
+        entry["explain"] = {"error": str(e)}
+        return
+    entry["explain"] = explain_summary(explain)
+    logger.warning("Explain da consulta lenta: %s", entry)
+
+
+def _schedule_explain(shape_key: Tuple, database: str, command: Dict[str, Any], entry: Dict[str, Any]) -> None:
+    # Roda no event loop: um explain por formato de consulta, os seguintes só entram no log
+    if _explained_shapes.get(shape_key):
+        return
+    _explained_shapes.set(shape_key, True)
+    asyncio.ensure_future(_explain(database, command, entry))
+
+
+def bind_loop(loop: asyncio.AbstractEventLoop) -> None:
+    """Event loop onde os explains das consultas lentas são agendados."""
+    global _loop
+    _loop = loop
+
+
+class SlowQueryListener(monitoring.CommandListener):
+    """
+    Soma o tempo dos comandos no span da requisição e registra as consultas
+    acima de SLOW_QUERY_MS.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple[Any, int], monitoring.CommandStartedEvent] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name in QUERY_FIELDS:
+            self._pending[(event.connection_id, event.request_id)] = event
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finished(event)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finished(event)
+
+    def _finished(self, event: Any) -> None:
+        started = self._pending.pop((event.connection_id, event.request_id), None)
+        seconds = event.duration_micros / 1_000_000
+
+        spans = current_spans.get()
+        if spans is not None:
+            spans.db += seconds
+            spans.db_commands += 1
+
+        if started is None or not SLOW_QUERY_MS or seconds * 1000 < SLOW_QUERY_MS:
+            return
+
+        command = started.command
+        shape = query_shape(command.get(QUERY_FIELDS[started.command_name]) or {})
+        entry = {
+            "collection": command.get(started.command_name),
+            "command": started.command_name,
+            "duration_ms": round(seconds * 1000, 2),
+            "shape": shape,
+            "skip": command.get("skip"),
+            "limit": command.get("limit"),
+        }
+        slow_queries.append(entry)
+        logger.warning("Consulta lenta: %s", entry)
+
+        if started.command_name not in EXPLAINABLE_COMMANDS or _loop is None:
+            return
+        if any("$out" in stage or "$merge" in stage for stage in command.get("pipeline") or []):
+            return
+
+        explain_command = {
+            key: value for key, value in command.items()
+            if not key.startswith("$") and key not in COMMAND_SESSION_FIELDS
+        }
+        shape_key = (started.database_name, started.command_name, repr(entry["collection"]), repr(shape))
+        _loop.call_soon_threadsafe(_schedule_explain, shape_key, started.database_name, explain_command, entry)
+
+
+def profiling_event_listeners() -> list:
+    """Listener a registrar no cliente do MongoDB (nenhum se o diagnóstico estiver desligado)."""
+    if not (SLOW_REQUEST_MS or SLOW_QUERY_MS or ADMIN_TOKEN):
+        return []
+    return [SlowQueryListener()]
+
+
+# sys.setswitchinterval vale para o processo todo: com profilers simultâneos, o
+# intervalo original só volta quando o último termina
+_switch_lock = threading.Lock()
+_switch_users = 0
+_switch_original = 0.0
+
+
+def _reduce_switch_interval(interval: float) -> None:
+    global _switch_users, _switch_original
+    with _switch_lock:
+        if _switch_users == 0:
+            _switch_original = sys.getswitchinterval()
+        _switch_users += 1
+        sys.setswitchinterval(min(interval, sys.getswitchinterval()))
+
+
+def _restore_switch_interval() -> None:
+    global _switch_users
+    with _switch_lock:
+        _switch_users -= 1
+        if _switch_users == 0:
+            sys.setswitchinterval(_switch_original)
+
+
+class SamplingProfiler:
+    """
+    Amostra a pilha de uma thread (a do event loop) a cada `interval`
+    segundos em uma thread separada. As amostras incluem as outras
+    requisições que o event loop atendeu no mesmo período; amostras paradas
+    no select do event loop contam como espera por I/O.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        # A thread de amostragem só roda quando recebe o GIL: com o intervalo
+        # padrão de troca (5 ms) perderia amostras de código que não libera o GIL
+        _reduce_switch_interval(self.interval / 2)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        _restore_switch_interval()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            self._stacks[tuple(reversed(stack))] += 1
+
+    def report(self, top: int = PROFILE_TOP) -> Dict[str, Any]:
+        samples = sum(self._stacks.values())
+        own: Counter = Counter()
+        cumulative: Counter = Counter()
+        idle = 0
+        for stack, count in self._stacks.items():
+            if stack and stack[-1][2] == "select" and stack[-1][0].endswith("selectors.py"):
+                idle += count
+            own[stack[-1]] += count
+            for function in set(stack):
+                cumulative[function] += count
+
+        def describe(function: Tuple[str, int, str], count: int) -> Dict[str, Any]:
+            filename, line, name = function
+            return {
+                "function": name,
+                "file": _short_path(filename),
+                "line": line,
+                "samples": count,
+                "percent": round(100 * count / samples, 1) if samples else 0.0,
+            }
+
+        return {
+            "interval_ms": self.interval * 1000,
+            "samples": samples,
+            "idle_percent": round(100 * idle / samples, 1) if samples else 0.0,
+            "self": [describe(function, count) for function, count in own.most_common(top)],
+            "cumulative": [describe(function, count) for function, count in cumulative.most_common(top)],
+            "stacks": [
+                {
+                    "stack": ";".join(f"{_short_path(filename)}:{name}" for filename, _, name in stack),
+                    "samples": count,
+                }
+                for stack, count in self._stacks.most_common(top)
+            ],
+        }
+
+
+def _short_path(filename: str) -> str:
+    if "site-packages/" in filename:
+        return filename.rsplit("site-packages/", 1)[1]
+    if "/app/" in filename:
+        return "app/" + filename.rsplit("/app/", 1)[1]
+    return filename.rsplit("/", 1)[-1]
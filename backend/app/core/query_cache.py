@@ -0,0 +1,171 @@
+"""
+Cache dos resultados das buscas de cartas (search_cards e count_cards)
+
+A chave é o filtro normalizado mais a página (skip, limit) e a geração atual
+da coleção de cartas. A geração é um contador guardado no banco
+(`cache_generations`), incrementado por toda escrita em app/crud/card.py;
+entradas de gerações anteriores nunca mais são lidas, então o cache não
+precisa ser invalidado entrada por entrada e vale para todos os workers.
+
+Backends (QUERY_CACHE_BACKEND):
+
+- memory: LRU por processo, até QUERY_CACHE_SIZE entradas
+- mongo: coleção `query_cache`, compartilhada entre workers; as entradas
+  expiram após QUERY_CACHE_TTL_SECONDS (índice TTL da migração 3)
+- off: sem cache
+
+Acertos e faltas são contados por consulta e formato do filtro (campos
+usados, ex: colors+rarity) em GET /decks/admin/query-cache e em /metrics.
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.config import QUERY_CACHE_BACKEND, QUERY_CACHE_SIZE, QUERY_CACHE_TTL_SECONDS
+from app.core.db import db
+from app.core.metrics import query_cache_requests_total
+from app.utils.cache import LRUCache
+
+GENERATIONS_COLLECTION = "cache_generations"
+CACHE_COLLECTION = "query_cache"
+
+
+class MemoryCacheBackend:
+    name = "memory"
+
+    def __init__(self, maxsize: int):
+        self._cache = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            return self._cache.get(key)
+
+    async def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._cache.set(key, value)
+
+    def size(self) -> Optional[int]:
+        return len(self._cache)
+
+
+class MongoCacheBackend:
+    name = "mongo"
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl = timedelta(seconds=ttl_seconds)
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = await db[CACHE_COLLECTION].find_one({"_id": key})
+        # O TTL do MongoDB remove as entradas vencidas a cada minuto
+        if entry is None or entry["expires_at"] <= datetime.utcnow():
+            return None
+        return entry["value"]
+
+    async def set(self, key: str, value: Any) -> None:
+        entry = {"value": value, "expires_at": datetime.utcnow() + self.ttl}
+        await db[CACHE_COLLECTION].replace_one({"_id": key}, entry, upsert=True)
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+def _create_backend():
+    if QUERY_CACHE_BACKEND == "memory":
+        return MemoryCacheBackend(QUERY_CACHE_SIZE)
+    if QUERY_CACHE_BACKEND == "mongo":
+        return MongoCacheBackend(QUERY_CACHE_TTL_SECONDS)
+    return None
+
+
+backend = _create_backend()
+
+# (consulta, formato) -> [acertos, faltas], por processo
+_stats: Dict[tuple, list] = {}
+_stats_lock = threading.Lock()
+
+
+async def get_generation(collection: str) -> int:
+    state = await db[GENERATIONS_COLLECTION].find_one({"_id": collection})
+    return state["generation"] if state else 0
+
+
+async def bump_generation(collection: str) -> None:
+    """Chamado depois de toda escrita na coleção: descarta os resultados em cache."""
+    if backend is None:
+        return
+    await db[GENERATIONS_COLLECTION].update_one(
+        {"_id": collection}, {"$inc": {"generation": 1}}, upsert=True
+    )
+
+
+def query_shape(filter_query: Dict[str, Any]) -> str:
+    return "+".join(sorted(filter_query)) or "all"
+
+
+def _cache_key(query: str, generation: int, filter_query: Dict[str, Any], page: Dict[str, Any]) -> str:
+    payload = json.dumps([query, generation, filter_query, page], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _record(query: str, shape: str, hit: bool) -> None:
+    with _stats_lock:
+        counts = _stats.setdefault((query, shape), [0, 0])
+        counts[0 if hit else 1] += 1
+    query_cache_requests_total.inc(query, shape, "hit" if hit else "miss")
+
+
+async def cached_query(
+    query: str,
+    collection: str,
+    filter_query: Dict[str, Any],
+    page: Dict[str, Any],
+    run: Callable[[], Awaitable[Any]]
+) -> Any:
+    """
+    Resultado de `run()` para o filtro e a página, lido do cache quando a
+    coleção não mudou desde que foi guardado. Listas de documentos voltam
+    como cópias, já que as rotas alteram os documentos (ex: _id em string).
+    """
+    if backend is None:
+        return await run()
+
+    generation = await get_generation(collection)
+    key = _cache_key(query, generation, filter_query, page)
+    shape = query_shape(filter_query)
+
+    value = await backend.get(key)
+    if value is not None:
+        _record(query, shape, hit=True)
+        return [dict(document) for document in value] if isinstance(value, list) else value
+
+    _record(query, shape, hit=False)
+    value = await run()
+    await backend.set(key, value)
+    return [dict(document) for document in value] if isinstance(value, list) else value
+
+
+async def cache_report() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = sorted(_stats.items())
+
+    shapes = []
+    for (query, shape), (hits, misses) in stats:
+        shapes.append({
+            "query": query,
+            "shape": shape,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+        })
+
+    return {
+        "backend": QUERY_CACHE_BACKEND,
+        "pid": os.getpid(),
+        "entries": backend.size() if backend else 0,
+        "generation": await get_generation("cards"),
+        "shapes": shapes,
+    }
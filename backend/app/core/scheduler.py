@@ -0,0 +1,196 @@
+"""
+Agendador de tarefas periódicas em segundo plano, dentro do processo da API
+
+Todo worker roda o laço do agendador, mas só o líder executa as tarefas: a
+liderança é uma concessão (lease) em `scheduler_leader`, renovada a cada
+SCHEDULER_TICK_SECONDS e assumida por outro worker se não for renovada em
+SCHEDULER_LEASE_SECONDS (ex: o líder morreu). O estado de cada tarefa
+(próxima execução, última execução, erro, estado próprio da tarefa) fica
+em `scheduled_jobs`, então sobrevive a restarts e pode ser lido por
+qualquer worker (GET /decks/admin/jobs).
+
+Uma tarefa recebe o estado salvo e devolve um JobOutcome com o novo estado,
+um resumo da execução e, opcionalmente, quando deve rodar de novo. As
+execuções devem ser curtas (bem abaixo da lease): tarefas longas avançam
+um lote por execução e guardam o progresso no estado.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Any, NamedTuple, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import SCHEDULER_LEASE_SECONDS, SCHEDULER_TICK_SECONDS
+from app.core.db import db
+
+logger = logging.getLogger("uvicorn.error")
+
+LEADER_ID = "scheduler"
+
+
+class JobOutcome(NamedTuple):
+    state: Dict[str, Any]
+    result: Dict[str, Any]
+    # Segundos até a próxima execução (None = intervalo da tarefa)
+    next_run_in: Optional[float] = None
+
+
+class Job(NamedTuple):
+    name: str
+    description: str
+    interval_seconds: float
+    run: Callable[[Dict[str, Any]], Awaitable[JobOutcome]]
+
+
+class JobNotFoundError(KeyError):
+    pass
+
+
+JOBS: Dict[str, Job] = {}
+
+_owner = f"{socket.gethostname()}:{os.getpid()}"
+_task: Optional[asyncio.Task] = None
+
+
+def register(job: Job) -> None:
+    JOBS[job.name] = job
+
+
+def get_job(name: str) -> Job:
+    if name not in JOBS:
+        raise JobNotFoundError(name)
+    return JOBS[name]
+
+
+async def acquire_leadership() -> bool:
+    """Assume ou renova a liderança; False se outro worker tem a lease válida."""
+    now = datetime.utcnow()
+    try:
+        await db.scheduler_leader.find_one_and_update(
+            {"_id": LEADER_ID, "$or": [{"owner": _owner}, {"expires_at": {"$lt": now}}]},
+            {"$set": {"owner": _owner, "expires_at": now + timedelta(seconds=SCHEDULER_LEASE_SECONDS)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # O documento existe com a lease de outro worker
+        return False
+    return True
+
+
+async def release_leadership() -> None:
+    await db.scheduler_leader.delete_one({"_id": LEADER_ID, "owner": _owner})
+
+
+async def run_job(job: Job) -> Dict[str, Any]:
+    """Executa a tarefa uma vez e registra o resultado em `scheduled_jobs`."""
+    saved = await db.scheduled_jobs.find_one({"_id": job.name}) or {}
+    started_at = datetime.utcnow()
+    await db.scheduled_jobs.update_one(
+        {"_id": job.name},
+        {"$set": {"running": True, "owner": _owner, "last_started_at": started_at}},
+        upsert=True
+    )
+
+    start = time.perf_counter()
+    update: Dict[str, Any] = {"running": False}
+    increments = {"runs": 1}
+    next_run_in = job.interval_seconds
+    try:
+        outcome = await job.run(saved.get("state") or {})
+        update.update(state=outcome.state, last_status="ok", last_error=None, last_result=outcome.result)
+        if outcome.next_run_in is not None:
+            next_run_in = outcome.next_run_in
+    except Exception as e:
+        logger.exception("Tarefa '%s' falhou", job.name)
+        update.update(last_status="error", last_error=f"{type(e).__name__}: {e}")
+        increments["failures"] = 1
+
+    finished_at = datetime.utcnow()
+    update.update(
+        last_finished_at=finished_at,
+        last_duration_ms=round((time.perf_counter() - start) * 1000, 1),
+        next_run_at=finished_at + timedelta(seconds=next_run_in)
+    )
+    return await db.scheduled_jobs.find_one_and_update(
+        {"_id": job.name},
+        {"$set": update, "$inc": increments},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def run_due_jobs() -> None:
+    now = datetime.utcnow()
+    for job in JOBS.values():
+        saved = await db.scheduled_jobs.find_one({"_id": job.name}, {"next_run_at": 1})
+        if saved and saved.get("next_run_at") and saved["next_run_at"] > now:
+            continue
+        await run_job(job)
+        # A execução pode ter passado da lease: renova antes da próxima tarefa
+        if not await acquire_leadership():
+            return
+
+
+async def trigger_job(name: str) -> None:
+    """Antecipa a próxima execução; o líder a executa no próximo tick."""
+    get_job(name)
+    await db.scheduled_jobs.update_one(
+        {"_id": name}, {"$set": {"next_run_at": datetime.utcnow()}}, upsert=True
+    )
+
+
+async def get_jobs_status() -> Dict[str, Any]:
+    leader = await db.scheduler_leader.find_one({"_id": LEADER_ID}) or {}
+    saved = {job["_id"]: job async for job in db.scheduled_jobs.find({"_id": {"$in": list(JOBS)}})}
+
+    jobs = []
+    for job in JOBS.values():
+        status = saved.get(job.name, {})
+        status.pop("_id", None)
+        jobs.append({
+            "name": job.name,
+            "description": job.description,
+            "interval_seconds": job.interval_seconds,
+            "runs": status.pop("runs", 0),
+            "failures": status.pop("failures", 0),
+            **status,
+        })
+
+    expired = not leader or leader["expires_at"] < datetime.utcnow()
+    return {"leader": None if expired else leader["owner"], "worker": _owner, "jobs": jobs}
+
+
+async def _loop() -> None:
+    while True:
+        try:
+            if await acquire_leadership():
+                await run_due_jobs()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Erro no agendador de tarefas")
+        await asyncio.sleep(SCHEDULER_TICK_SECONDS)
+
+
+def start() -> None:
+    global _task
+    if _task is None:
+        _task = asyncio.get_running_loop().create_task(_loop())
+
+
+async def stop() -> None:
+    global _task
+    if _task is None:
+        return
+    _task.cancel()
+    try:
+        await _task
+    except asyncio.CancelledError:
+        pass
+    _task = None
+    await release_leadership()
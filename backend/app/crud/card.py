@@ -1,5 +1,36 @@
 from typing import Optional, Dict, Any, List
-from app.core.db import db
+from app.core.db import db, get_db
+from app.core.query_cache import bump_generation, cached_query
+from app.crud import card_prices
+from app.services.deck_stats import STATS_CARD_PROJECTION, stats_fields_changed
+
+# Campos de carta usados na hidratação de decks (evita trazer campos internos)
+DECK_CARD_PROJECTION = {
+    "name": 1,
+    "scryfall_id": 1,
+    "oracle_id": 1,
+    "mana_cost": 1,
+    "cmc": 1,
+    "type_line": 1,
+    "oracle_text": 1,
+    "power": 1,
+    "toughness": 1,
+    "colors": 1,
+    "color_identity": 1,
+    "rarity": 1,
+    "set_name": 1,
+    "set_code": 1,
+    "collector_number": 1,
+    "mtgo_id": 1,
+    "image_uris": 1,
+    "prices": 1,
+}
+
+# Versão anterior da carta nas escritas: campos das estatísticas dos decks e preços (histórico)
+PREVIOUS_CARD_PROJECTION = {
+    **{field: value for field, value in STATS_CARD_PROJECTION.items() if not field.startswith("prices.")},
+    "prices": 1,
+}
 
 
 async def get_card_by_scryfall_id(scryfall_id: str) -> Optional[Dict[str, Any]]:
@@ -7,22 +38,75 @@ async def get_card_by_scryfall_id(scryfall_id: str) -> Optional[Dict[str, Any]]:
     return card
 
 
-async def get_cards_by_scryfall_ids(scryfall_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+async def get_cards_by_scryfall_ids(
+    scryfall_ids: List[str],
+    projection: Optional[Dict[str, Any]] = None,
+    heavy_read: bool = False
+) -> Dict[str, Dict[str, Any]]:
     if not scryfall_ids:
         return {}
     
-    cursor = db.cards.find({"scryfall_id": {"$in": scryfall_ids}})
+    cursor = get_db(heavy_read).cards.find({"scryfall_id": {"$in": scryfall_ids}}, projection)
     cards = await cursor.to_list(length=None)
     
     return {card.get("scryfall_id"): card for card in cards}
 
 
+async def get_scryfall_ids_by_oracle_id(oracle_id: str) -> List[str]:
+    if not oracle_id:
+        return []
+    
+    scryfall_ids = await db.cards.distinct("scryfall_id", {"oracle_id": oracle_id})
+    return scryfall_ids
+
+
+async def get_scryfall_ids_after(after: Optional[str], limit: int) -> List[str]:
+    """Próximos scryfall_id em ordem, para percorrer o catálogo em lotes pelo índice único."""
+    query = {"scryfall_id": {"$gt": after}} if after else {}
+    
+    cursor = db.cards.find(query, {"_id": 0, "scryfall_id": 1}).sort("scryfall_id", 1).limit(limit)
+    return [card["scryfall_id"] async for card in cursor]
+
+
+async def get_card_names_by_keys(keys: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Nome e uma impressão (scryfall_id) para cada chave, que pode ser um
+    oracle_id ou, para cartas sem oracle_id, o próprio scryfall_id.
+    """
+    if not keys:
+        return {}
+    
+    cursor = db.cards.find(
+        {"$or": [{"oracle_id": {"$in": keys}}, {"scryfall_id": {"$in": keys}}]},
+        {"_id": 0, "name": 1, "scryfall_id": 1, "oracle_id": 1}
+    )
+    
+    key_set = set(keys)
+    names = {}
+    async for card in cursor:
+        key = card.get("oracle_id") if card.get("oracle_id") in key_set else card.get("scryfall_id")
+        names.setdefault(key, {"scryfall_id": card.get("scryfall_id"), "name": card.get("name")})
+    return names
+
+
 async def get_card_by_name(name: str) -> Optional[Dict[str, Any]]:
 
     card = await db.cards.find_one({"name": name})
     return card
 
 
+async def get_cards_by_names(
+    names: List[str],
+    projection: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    if not names:
+        return []
+    
+    cursor = db.cards.find({"name": {"$in": names}}, projection)
+    cards = await cursor.to_list(length=None)
+    return cards
+
+
 async def create_card(card_data: Dict[str, Any]) -> Dict[str, Any]:
 
     # Garantir que o scryfall_id está presente
@@ -36,6 +120,8 @@ async def create_card(card_data: Dict[str, Any]) -> Dict[str, Any]:
     
     # Inserir nova carta
     result = await db.cards.insert_one(card_data)
+    await bump_generation("cards")
+    await card_prices.record_prices([card_data])
     
     # Buscar e retornar a carta criada
     created_card = await db.cards.find_one({"_id": result.inserted_id})
@@ -49,24 +135,82 @@ async def create_or_update_card(card_data: Dict[str, Any]) -> Dict[str, Any]:
     
     scryfall_id = card_data["scryfall_id"]
     
-    result = await db.cards.update_one(
+    previous = await db.cards.find_one_and_update(
         {"scryfall_id": scryfall_id},
         {"$set": card_data},
+        projection=PREVIOUS_CARD_PROJECTION,
         upsert=True
     )
+    await bump_generation("cards")
+    
+    if "prices" in card_data and card_prices.prices_changed(previous, card_data):
+        await card_prices.record_prices([card_data])
+    
+    if stats_fields_changed(previous, card_data):
+        from app.crud.deck import refresh_deck_stats_for_cards
+        await refresh_deck_stats_for_cards([scryfall_id])
     
     card = await get_card_by_scryfall_id(scryfall_id)
     return card
 
 
-async def search_cards(
+async def upsert_cards_bulk(cards_data: List[Dict[str, Any]]) -> int:
+    from pymongo import UpdateOne
+    
+    operations = [
+        UpdateOne(
+            {"scryfall_id": card_data["scryfall_id"]},
+            {"$set": card_data},
+            upsert=True
+        )
+        for card_data in cards_data
+        if card_data.get("scryfall_id")
+    ]
+    
+    if not operations:
+        return 0
+    
+    previous_map = await get_cards_by_scryfall_ids(
+        [card_data["scryfall_id"] for card_data in cards_data if card_data.get("scryfall_id")],
+        PREVIOUS_CARD_PROJECTION
+    )
+    
+    result = await db.cards.bulk_write(operations, ordered=False)
+    if result.upserted_count or result.modified_count:
+        await bump_generation("cards")
+    
+    changed_ids = [
+        card_data["scryfall_id"] for card_data in cards_data
+        if card_data.get("scryfall_id")
+        and stats_fields_changed(previous_map.get(card_data["scryfall_id"]), card_data)
+    ]
+    if changed_ids:
+        from app.crud.deck import refresh_deck_stats_for_cards
+        await refresh_deck_stats_for_cards(changed_ids)
+    
+    await card_prices.record_prices([
+        card_data for card_data in cards_data
+        if card_data.get("scryfall_id") and "prices" in card_data
+        and card_prices.prices_changed(previous_map.get(card_data["scryfall_id"]), card_data)
+    ])
+    
+    return result.upserted_count + result.modified_count
+
+
+async def get_existing_scryfall_ids(scryfall_ids: List[str]) -> set:
+    if not scryfall_ids:
+        return set()
+    
+    existing = await db.cards.distinct("scryfall_id", {"scryfall_id": {"$in": scryfall_ids}})
+    return set(existing)
+
+
+def _card_search_filter(
     name: Optional[str] = None,
     colors: Optional[list] = None,
     type_line: Optional[str] = None,
-    rarity: Optional[str] = None,
-    limit: int = 50,
-    skip: int = 0
-) -> list[Dict[str, Any]]:
+    rarity: Optional[str] = None
+) -> Dict[str, Any]:
 
     filter_query = {}
     
@@ -75,8 +219,8 @@ async def search_cards(
         filter_query["name"] = {"$regex": name, "$options": "i"}
     
     if colors:
-        # Busca cartas que contenham todas as cores especificadas
-        filter_query["colors"] = {"$all": colors}
+        # Busca cartas que contenham todas as cores especificadas (a ordem não importa)
+        filter_query["colors"] = {"$all": sorted(set(colors))}
     
     if type_line:
         # Busca parcial no type_line
@@ -85,15 +229,31 @@ async def search_cards(
     if rarity:
         filter_query["rarity"] = rarity.lower()
     
-    # Buscar cartas
-    cursor = db.cards.find(filter_query).skip(skip).limit(limit)
-    cards = await cursor.to_list(length=limit)
+    return filter_query
+
+
+async def search_cards(
+    name: Optional[str] = None,
+    colors: Optional[list] = None,
+    type_line: Optional[str] = None,
+    rarity: Optional[str] = None,
+    limit: int = 50,
+    skip: int = 0
+) -> list[Dict[str, Any]]:
+
+    filter_query = _card_search_filter(name, colors, type_line, rarity)
+    
+    async def run():
+        cursor = db.cards.find(filter_query).skip(skip).limit(limit)
+        return await cursor.to_list(length=limit)
     
+    cards = await cached_query("cards.search", "cards", filter_query, {"skip": skip, "limit": limit}, run)
     return cards
 
 
 async def get_all_cards() -> list[Dict[str, Any]]:
-    cursor = db.cards.find({})
+    # Catálogo inteiro: leitura pesada, fora do pool das rotas
+    cursor = get_db(heavy_read=True).cards.find({})
     cards = await cursor.to_list(length=None)
     return cards
 
@@ -105,20 +265,9 @@ async def count_cards(
     rarity: Optional[str] = None
 ) -> int:
 
-    filter_query = {}
-    
-    if name:
-        filter_query["name"] = {"$regex": name, "$options": "i"}
-    
-    if colors:
-        filter_query["colors"] = {"$all": colors}
+    filter_query = _card_search_filter(name, colors, type_line, rarity)
     
-    if type_line:
-        filter_query["type_line"] = {"$regex": type_line, "$options": "i"}
-    
-    if rarity:
-        filter_query["rarity"] = rarity.lower()
-    
-    count = await db.cards.count_documents(filter_query)
+    count = await cached_query(
+        "cards.count", "cards", filter_query, {}, lambda: db.cards.count_documents(filter_query)
+    )
     return count
-
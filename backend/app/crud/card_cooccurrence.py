@@ -0,0 +1,253 @@
+from collections import Counter
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+from app.core.db import db
+from app.core.indexes import INDEXES, apply_collection_indexes
+
+# As cartas são contadas por oracle_id (todas as impressões juntas); cartas
+# sem oracle_id usam o próprio scryfall_id como chave
+CARD_KEY_PROJECTION = {"_id": 0, "scryfall_id": 1, "oracle_id": 1}
+
+# Parceiros mais frequentes considerados no cálculo do lift
+RELATED_CANDIDATES = 2000
+
+STAGING_SUFFIX = "_build"
+WRITE_CHUNK_SIZE = 5000
+
+
+async def create_cooccurrence_indexes(pairs=None, counts=None) -> None:
+    pairs = db.card_pairs if pairs is None else pairs
+    counts = db.card_counts if counts is None else counts
+
+    await apply_collection_indexes(pairs, INDEXES["card_pairs"])
+    await apply_collection_indexes(counts, INDEXES["card_counts"])
+
+
+async def get_card_keys(scryfall_ids: Iterable[str]) -> Dict[str, str]:
+    scryfall_ids = list(scryfall_ids)
+    if not scryfall_ids:
+        return {}
+
+    cursor = db.cards.find({"scryfall_id": {"$in": scryfall_ids}}, CARD_KEY_PROJECTION)
+    return {
+        card["scryfall_id"]: card.get("oracle_id") or card["scryfall_id"]
+        async for card in cursor
+    }
+
+
+def deck_card_keys(deck: Optional[Dict[str, Any]], keys_map: Dict[str, str]) -> set:
+    if not deck:
+        return set()
+    return {
+        keys_map[card.get("scryfall_id")]
+        for card in deck.get("cards", [])
+        if card.get("scryfall_id") in keys_map
+    }
+
+
+def _pairs_touching(changed: set, universe: set) -> Iterable[Tuple[str, str]]:
+    # Pares não ordenados (a < b) com ao menos uma carta em `changed`
+    for a in changed:
+        for b in universe:
+            if a == b or (b in changed and b < a):
+                continue
+            yield (a, b) if a < b else (b, a)
+
+
+def _deck_scryfall_ids(deck: Optional[Dict[str, Any]]) -> set:
+    if not deck:
+        return set()
+    return {card.get("scryfall_id") for card in deck.get("cards", []) if card.get("scryfall_id")}
+
+
+async def apply_deck_changes(
+    changes: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]
+) -> None:
+    """
+    Atualiza o índice de co-ocorrência a partir de pares (antes, depois) de
+    decks; None representa deck inexistente (criação ou remoção). Apenas os
+    pares que envolvem cartas adicionadas ou removidas são tocados, com todos
+    os incrementos agregados em um único bulk_write.
+    """
+    changes = [
+        (before, after) for before, after in changes
+        if (before or {}).get("format") != (after or {}).get("format")
+        or _deck_scryfall_ids(before) != _deck_scryfall_ids(after)
+    ]
+    if not changes:
+        return
+
+    scryfall_ids = set()
+    for before, after in changes:
+        scryfall_ids |= _deck_scryfall_ids(before) | _deck_scryfall_ids(after)
+    keys_map = await get_card_keys(scryfall_ids)
+
+    pair_deltas: Counter = Counter()
+    card_deltas: Counter = Counter()
+
+    def account(format: str, removed: set, old_keys: set, added: set, new_keys: set) -> None:
+        for key in removed:
+            card_deltas[(format, key)] -= 1
+        for key in added:
+            card_deltas[(format, key)] += 1
+        for pair in _pairs_touching(removed, old_keys):
+            pair_deltas[(format, *pair)] -= 1
+        for pair in _pairs_touching(added, new_keys):
+            pair_deltas[(format, *pair)] += 1
+
+    for before, after in changes:
+        old_keys = deck_card_keys(before, keys_map)
+        new_keys = deck_card_keys(after, keys_map)
+        old_format = (before or {}).get("format")
+        new_format = (after or {}).get("format")
+
+        if before and after and old_format == new_format:
+            account(old_format, old_keys - new_keys, old_keys, new_keys - old_keys, new_keys)
+        else:
+            if before:
+                account(old_format, old_keys, old_keys, set(), set())
+            if after:
+                account(new_format, set(), set(), new_keys, new_keys)
+
+    await _write_deltas(pair_deltas, card_deltas)
+
+
+async def _write_deltas(pair_deltas: Counter, card_deltas: Counter) -> None:
+    from pymongo import UpdateOne, DeleteMany
+
+    pair_operations = []
+    touched: Dict[str, set] = {}
+    for (format, a, b), delta in pair_deltas.items():
+        if not delta:
+            continue
+        for card, other in ((a, b), (b, a)):
+            pair_operations.append(UpdateOne(
+                {"format": format, "card": card, "other": other},
+                {"$inc": {"count": delta}},
+                upsert=True
+            ))
+        if delta < 0:
+            touched.setdefault(format, set()).update((a, b))
+
+    count_operations = [
+        UpdateOne({"format": format, "card": card}, {"$inc": {"decks": delta}}, upsert=True)
+        for (format, card), delta in card_deltas.items()
+        if delta
+    ]
+
+    # Remove os contadores que chegaram a zero
+    for format, cards in touched.items():
+        pair_operations.append(DeleteMany(
+            {"format": format, "card": {"$in": list(cards)}, "count": {"$lte": 0}}
+        ))
+    if any(delta < 0 for delta in card_deltas.values()):
+        count_operations.append(DeleteMany({"decks": {"$lte": 0}}))
+
+    if pair_operations:
+        await db.card_pairs.bulk_write(pair_operations, ordered=True)
+    if count_operations:
+        await db.card_counts.bulk_write(count_operations, ordered=True)
+
+
+async def reset_staging() -> None:
+    await db[f"card_pairs{STAGING_SUFFIX}"].drop()
+    await db[f"card_counts{STAGING_SUFFIX}"].drop()
+
+
+async def write_staging(format: str, pair_counts: Counter, card_counts: Counter) -> int:
+    """
+    Grava as contagens de um formato nas coleções temporárias do rebuild,
+    em ambas as direções de cada par. Retorna o número de pares distintos.
+    """
+    pairs = db[f"card_pairs{STAGING_SUFFIX}"]
+    counts = db[f"card_counts{STAGING_SUFFIX}"]
+
+    chunk = []
+    for (a, b), count in pair_counts.items():
+        chunk.append({"format": format, "card": a, "other": b, "count": count})
+        chunk.append({"format": format, "card": b, "other": a, "count": count})
+        if len(chunk) >= WRITE_CHUNK_SIZE:
+            await pairs.insert_many(chunk, ordered=False)
+            chunk = []
+    if chunk:
+        await pairs.insert_many(chunk, ordered=False)
+
+    count_documents = [
+        {"format": format, "card": card, "decks": decks}
+        for card, decks in card_counts.items()
+    ]
+    if count_documents:
+        await counts.insert_many(count_documents, ordered=False)
+
+    return len(pair_counts)
+
+
+async def publish_staging() -> None:
+    """
+    Cria os índices nas coleções temporárias e as troca pelas coleções
+    em uso com rename, sem deixar o índice vazio durante o rebuild.
+    """
+    pairs = db[f"card_pairs{STAGING_SUFFIX}"]
+    counts = db[f"card_counts{STAGING_SUFFIX}"]
+
+    # create_index também cria as coleções quando nenhum deck foi gravado
+    await create_cooccurrence_indexes(pairs, counts)
+    await pairs.rename("card_pairs", dropTarget=True)
+    await counts.rename("card_counts", dropTarget=True)
+
+
+async def get_card_deck_count(key: str, format: str) -> int:
+    document = await db.card_counts.find_one({"format": format, "card": key}, {"decks": 1})
+    return document.get("decks", 0) if document else 0
+
+
+def _pairs_filter(key: str, format: str, min_count: int) -> Dict[str, Any]:
+    return {"format": format, "card": key, "count": {"$gte": min_count}}
+
+
+def _counts_filter(keys: List[str], format: str) -> Dict[str, Any]:
+    return {"format": format, "card": {"$in": keys}}
+
+
+async def get_related_cards(
+    key: str,
+    format: str,
+    limit: int = 20,
+    min_count: int = 2
+) -> List[Dict[str, Any]]:
+    """
+    Parceiros de uma carta no formato ordenados por lift:
+    lift = P(A e B) / (P(A) * P(B)) = pares * decks_formato / (decks_A * decks_B).
+    """
+    total_decks = await db.decks.count_documents({"format": format})
+    card_decks = await get_card_deck_count(key, format)
+    if not total_decks or not card_decks:
+        return []
+
+    cursor = db.card_pairs.find(
+        _pairs_filter(key, format, min_count),
+        {"_id": 0, "other": 1, "count": 1}
+    ).sort("count", -1).limit(RELATED_CANDIDATES)
+    partners = await cursor.to_list(length=RELATED_CANDIDATES)
+    if not partners:
+        return []
+
+    cursor = db.card_counts.find(
+        _counts_filter([partner["other"] for partner in partners], format),
+        {"_id": 0, "card": 1, "decks": 1}
+    )
+    partner_decks = {document["card"]: document["decks"] async for document in cursor}
+
+    related = []
+    for partner in partners:
+        other_decks = partner_decks.get(partner["other"])
+        if not other_decks:
+            continue
+        related.append({
+            "key": partner["other"],
+            "count": partner["count"],
+            "lift": round(partner["count"] * total_decks / (card_decks * other_decks), 4),
+            "confidence": round(partner["count"] / card_decks, 4)
+        })
+
+    related.sort(key=lambda item: (item["lift"], item["count"]), reverse=True)
+    return related[:limit]
@@ -0,0 +1,203 @@
+"""
+Histórico de preços das cartas em buckets mensais compactos
+
+Um documento por carta por mês em `card_price_history`:
+
+    {"scryfall_id": "...", "month": "2026-10", "n": 3, "t": <bytes>, "p": <bytes>}
+
+- t: segundos desde o início do mês de cada ponto (uint32, little-endian)
+- p: por ponto, os preços de PRICE_FIELDS em centavos (int32; -1 = sem preço)
+
+Um ponto é gravado só quando algum preço muda (ou a carta é nova), então
+cada ponto ocupa 4 + 4 * len(PRICE_FIELDS) = 28 bytes: um ano de preços
+mudando todo dia cabe em ~10 KB, e uma consulta por intervalo lê um bucket
+por mês pelo índice (scryfall_id, month). Escritas concorrentes no mesmo
+bucket são resolvidas por `n` (controle otimista, com nova tentativa).
+"""
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Tuple
+
+from app.core.db import db
+
+PRICE_FIELDS = ("usd", "usd_foil", "usd_etched", "eur", "eur_foil", "tix")
+MISSING_PRICE = -1
+MAX_WRITE_ATTEMPTS = 3
+
+_TIME = struct.Struct("<I")
+_PRICES = struct.Struct(f"<{len(PRICE_FIELDS)}i")
+
+
+def month_key(at: datetime) -> str:
+    return at.strftime("%Y-%m")
+
+
+def month_start(month: str) -> datetime:
+    return datetime.strptime(month, "%Y-%m")
+
+
+def utc_naive(at: datetime) -> datetime:
+    """Datas com fuso (ex: da query string) em UTC sem fuso, como as gravadas no banco."""
+    if at.tzinfo is None:
+        return at
+    return at.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def encode_prices(prices: Optional[Dict[str, Any]]) -> Tuple[int, ...]:
+    """Preços da Scryfall (strings em dólar/euro/tix) em centavos."""
+    prices = prices or {}
+    encoded = []
+    for field in PRICE_FIELDS:
+        try:
+            encoded.append(round(float(prices[field]) * 100))
+        except (KeyError, TypeError, ValueError):
+            encoded.append(MISSING_PRICE)
+    return tuple(encoded)
+
+
+def decode_bucket(bucket: Dict[str, Any]) -> List[Tuple[datetime, Tuple[int, ...]]]:
+    start = month_start(bucket["month"])
+    times, prices = bytes(bucket["t"]), bytes(bucket["p"])
+    points = [
+        (start + timedelta(seconds=_TIME.unpack_from(times, index * _TIME.size)[0]),
+         _PRICES.unpack_from(prices, index * _PRICES.size))
+        for index in range(bucket["n"])
+    ]
+    # Os pontos são acrescentados em ordem de gravação; relógios de workers diferentes podem divergir
+    points.sort(key=lambda point: point[0])
+    return points
+
+
+def prices_changed(previous: Optional[Dict[str, Any]], current: Dict[str, Any]) -> bool:
+    if previous is None:
+        return True
+    return encode_prices(previous.get("prices")) != encode_prices(current.get("prices"))
+
+
+async def record_prices(cards: List[Dict[str, Any]], at: Optional[datetime] = None) -> int:
+    """
+    Acrescenta um ponto com os preços atuais de cada carta ao bucket do mês.
+    Chamado pelas escritas de app/crud/card.py só para as cartas cujos
+    preços mudaram. Retorna o número de pontos gravados.
+    """
+    from pymongo import UpdateOne
+    from pymongo.errors import BulkWriteError
+
+    at = at or datetime.utcnow()
+    month = month_key(at)
+    point_time = _TIME.pack(int((at - month_start(month)).total_seconds()))
+    pending = {card["scryfall_id"]: encode_prices(card.get("prices")) for card in cards if card.get("scryfall_id")}
+
+    written = 0
+    for _ in range(MAX_WRITE_ATTEMPTS):
+        if not pending:
+            break
+
+        cursor = db.card_price_history.find(
+            {"scryfall_id": {"$in": list(pending)}, "month": month},
+            {"scryfall_id": 1, "n": 1, "t": 1, "p": 1}
+        )
+        buckets = {bucket["scryfall_id"]: bucket async for bucket in cursor}
+
+        scryfall_ids = list(pending)
+        operations = []
+        for scryfall_id in scryfall_ids:
+            bucket = buckets.get(scryfall_id) or {"n": 0, "t": b"", "p": b""}
+            operations.append(UpdateOne(
+                # Sem bucket (n = 0) o upsert cria; se outro processo gravou antes, n não
+                # bate e o upsert viola o índice único: tenta de novo com o bucket relido
+                {"scryfall_id": scryfall_id, "month": month, "n": bucket["n"]},
+                {"$set": {
+                    "n": bucket["n"] + 1,
+                    "t": bytes(bucket["t"]) + point_time,
+                    "p": bytes(bucket["p"]) + _PRICES.pack(*pending[scryfall_id]),
+                }},
+                upsert=True
+            ))
+
+        failed = set()
+        try:
+            await db.card_price_history.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+
+        written += len(operations) - len(failed)
+        pending = {scryfall_ids[index]: pending[scryfall_ids[index]] for index in failed}
+
+    return written
+
+
+def _price_value(cents: int) -> Optional[float]:
+    return None if cents == MISSING_PRICE else cents / 100
+
+
+def _history_filter(
+    scryfall_id: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> Dict[str, Any]:
+    query: Dict[str, Any] = {"scryfall_id": scryfall_id}
+    months = {}
+    if since:
+        months["$gte"] = month_key(since)
+    if until:
+        months["$lte"] = month_key(until)
+    if months:
+        query["month"] = months
+    return query
+
+
+async def get_price_history(
+    scryfall_id: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    query = _history_filter(scryfall_id, since, until)
+
+    points = []
+    async for bucket in db.card_price_history.find(query).sort("month", 1):
+        for at, prices in decode_bucket(bucket):
+            if (since and at < since) or (until and at > until):
+                continue
+            points.append({"at": at, **{field: _price_value(value) for field, value in zip(PRICE_FIELDS, prices)}})
+    return points
+
+
+async def get_prices_series(
+    scryfall_ids: List[str],
+    since: datetime,
+    until: datetime,
+    field: str
+) -> Dict[str, List[Tuple[datetime, Optional[float]]]]:
+    """
+    Pontos (data, preço em `field`) de cada carta até `until`, em ordem de
+    data, a partir do último ponto anterior a `since` (o preço em vigor no
+    início do intervalo).
+    """
+    if not scryfall_ids:
+        return {}
+
+    column = PRICE_FIELDS.index(field)
+    since_month, until_month = month_key(since), month_key(until)
+    series: Dict[str, List[Tuple[datetime, Optional[float]]]] = {scryfall_id: [] for scryfall_id in scryfall_ids}
+
+    # Último bucket antes do intervalo de cada carta: o preço em vigor em `since`
+    previous = db.card_price_history.aggregate([
+        {"$match": {"scryfall_id": {"$in": scryfall_ids}, "month": {"$lt": since_month}}},
+        {"$sort": {"scryfall_id": 1, "month": -1}},
+        {"$group": {"_id": "$scryfall_id", "month": {"$first": "$month"}, "n": {"$first": "$n"},
+                    "t": {"$first": "$t"}, "p": {"$first": "$p"}}},
+    ])
+    async for bucket in previous:
+        at, prices = decode_bucket(bucket)[-1]
+        series[bucket["_id"]].append((at, _price_value(prices[column])))
+
+    cursor = db.card_price_history.find(
+        {"scryfall_id": {"$in": scryfall_ids}, "month": {"$gte": since_month, "$lte": until_month}}
+    ).sort([("scryfall_id", 1), ("month", 1)])
+    async for bucket in cursor:
+        for at, prices in decode_bucket(bucket):
+            if at <= until:
+                series[bucket["scryfall_id"]].append((at, _price_value(prices[column])))
+
+    return series
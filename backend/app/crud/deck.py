@@ -1,6 +1,30 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime
-from app.core.db import db
+from app.core.db import db, get_db
+from app.crud import card_cooccurrence, deck_history
+from app.services.deck_stats import (
+    STATS_FIELD,
+    STATS_CARD_PROJECTION,
+    card_contribution,
+    compute_deck_stats,
+    stats_increment
+)
+from app.utils.minhash import minhash_signature, lsh_bands
+
+# Tamanho de cada lote de insert_many na importação em massa
+DECK_IMPORT_CHUNK_SIZE = 500
+
+# scryfall_ids conferidos em db.cards por consulta no relatório de cartas não resolvidas
+UNRESOLVED_CHECK_BATCH_SIZE = 1000
+
+MINHASH_FIELD = "minhash"
+LSH_BANDS_FIELD = "lsh_bands"
+
+# Campos internos que não precisam sair do banco nas leituras de decks
+DECK_PROJECTION = {MINHASH_FIELD: 0, LSH_BANDS_FIELD: 0}
+
+# Ordem das listagens de decks (mais recentes primeiro)
+DECK_LIST_SORT = [("created_at", -1)]
 
 
 async def get_deck_by_id(deck_id: str) -> Optional[Dict[str, Any]]:
@@ -8,14 +32,14 @@ async def get_deck_by_id(deck_id: str) -> Optional[Dict[str, Any]]:
     from bson.errors import InvalidId
     
     try:
-        deck = await db.decks.find_one({"_id": ObjectId(deck_id)})
+        deck = await db.decks.find_one({"_id": ObjectId(deck_id)}, DECK_PROJECTION)
         return deck
     except (InvalidId, ValueError, TypeError):
         return None
 
 
 async def get_deck_by_name(name: str) -> Optional[Dict[str, Any]]:
-    deck = await db.decks.find_one({"name": name})
+    deck = await db.decks.find_one({"name": name}, DECK_PROJECTION)
     return deck
 
 
@@ -23,12 +47,247 @@ async def get_decks_by_names(names: List[str]) -> Dict[str, Dict[str, Any]]:
     if not names:
         return {}
     
-    cursor = db.decks.find({"name": {"$in": names}})
+    cursor = db.decks.find({"name": {"$in": names}}, DECK_PROJECTION)
     decks = await cursor.to_list(length=None)
     
     return {deck.get("name"): deck for deck in decks}
 
 
+def _similarity_fields(cards: List[Dict[str, Any]]) -> Dict[str, Any]:
+    signature = minhash_signature(
+        card.get("scryfall_id") for card in cards if card.get("scryfall_id")
+    )
+    return {MINHASH_FIELD: signature, LSH_BANDS_FIELD: lsh_bands(signature)}
+
+
+async def _compute_stats_for_decks(decks_cards: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    scryfall_ids = list({
+        card.get("scryfall_id")
+        for deck_cards in decks_cards
+        for card in deck_cards
+        if card.get("scryfall_id")
+    })
+    
+    from app.crud.card import get_cards_by_scryfall_ids
+    cards_map = await get_cards_by_scryfall_ids(scryfall_ids, STATS_CARD_PROJECTION)
+    
+    return [compute_deck_stats(deck_cards, cards_map) for deck_cards in decks_cards]
+
+
+async def _add_stats_update(
+    update: Dict[str, Any],
+    deck: Dict[str, Any],
+    cards: List[Dict[str, Any]],
+    scryfall_id: str,
+    quantity: int,
+    entries: int
+) -> Dict[str, Any]:
+    if STATS_FIELD not in deck:
+        # Deck sem estatísticas (anterior ao recurso): calcula tudo de uma vez
+        update["$set"][STATS_FIELD] = (await _compute_stats_for_decks([cards]))[0]
+        return update
+    
+    card = await db.cards.find_one({"scryfall_id": scryfall_id}, STATS_CARD_PROJECTION)
+    increment = stats_increment(card_contribution(card, quantity, entries))
+    
+    update["$set"][f"{STATS_FIELD}.computed_at"] = datetime.utcnow()
+    if increment:
+        update["$inc"] = increment
+    return update
+
+
+async def _apply_card_update(
+    previous: Dict[str, Any],
+    update: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    from pymongo import ReturnDocument
+    
+    update.setdefault("$inc", {})["version"] = 1
+    updated_deck = await db.decks.find_one_and_update(
+        {"_id": previous["_id"]},
+        update,
+        DECK_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+    
+    if updated_deck:
+        await deck_history.record_deck_change(previous, updated_deck)
+        await card_cooccurrence.apply_deck_changes([(previous, updated_deck)])
+    return updated_deck
+
+
+async def _recompute_stats(query: Dict[str, Any]) -> int:
+    from pymongo import UpdateOne
+    
+    updated = 0
+    batch = []
+    
+    async def flush():
+        stats_list = await _compute_stats_for_decks([deck.get("cards", []) for deck in batch])
+        operations = [
+            UpdateOne({"_id": deck["_id"]}, {"$set": {STATS_FIELD: stats}})
+            for deck, stats in zip(batch, stats_list)
+        ]
+        await db.decks.bulk_write(operations, ordered=False)
+        return len(operations)
+    
+    cursor = db.decks.find(query, {"cards": 1}).batch_size(DECK_IMPORT_CHUNK_SIZE)
+    async for deck in cursor:
+        batch.append(deck)
+        if len(batch) >= DECK_IMPORT_CHUNK_SIZE:
+            updated += await flush()
+            batch = []
+    
+    if batch:
+        updated += await flush()
+    
+    return updated
+
+
+async def refresh_deck_stats_for_cards(scryfall_ids: List[str]) -> int:
+    if not scryfall_ids:
+        return 0
+    
+    return await _recompute_stats({"cards.scryfall_id": {"$in": scryfall_ids}})
+
+
+async def recompute_all_deck_stats() -> int:
+    return await _recompute_stats({})
+
+
+async def recompute_all_deck_signatures() -> int:
+    from pymongo import UpdateOne
+    
+    updated = 0
+    operations = []
+    
+    async for deck in iter_all_decks({"cards.scryfall_id": 1}):
+        operations.append(UpdateOne(
+            {"_id": deck["_id"]},
+            {"$set": _similarity_fields(deck.get("cards", []))}
+        ))
+        if len(operations) >= DECK_IMPORT_CHUNK_SIZE:
+            await db.decks.bulk_write(operations, ordered=False)
+            updated += len(operations)
+            operations = []
+    
+    if operations:
+        await db.decks.bulk_write(operations, ordered=False)
+        updated += len(operations)
+    
+    return updated
+
+
+def _similar_candidates_filter(bands: List[str], exclude_id: Any, format: Optional[str] = None) -> Dict[str, Any]:
+    query = {LSH_BANDS_FIELD: {"$in": bands}, "_id": {"$ne": exclude_id}}
+    if format:
+        query["format"] = format
+    return query
+
+
+async def get_similar_deck_candidates(
+    bands: List[str],
+    exclude_id: Any,
+    format: Optional[str] = None,
+    limit: int = 5000
+) -> List[Dict[str, Any]]:
+    if not bands:
+        return []
+    
+    query = _similar_candidates_filter(bands, exclude_id, format)
+    
+    cursor = db.decks.find(query, {"name": 1, "format": 1, MINHASH_FIELD: 1}).limit(limit)
+    candidates = await cursor.to_list(length=limit)
+    return candidates
+
+
+async def get_deck_signature(deck_id: str) -> Optional[Dict[str, Any]]:
+    from bson import ObjectId
+    from bson.errors import InvalidId
+    
+    try:
+        deck = await db.decks.find_one(
+            {"_id": ObjectId(deck_id)},
+            {"name": 1, "format": 1, "cards.scryfall_id": 1, MINHASH_FIELD: 1, LSH_BANDS_FIELD: 1}
+        )
+    except (InvalidId, ValueError, TypeError):
+        return None
+    
+    if deck and LSH_BANDS_FIELD not in deck:
+        # Deck anterior às assinaturas: calcula e grava na primeira consulta
+        fields = _similarity_fields(deck.get("cards", []))
+        await db.decks.update_one({"_id": deck["_id"]}, {"$set": fields})
+        deck.update(fields)
+    
+    return deck
+
+
+async def get_lsh_buckets(
+    format: Optional[str] = None,
+    max_bucket_size: int = 200
+) -> List[List[Any]]:
+    """
+    Grupos de decks que compartilham alguma banda LSH (candidatos a duplicata).
+    Bandas com mais de max_bucket_size decks são ignoradas (listas muito genéricas).
+    """
+    match: Dict[str, Any] = {LSH_BANDS_FIELD: {"$exists": True, "$ne": []}}
+    if format:
+        match["format"] = format
+    
+    pipeline = [
+        {"$match": match},
+        {"$project": {LSH_BANDS_FIELD: 1}},
+        {"$unwind": f"${LSH_BANDS_FIELD}"},
+        {"$group": {"_id": f"${LSH_BANDS_FIELD}", "decks": {"$push": "$_id"}, "size": {"$sum": 1}}},
+        {"$match": {"size": {"$gt": 1, "$lte": max_bucket_size}}},
+        {"$project": {"_id": 0, "decks": 1}}
+    ]
+    cursor = db.decks.aggregate(pipeline, allowDiskUse=True)
+    return [bucket["decks"] async for bucket in cursor]
+
+
+async def get_decks_signatures(object_ids: List[Any]) -> Dict[Any, Dict[str, Any]]:
+    if not object_ids:
+        return {}
+    
+    cursor = db.decks.find({"_id": {"$in": object_ids}}, {"name": 1, "format": 1, MINHASH_FIELD: 1})
+    return {deck["_id"]: deck async for deck in cursor}
+
+
+async def set_decks_field(field: str, values: List[Tuple[Any, Any]]) -> int:
+    from pymongo import UpdateOne
+    
+    if not values:
+        return 0
+    
+    operations = [
+        UpdateOne({"_id": deck_object_id}, {"$set": {field: value}})
+        for deck_object_id, value in values
+    ]
+    result = await db.decks.bulk_write(operations, ordered=False)
+    return result.modified_count
+
+
+async def get_deck_stats(deck_id: str) -> Optional[Dict[str, Any]]:
+    from bson import ObjectId
+    from bson.errors import InvalidId
+    
+    try:
+        deck = await db.decks.find_one({"_id": ObjectId(deck_id)}, {STATS_FIELD: 1, "cards": 1})
+    except (InvalidId, ValueError, TypeError):
+        return None
+    
+    if not deck:
+        return None
+    
+    if STATS_FIELD not in deck:
+        stats = (await _compute_stats_for_decks([deck.get("cards", [])]))[0]
+        await db.decks.update_one({"_id": deck["_id"]}, {"$set": {STATS_FIELD: stats}})
+        return stats
+    
+    return deck[STATS_FIELD]
+
+
 async def create_deck(
     name: str,
     format: str,
@@ -38,15 +297,74 @@ async def create_deck(
         "name": name,
         "format": format,
         "cards": cards,
+        STATS_FIELD: (await _compute_stats_for_decks([cards]))[0],
+        **_similarity_fields(cards),
+        "version": 1,
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
     }
     
     result = await db.decks.insert_one(deck_data)
-    created_deck = await db.decks.find_one({"_id": result.inserted_id})
+    created_deck = await db.decks.find_one({"_id": result.inserted_id}, DECK_PROJECTION)
+    await deck_history.record_decks_created([created_deck])
+    await card_cooccurrence.apply_deck_changes([(None, created_deck)])
     return created_deck
 
 
+async def insert_decks_bulk(
+    decks: List[Dict[str, Any]]
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    from pymongo.errors import BulkWriteError
+    
+    now = datetime.utcnow()
+    documents = [
+        {
+            "name": deck["name"],
+            "format": deck["format"],
+            "cards": deck["cards"],
+            "version": 1,
+            "created_at": now,
+            "updated_at": now
+        }
+        for deck in decks
+    ]
+    
+    if not documents:
+        return [], []
+    
+    stats_list = await _compute_stats_for_decks([document["cards"] for document in documents])
+    for document, stats in zip(documents, stats_list):
+        document[STATS_FIELD] = stats
+        document.update(_similarity_fields(document["cards"]))
+    
+    failed_decks = []
+    failed_indexes = set()
+    
+    try:
+        # insert_many preenche o _id de cada documento, dispensando a releitura
+        await db.decks.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            index = error.get("index")
+            failed_indexes.add(index)
+            name = documents[index]["name"]
+            
+            if error.get("code") == 11000:
+                message = f"Já existe um deck com o nome '{name}'"
+            else:
+                message = f"Erro ao importar: {error.get('errmsg')}"
+            
+            failed_decks.append({"name": name, "error": message})
+    
+    inserted_decks = [
+        document for index, document in enumerate(documents)
+        if index not in failed_indexes
+    ]
+    await deck_history.record_decks_created(inserted_decks)
+    await card_cooccurrence.apply_deck_changes([(None, deck) for deck in inserted_decks])
+    return inserted_decks, failed_decks
+
+
 async def update_deck(
     deck_id: str,
     name: Optional[str] = None,
@@ -63,16 +381,43 @@ async def update_deck(
         update_data["format"] = format
     if cards is not None:
         update_data["cards"] = cards
+        update_data[STATS_FIELD] = (await _compute_stats_for_decks([cards]))[0]
+        update_data.update(_similarity_fields(cards))
     
     try:
-        result = await db.decks.update_one(
+        previous = await db.decks.find_one_and_update(
             {"_id": ObjectId(deck_id)},
-            {"$set": update_data}
+            {"$set": update_data, "$inc": {"version": 1}},
+            DECK_PROJECTION
         )
         
-        if result.modified_count > 0:
-            return await get_deck_by_id(deck_id)
+        if not previous:
+            return None
+        
+        updated_deck = {
+            **previous,
+            **update_data,
+            "version": previous.get("version", 0) + 1
+        }
+        await deck_history.record_deck_change(previous, updated_deck)
+        await card_cooccurrence.apply_deck_changes([(previous, updated_deck)])
+        return updated_deck
+    except Exception:
         return None
+
+
+async def get_deck_history(
+    deck_id: str,
+    limit: int = 50,
+    before_version: Optional[int] = None
+) -> Optional[List[Dict[str, Any]]]:
+    from bson import ObjectId
+    
+    try:
+        object_id = ObjectId(deck_id)
+        if not await db.decks.count_documents({"_id": object_id}, limit=1):
+            return None
+        return await deck_history.get_deck_history(object_id, limit, before_version)
     except Exception:
         return None
 
@@ -81,40 +426,90 @@ async def delete_deck(deck_id: str) -> bool:
     from bson import ObjectId
     
     try:
-        result = await db.decks.delete_one({"_id": ObjectId(deck_id)})
-        return result.deleted_count > 0
+        deleted_deck = await db.decks.find_one_and_delete(
+            {"_id": ObjectId(deck_id)},
+            {"format": 1, "cards": 1}
+        )
+        if not deleted_deck:
+            return False
+        
+        await deck_history.delete_deck_history(deleted_deck["_id"])
+        await card_cooccurrence.apply_deck_changes([(deleted_deck, None)])
+        return True
     except Exception:
         return False
 
 
-async def get_all_decks(format: Optional[str] = None, limit: int = 50, skip: int = 0) -> List[Dict[str, Any]]:
+def _deck_list_filter(format: Optional[str] = None, valid: Optional[bool] = None) -> Dict[str, Any]:
     query = {}
     if format:
         query["format"] = format
+    if valid is not None:
+        query["legality.valid"] = valid
+    return query
+
+
+async def get_all_decks(
+    format: Optional[str] = None,
+    limit: int = 50,
+    skip: int = 0,
+    valid: Optional[bool] = None
+) -> List[Dict[str, Any]]:
+    query = _deck_list_filter(format, valid)
     
-    cursor = db.decks.find(query).sort("created_at", -1).skip(skip).limit(limit)
+    cursor = db.decks.find(query, DECK_PROJECTION).sort(DECK_LIST_SORT).skip(skip).limit(limit)
     decks = await cursor.to_list(length=limit)
     return decks
 
 
-async def get_deck_with_cards(deck_id: str) -> Optional[Dict[str, Any]]:
-    deck = await get_deck_by_id(deck_id)
-    
-    if not deck:
-        return None
+async def get_deck_formats() -> List[str]:
+    formats = await db.decks.distinct("format")
+    return formats
+
+
+async def iter_all_decks(
+    projection: Optional[Dict[str, Any]] = None,
+    batch_size: int = DECK_IMPORT_CHUNK_SIZE,
+    format: Optional[str] = None,
+    heavy_read: bool = False
+):
+    query = {}
+    if format:
+        query["format"] = format
     
-    deck_cards = deck.get("cards", [])
-    if not deck_cards:
-        deck["cards"] = []
-        return deck
+    cursor = get_db(heavy_read).decks.find(query, projection).sort("_id", 1).batch_size(batch_size)
+    async for deck in cursor:
+        yield deck
+
+
+async def iter_deck_cards(
+    deck: Dict[str, Any],
+    projection: Optional[Dict[str, Any]] = None
+):
+    quantities: Dict[str, int] = {}
+    for card in deck.get("cards", []):
+        scryfall_id = card.get("scryfall_id")
+        if scryfall_id:
+            quantities[scryfall_id] = quantities.get(scryfall_id, 0) + card.get("quantity", 1)
     
-    scryfall_ids = [card.get("scryfall_id") for card in deck_cards if card.get("scryfall_id")]
+    if not quantities:
+        return
     
-    from app.crud.card import get_cards_by_scryfall_ids
-    cards_map = await get_cards_by_scryfall_ids(scryfall_ids)
+    found = set()
+    cursor = db.cards.find({"scryfall_id": {"$in": list(quantities)}}, projection)
+    async for card in cursor:
+        scryfall_id = card.get("scryfall_id")
+        found.add(scryfall_id)
+        yield {**card, "quantity": quantities[scryfall_id]}
     
+    for scryfall_id, quantity in quantities.items():
+        if scryfall_id not in found:
+            yield {"scryfall_id": scryfall_id, "quantity": quantity}
+
+
+def _expand_deck_cards(deck: Dict[str, Any], cards_map: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
     expanded_cards = []
-    for deck_card in deck_cards:
+    for deck_card in deck.get("cards", []):
         scryfall_id = deck_card.get("scryfall_id")
         quantity = deck_card.get("quantity", 1)
         
@@ -136,10 +531,270 @@ async def get_deck_with_cards(deck_id: str) -> Optional[Dict[str, Any]]:
     return deck
 
 
-async def count_decks(format: Optional[str] = None) -> int:
-    query = {}
+async def get_deck_with_cards(deck_id: str, at: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    deck = await get_deck_by_id(deck_id)
+    
+    if not deck:
+        return None
+    
+    if at is not None:
+        # Versão histórica: nome, formato e cartas reconstruídos a partir do histórico
+        state = await deck_history.get_deck_state_at(deck["_id"], at)
+        if not state:
+            return None
+        version_at = state.pop("version_at")
+        deck = {**deck, **state, "updated_at": version_at}
+        deck.pop(STATS_FIELD, None)
+    
+    deck_cards = deck.get("cards", [])
+    if not deck_cards:
+        deck["cards"] = []
+        return deck
+    
+    scryfall_ids = [card.get("scryfall_id") for card in deck_cards if card.get("scryfall_id")]
+    
+    from app.crud.card import get_cards_by_scryfall_ids, DECK_CARD_PROJECTION
+    cards_map = await get_cards_by_scryfall_ids(scryfall_ids, DECK_CARD_PROJECTION)
+    
+    return _expand_deck_cards(deck, cards_map)
+
+
+async def get_decks_by_ids_or_names(
+    deck_ids: List[str],
+    names: List[str]
+) -> List[Dict[str, Any]]:
+    from bson import ObjectId
+    from bson.errors import InvalidId
+    
+    object_ids = []
+    for deck_id in deck_ids:
+        try:
+            object_ids.append(ObjectId(deck_id))
+        except (InvalidId, TypeError):
+            continue
+    
+    conditions = []
+    if object_ids:
+        conditions.append({"_id": {"$in": object_ids}})
+    if names:
+        conditions.append({"name": {"$in": names}})
+    
+    if not conditions:
+        return []
+    
+    cursor = db.decks.find({"$or": conditions}, DECK_PROJECTION)
+    decks = await cursor.to_list(length=None)
+    return decks
+
+
+async def get_decks_with_cards(
+    deck_ids: List[str],
+    names: List[str]
+) -> List[Dict[str, Any]]:
+    decks = await get_decks_by_ids_or_names(deck_ids, names)
+    
+    if not decks:
+        return []
+    
+    scryfall_ids = list({
+        card.get("scryfall_id")
+        for deck in decks
+        for card in deck.get("cards", [])
+        if card.get("scryfall_id")
+    })
+    
+    from app.crud.card import get_cards_by_scryfall_ids, DECK_CARD_PROJECTION
+    cards_map = await get_cards_by_scryfall_ids(scryfall_ids, DECK_CARD_PROJECTION)
+    
+    return [_expand_deck_cards(deck, cards_map) for deck in decks]
+
+
+async def iter_unresolved_scryfall_ids(batch_size: int = UNRESOLVED_CHECK_BATCH_SIZE):
+    """
+    Lotes de scryfall_ids referenciados por decks e ausentes em db.cards,
+    em ordem de scryfall_id. Os ids referenciados saem de uma agregação
+    (sem o limite de 16 MB do distinct) e são conferidos em db.cards um
+    lote por vez.
+    """
+    from app.crud.card import get_existing_scryfall_ids
+    
+    pipeline = [
+        {"$unwind": "$cards"},
+        {"$group": {"_id": "$cards.scryfall_id"}},
+        {"$sort": {"_id": 1}}
+    ]
+    cursor = db.decks.aggregate(pipeline, allowDiskUse=True, batchSize=batch_size)
+    
+    async def check(referenced_ids: List[str]) -> List[str]:
+        existing_ids = await get_existing_scryfall_ids(referenced_ids)
+        return [scryfall_id for scryfall_id in referenced_ids if scryfall_id not in existing_ids]
+    
+    referenced_ids = []
+    async for result in cursor:
+        if result["_id"]:
+            referenced_ids.append(result["_id"])
+        if len(referenced_ids) >= batch_size:
+            missing_ids = await check(referenced_ids)
+            referenced_ids = []
+            if missing_ids:
+                yield missing_ids
+    
+    if referenced_ids:
+        missing_ids = await check(referenced_ids)
+        if missing_ids:
+            yield missing_ids
+
+
+async def get_decks_with_unresolved_cards(
+    limit: int = 100,
+    missing_limit: int = 1000
+) -> Tuple[int, List[str], List[Dict[str, Any]]]:
+    """
+    Returns:
+        Total de cartas ausentes, até `missing_limit` delas (em ordem de
+        scryfall_id) e até `limit` decks que referenciam alguma dessas
+    """
+    from app.crud.card import get_existing_scryfall_ids
+    
+    missing_total = 0
+    missing_ids: List[str] = []
+    async for batch in iter_unresolved_scryfall_ids():
+        missing_total += len(batch)
+        missing_ids.extend(batch[:missing_limit - len(missing_ids)])
+    
+    if not missing_ids:
+        return 0, [], []
+    
+    cursor = db.decks.find(
+        {"cards.scryfall_id": {"$in": missing_ids}},
+        {"name": 1, "format": 1, "cards.scryfall_id": 1}
+    ).limit(limit)
+    decks = await cursor.to_list(length=limit)
+    
+    deck_card_ids = list({
+        card.get("scryfall_id")
+        for deck in decks
+        for card in deck.get("cards", [])
+        if card.get("scryfall_id")
+    })
+    existing_ids = await get_existing_scryfall_ids(deck_card_ids)
+    for deck in decks:
+        deck["missing_scryfall_ids"] = list(dict.fromkeys(
+            card.get("scryfall_id") for card in deck.pop("cards", [])
+            if card.get("scryfall_id") and card.get("scryfall_id") not in existing_ids
+        ))
+    
+    return missing_total, missing_ids, decks
+
+
+def _decks_containing_filter(scryfall_ids: List[str], after: Optional[str] = None) -> Dict[str, Any]:
+    from bson import ObjectId
+    
+    query: Dict[str, Any] = {"cards.scryfall_id": {"$in": scryfall_ids}}
+    if after:
+        query["_id"] = {"$gt": ObjectId(after)}
+    return query
+
+
+async def get_decks_containing_cards(
+    scryfall_ids: List[str],
+    limit: int = 50,
+    after: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    if not scryfall_ids:
+        return []
+    
+    query = _decks_containing_filter(scryfall_ids, after)
+    
+    cursor = db.decks.find(
+        query,
+        {"name": 1, "format": 1, "cards.scryfall_id": 1, "cards.quantity": 1}
+    ).sort("_id", 1).limit(limit)
+    decks = await cursor.to_list(length=limit)
+    
+    wanted = set(scryfall_ids)
+    for deck in decks:
+        deck["quantity"] = sum(
+            card.get("quantity", 1) for card in deck.pop("cards", [])
+            if card.get("scryfall_id") in wanted
+        )
+    
+    return decks
+
+
+def _card_usage_pipeline(scryfall_ids: List[str]) -> List[Dict[str, Any]]:
+    return [
+        {"$match": {"cards.scryfall_id": {"$in": scryfall_ids}}},
+        {"$unwind": "$cards"},
+        {"$match": {"cards.scryfall_id": {"$in": scryfall_ids}}},
+        {"$group": {
+            "_id": {"deck": "$_id", "format": "$format"},
+            "copies": {"$sum": "$cards.quantity"}
+        }},
+        {"$group": {
+            "_id": "$_id.format",
+            "decks": {"$sum": 1},
+            "copies": {"$sum": "$copies"}
+        }}
+    ]
+
+
+async def get_card_usage(scryfall_ids: List[str]) -> Dict[str, Dict[str, int]]:
+    if not scryfall_ids:
+        return {}
+    
+    pipeline = _card_usage_pipeline(scryfall_ids)
+    results = await db.decks.aggregate(pipeline).to_list(length=None)
+    return {
+        result["_id"]: {"decks": result["decks"], "copies": result["copies"]}
+        for result in results
+    }
+
+
+async def get_card_usage_ranking(
+    format: Optional[str] = None,
+    limit: int = 50,
+    after: Optional[Tuple[int, str]] = None
+) -> List[Dict[str, Any]]:
+    pipeline = []
     if format:
-        query["format"] = format
+        pipeline.append({"$match": {"format": format}})
+    
+    pipeline.extend([
+        {"$unwind": "$cards"},
+        # Um deck pode repetir o mesmo scryfall_id em várias entradas: junta por deck antes de contar
+        {"$group": {
+            "_id": {"deck": "$_id", "card": "$cards.scryfall_id"},
+            "copies": {"$sum": "$cards.quantity"}
+        }},
+        {"$group": {
+            "_id": "$_id.card",
+            "decks": {"$sum": 1},
+            "copies": {"$sum": "$copies"}
+        }}
+    ])
+    
+    if after:
+        after_decks, after_id = after
+        pipeline.append({"$match": {"$or": [
+            {"decks": {"$lt": after_decks}},
+            {"decks": after_decks, "_id": {"$gt": after_id}}
+        ]}})
+    
+    pipeline.extend([
+        {"$sort": {"decks": -1, "_id": 1}},
+        {"$limit": limit}
+    ])
+    
+    results = await db.decks.aggregate(pipeline, allowDiskUse=True).to_list(length=limit)
+    return [
+        {"scryfall_id": result["_id"], "decks": result["decks"], "copies": result["copies"]}
+        for result in results
+    ]
+
+
+async def count_decks(format: Optional[str] = None, valid: Optional[bool] = None) -> int:
+    query = _deck_list_filter(format, valid)
     
     count = await db.decks.count_documents(query)
     return count
@@ -150,13 +805,12 @@ async def add_card_to_deck(
     scryfall_id: str,
     quantity: int
 ) -> Optional[Dict[str, Any]]:
-    from bson import ObjectId
-    
     try:
         deck = await get_deck_by_id(deck_id)
         if not deck:
             return None
         
+        previous = {**deck, "cards": [dict(card) for card in deck.get("cards", [])]}
         cards = deck.get("cards", [])
         
         card_found = False
@@ -172,19 +826,17 @@ async def add_card_to_deck(
                 "quantity": quantity
             })
         
-        result = await db.decks.update_one(
-            {"_id": ObjectId(deck_id)},
-            {
-                "$set": {
-                    "cards": cards,
-                    "updated_at": datetime.utcnow()
-                }
+        update = {
+            "$set": {
+                "cards": cards,
+                "updated_at": datetime.utcnow()
             }
-        )
+        }
+        if not card_found:
+            update["$set"].update(_similarity_fields(cards))
+        await _add_stats_update(update, deck, cards, scryfall_id, quantity, 0 if card_found else 1)
         
-        if result.modified_count > 0:
-            return await get_deck_by_id(deck_id)
-        return None
+        return await _apply_card_update(previous, update)
     except Exception:
         return None
 
@@ -193,8 +845,6 @@ async def remove_card_from_deck(
     deck_id: str,
     scryfall_id: str
 ) -> Optional[Dict[str, Any]]:
-    from bson import ObjectId
-    
     try:
         deck = await get_deck_by_id(deck_id)
         if not deck:
@@ -213,19 +863,21 @@ async def remove_card_from_deck(
         if len(updated_cards) == 0:
             return None
         
-        result = await db.decks.update_one(
-            {"_id": ObjectId(deck_id)},
-            {
-                "$set": {
-                    "cards": updated_cards,
-                    "updated_at": datetime.utcnow()
-                }
-            }
+        removed_quantity = sum(
+            card.get("quantity", 1) for card in cards
+            if card.get("scryfall_id") == scryfall_id
         )
         
-        if result.modified_count > 0:
-            return await get_deck_by_id(deck_id)
-        return None
+        update = {
+            "$set": {
+                "cards": updated_cards,
+                "updated_at": datetime.utcnow(),
+                **_similarity_fields(updated_cards)
+            }
+        }
+        await _add_stats_update(update, deck, updated_cards, scryfall_id, -removed_quantity, -1)
+        
+        return await _apply_card_update(deck, update)
     except Exception:
         return None
 
@@ -235,18 +887,19 @@ async def update_card_quantity_in_deck(
     scryfall_id: str,
     quantity: int
 ) -> Optional[Dict[str, Any]]:
-    from bson import ObjectId
-    
     try:
         deck = await get_deck_by_id(deck_id)
         if not deck:
             return None
         
+        previous = {**deck, "cards": [dict(card) for card in deck.get("cards", [])]}
         cards = deck.get("cards", [])
         
         card_found = False
+        quantity_delta = 0
         for card in cards:
             if card.get("scryfall_id") == scryfall_id:
+                quantity_delta = quantity - card.get("quantity", 0)
                 card["quantity"] = quantity
                 card_found = True
                 break
@@ -254,19 +907,15 @@ async def update_card_quantity_in_deck(
         if not card_found:
             return None
         
-        result = await db.decks.update_one(
-            {"_id": ObjectId(deck_id)},
-            {
-                "$set": {
-                    "cards": cards,
-                    "updated_at": datetime.utcnow()
-                }
+        update = {
+            "$set": {
+                "cards": cards,
+                "updated_at": datetime.utcnow()
             }
-        )
+        }
+        await _add_stats_update(update, deck, cards, scryfall_id, quantity_delta, 0)
         
-        if result.modified_count > 0:
-            return await get_deck_by_id(deck_id)
-        return None
+        return await _apply_card_update(previous, update)
     except Exception:
         return None
 
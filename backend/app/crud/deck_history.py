@@ -0,0 +1,175 @@
+from typing import Optional, Dict, Any, List
+from datetime import datetime
+from app.core.db import db
+
+# A cada N versões o histórico guarda também um snapshot completo do deck,
+# limitando quantos deltas precisam ser aplicados para reconstruir uma versão
+CHECKPOINT_INTERVAL = 20
+
+
+def _quantities(cards: List[Dict[str, Any]]) -> Dict[str, int]:
+    quantities: Dict[str, int] = {}
+    for card in cards or []:
+        scryfall_id = card.get("scryfall_id")
+        if scryfall_id:
+            quantities[scryfall_id] = quantities.get(scryfall_id, 0) + card.get("quantity", 1)
+    return quantities
+
+
+def _cards_delta(before: List[Dict[str, Any]], after: List[Dict[str, Any]]) -> List[List[Any]]:
+    # Pares [scryfall_id, nova quantidade]; quantidade 0 indica carta removida
+    quantities_before = _quantities(before)
+    quantities_after = _quantities(after)
+
+    delta = [
+        [scryfall_id, quantity]
+        for scryfall_id, quantity in quantities_after.items()
+        if quantities_before.get(scryfall_id) != quantity
+    ]
+    delta.extend(
+        [scryfall_id, 0]
+        for scryfall_id in quantities_before
+        if scryfall_id not in quantities_after
+    )
+    return delta
+
+
+def _snapshot(deck: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "name": deck.get("name"),
+        "format": deck.get("format"),
+        "cards": [[scryfall_id, quantity] for scryfall_id, quantity in _quantities(deck.get("cards")).items()]
+    }
+
+
+def _entry(
+    deck: Dict[str, Any],
+    version: int,
+    cards: List[List[Any]],
+    fields: Dict[str, Any],
+    with_snapshot: bool
+) -> Dict[str, Any]:
+    entry = {
+        "deck_id": deck["_id"],
+        "version": version,
+        "at": deck.get("updated_at") or datetime.utcnow(),
+        "cards": cards,
+        "fields": fields
+    }
+    if with_snapshot:
+        entry["snapshot"] = _snapshot(deck)
+    return entry
+
+
+async def record_decks_created(decks: List[Dict[str, Any]]) -> None:
+    entries = [
+        _entry(
+            deck,
+            deck.get("version", 1),
+            _cards_delta([], deck.get("cards")),
+            {"name": deck.get("name"), "format": deck.get("format")},
+            with_snapshot=True
+        )
+        for deck in decks
+    ]
+
+    if entries:
+        await db.deck_history.insert_many(entries, ordered=False)
+
+
+async def record_deck_change(before: Dict[str, Any], after: Dict[str, Any]) -> None:
+    version = after.get("version", 1)
+    entries = []
+
+    if "version" not in before:
+        # Deck anterior ao histórico: registra o estado prévio como base
+        entries.append(_entry(before, version - 1, [], {}, with_snapshot=True))
+
+    fields = {
+        field: after.get(field)
+        for field in ("name", "format")
+        if before.get(field) != after.get(field)
+    }
+    entries.append(_entry(
+        after,
+        version,
+        _cards_delta(before.get("cards"), after.get("cards")),
+        fields,
+        with_snapshot=version % CHECKPOINT_INTERVAL == 0
+    ))
+
+    await db.deck_history.insert_many(entries, ordered=False)
+
+
+def _history_filter(deck_id: Any, before_version: Optional[int] = None) -> Dict[str, Any]:
+    query: Dict[str, Any] = {"deck_id": deck_id}
+    if before_version is not None:
+        query["version"] = {"$lt": before_version}
+    return query
+
+
+def _state_at_filter(deck_id: Any, at: datetime) -> Dict[str, Any]:
+    return {"deck_id": deck_id, "at": {"$lte": at}}
+
+
+async def get_deck_history(
+    deck_id: Any,
+    limit: int = 50,
+    before_version: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    query = _history_filter(deck_id, before_version)
+
+    cursor = db.deck_history.find(query, {"snapshot": 0}).sort("version", -1).limit(limit)
+    entries = await cursor.to_list(length=limit)
+    return entries
+
+
+async def get_deck_state_at(deck_id: Any, at: datetime) -> Optional[Dict[str, Any]]:
+    """
+    Reconstrói o deck como estava em `at`: parte do último snapshot anterior
+    e aplica no máximo CHECKPOINT_INTERVAL deltas.
+    """
+    target = await db.deck_history.find_one(
+        _state_at_filter(deck_id, at),
+        {"version": 1, "at": 1},
+        sort=[("version", -1)]
+    )
+    if not target:
+        return None
+
+    base = await db.deck_history.find_one(
+        {"deck_id": deck_id, "version": {"$lte": target["version"]}, "snapshot": {"$exists": True}},
+        sort=[("version", -1)]
+    )
+    if not base:
+        return None
+
+    snapshot = base["snapshot"]
+    state = {"name": snapshot.get("name"), "format": snapshot.get("format")}
+    quantities = {scryfall_id: quantity for scryfall_id, quantity in snapshot.get("cards", [])}
+
+    cursor = db.deck_history.find(
+        {"deck_id": deck_id, "version": {"$gt": base["version"], "$lte": target["version"]}},
+        {"cards": 1, "fields": 1}
+    ).sort("version", 1)
+
+    async for entry in cursor:
+        state.update(entry.get("fields") or {})
+        for scryfall_id, quantity in entry.get("cards", []):
+            if quantity:
+                quantities[scryfall_id] = quantity
+            else:
+                quantities.pop(scryfall_id, None)
+
+    state["cards"] = [
+        {"scryfall_id": scryfall_id, "quantity": quantity}
+        for scryfall_id, quantity in quantities.items()
+    ]
+    state["version"] = target["version"]
+    state["version_at"] = target["at"]
+    return state
+
+
+
+async def delete_deck_history(deck_id: Any) -> None:
+    await db.deck_history.delete_many({"deck_id": deck_id})
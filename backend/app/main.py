@@ -1,7 +1,21 @@
+import asyncio
+import logging
+import time
+
 from fastapi import FastAPI
+from app.core import profiling, scheduler
+from app.core.config import METRICS_ENABLED, SCHEDULER_ENABLED, STORAGE_BACKEND
 from app.core.db import db
-from app.core.indexes import create_indexes
-from app.routers import cards, decks
+from app.core.metrics import start_flush, stop_flush, worker_startup_seconds
+from app.core.migrations import run_migrations, verify_schema_version
+from app.routers import cards, decks, health, metrics
+from app.services import goldfish
+from app.services.jobs import register_jobs
+
+logger = logging.getLogger("uvicorn.error")
+
+# Início do processo; no gunicorn com preload é reiniciado no fork de cada worker
+boot_started = time.perf_counter()
 
 app = FastAPI(
     title="MTG Deck Storage API",
@@ -12,7 +26,28 @@ app = FastAPI(
 
 @app.on_event("startup")
 async def startup_event():
-    await create_indexes()
+    profiling.bind_loop(asyncio.get_running_loop())
+    # Índices e ajustes de esquema são aplicados por `python -m app.cli migrate`;
+    # o banco em memória nasce vazio a cada processo e é migrado aqui
+    if STORAGE_BACKEND == "memory":
+        await run_migrations()
+    version = await verify_schema_version()
+    
+    register_jobs()
+    if SCHEDULER_ENABLED:
+        scheduler.start()
+    
+    startup = time.perf_counter() - boot_started
+    worker_startup_seconds.set(startup)
+    start_flush()
+    logger.info(f"Worker pronto em {startup * 1000:.1f} ms (esquema v{version})")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await scheduler.stop()
+    goldfish.shutdown_executor()
+    await stop_flush()
 
 
 @app.get("/")
@@ -26,4 +61,8 @@ async def root():
     }
 
 app.include_router(cards.router, prefix="/cards", tags=["cards"])
-app.include_router(decks.router, prefix="/decks", tags=["decks"])
\ No newline at end of file
+app.include_router(decks.router, prefix="/decks", tags=["decks"])
+app.include_router(health.router, tags=["health"])
+
+if METRICS_ENABLED:
+    app.include_router(metrics.router)
@@ -1,7 +1,10 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import Optional
+from datetime import datetime
 
 import httpx
+from app.core.config import FAST_JSON_RESPONSES
+from app.core.instrumentation import InstrumentedRoute
 from app.core.db import db
 from app.schemas import (
     CardImportRequest,
@@ -9,13 +12,28 @@ from app.schemas import (
     CardBulkImportResponse,
     CardResponse,
     CardSearchRequest,
-    CardListResponse
+    CardListResponse,
+    CardDecksResponse,
+    CardUsageResponse,
+    CardUsageRankingResponse,
+    CardRelatedResponse,
+    CardPriceHistoryResponse
 )
 from app.crud import card as crud_card
+from app.crud import card_cooccurrence as crud_cooccurrence
+from app.crud import card_prices as crud_card_prices
+from app.crud import deck as crud_deck
 from app.services.scryfall import get_card_data, get_cards_collection
-from app.utils import map_scryfall_to_card, convert_id_to_string, convert_ids_in_list
+from app.utils import (
+    map_scryfall_to_card,
+    convert_id_to_string,
+    convert_ids_in_list,
+    is_valid_object_id,
+    MongoJSONResponse,
+    shape_documents
+)
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 
 @router.get("/test")
@@ -51,6 +69,84 @@ async def import_card(card_data: CardImportRequest):
         )
 
 
+async def _resolve_printings(scryfall_id: str, any_printing: bool) -> list:
+    if not any_printing:
+        return [scryfall_id]
+    
+    card = await crud_card.get_card_by_scryfall_id(scryfall_id)
+    if not card or not card.get("oracle_id"):
+        return [scryfall_id]
+    
+    scryfall_ids = await crud_card.get_scryfall_ids_by_oracle_id(card["oracle_id"])
+    return scryfall_ids or [scryfall_id]
+
+
+@router.get("/usage", response_model=CardUsageRankingResponse)
+async def card_usage_ranking(
+    format: Optional[str] = Query(None, description="Filtrar por formato do deck"),
+    limit: int = Query(50, ge=1, le=500, description="Número máximo de resultados"),
+    cursor: Optional[str] = Query(None, description="Cursor retornado pela página anterior")
+):
+    
+    after = None
+    if cursor:
+        decks_part, _, scryfall_id = cursor.partition(":")
+        if not decks_part.isdigit() or not scryfall_id:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cursor inválido: '{cursor}'"
+            )
+        after = (int(decks_part), scryfall_id)
+    
+    items = await crud_deck.get_card_usage_ranking(format=format, limit=limit, after=after)
+    
+    next_cursor = None
+    if len(items) == limit:
+        last = items[-1]
+        next_cursor = f"{last['decks']}:{last['scryfall_id']}"
+    
+    return {
+        "items": items,
+        "next_cursor": next_cursor
+    }
+
+
+# Antes de /{scryfall_id}: senão "all" seria lido como um scryfall_id
+@router.get("/all", response_model=CardListResponse)
+async def get_all_cards(
+    limit: int = Query(100, ge=1, le=100, description="Número máximo de resultados (máximo 100, padrão: 100)"),
+    skip: int = Query(0, ge=0, description="Número de resultados para pular (padrão: 0)")
+):
+    
+    cards = await crud_card.search_cards(
+        name=None,
+        colors=None,
+        type_line=None,
+        rarity=None,
+        limit=limit,
+        skip=skip
+    )
+    
+    total = await crud_card.count_cards()
+    
+    if FAST_JSON_RESPONSES:
+        return MongoJSONResponse({
+            "total": total,
+            "limit": limit,
+            "skip": skip,
+            "cards": shape_documents(cards, CardResponse)
+        })
+    
+    convert_ids_in_list(cards)
+    
+    return {
+        "total": total,
+        "limit": limit,
+        "skip": skip,
+        "cards": cards
+    }
+
+
 @router.get("/{scryfall_id}", response_model=CardResponse)
 async def get_card(scryfall_id: str):
     card = await crud_card.get_card_by_scryfall_id(scryfall_id)
@@ -66,6 +162,118 @@ async def get_card(scryfall_id: str):
     return card
 
 
+@router.get("/{scryfall_id}/decks", response_model=CardDecksResponse)
+async def get_decks_with_card(
+    scryfall_id: str,
+    any_printing: bool = Query(False, description="Considerar todas as impressões da carta (mesmo oracle_id)"),
+    limit: int = Query(50, ge=1, le=500, description="Número máximo de resultados"),
+    cursor: Optional[str] = Query(None, description="Cursor retornado pela página anterior")
+):
+    
+    if cursor and not is_valid_object_id(cursor):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cursor inválido: '{cursor}'"
+        )
+    
+    scryfall_ids = await _resolve_printings(scryfall_id, any_printing)
+    decks = await crud_deck.get_decks_containing_cards(scryfall_ids, limit=limit, after=cursor)
+    
+    convert_ids_in_list(decks)
+    next_cursor = decks[-1]["_id"] if len(decks) == limit else None
+    
+    return {
+        "scryfall_id": scryfall_id,
+        "scryfall_ids": scryfall_ids,
+        "decks": decks,
+        "next_cursor": next_cursor
+    }
+
+
+@router.get("/{scryfall_id}/usage", response_model=CardUsageResponse)
+async def get_card_usage(
+    scryfall_id: str,
+    any_printing: bool = Query(False, description="Considerar todas as impressões da carta (mesmo oracle_id)")
+):
+    
+    scryfall_ids = await _resolve_printings(scryfall_id, any_printing)
+    by_format = await crud_deck.get_card_usage(scryfall_ids)
+    
+    return {
+        "scryfall_id": scryfall_id,
+        "scryfall_ids": scryfall_ids,
+        "decks": sum(usage["decks"] for usage in by_format.values()),
+        "copies": sum(usage["copies"] for usage in by_format.values()),
+        "by_format": by_format
+    }
+
+
+@router.get("/{scryfall_id}/related", response_model=CardRelatedResponse)
+async def get_related_cards(
+    scryfall_id: str,
+    format: str = Query(..., description="Formato dos decks considerados (ex: modern)"),
+    limit: int = Query(20, ge=1, le=100, description="Número máximo de parceiros"),
+    min_count: int = Query(2, ge=1, description="Mínimo de decks em comum para considerar um parceiro")
+):
+    
+    card = await crud_card.get_card_by_scryfall_id(scryfall_id)
+    if not card:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Carta com scryfall_id '{scryfall_id}' não encontrada"
+        )
+    
+    key = card.get("oracle_id") or scryfall_id
+    related = await crud_cooccurrence.get_related_cards(key, format, limit=limit, min_count=min_count)
+    
+    keys = [item["key"] for item in related]
+    names = await crud_card.get_card_names_by_keys(keys)
+    
+    return {
+        "scryfall_id": scryfall_id,
+        "oracle_id": key,
+        "format": format,
+        "decks": await crud_cooccurrence.get_card_deck_count(key, format),
+        "related": [
+            {
+                "oracle_id": item["key"],
+                **names.get(item["key"], {}),
+                "count": item["count"],
+                "lift": item["lift"],
+                "confidence": item["confidence"]
+            }
+            for item in related
+        ]
+    }
+
+
+@router.get("/{scryfall_id}/prices", response_model=CardPriceHistoryResponse)
+async def get_card_price_history(
+    scryfall_id: str,
+    since: Optional[datetime] = Query(None, description="Apenas mudanças a partir desta data"),
+    until: Optional[datetime] = Query(None, description="Apenas mudanças até esta data")
+):
+    
+    card = await crud_card.get_card_by_scryfall_id(scryfall_id)
+    if not card:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Carta com scryfall_id '{scryfall_id}' não encontrada"
+        )
+    
+    points = await crud_card_prices.get_price_history(
+        scryfall_id,
+        since=crud_card_prices.utc_naive(since) if since else None,
+        until=crud_card_prices.utc_naive(until) if until else None
+    )
+    
+    return {
+        "scryfall_id": scryfall_id,
+        "name": card.get("name"),
+        "points": points
+    }
+
+
 @router.get("/", response_model=CardListResponse)
 async def search_cards(
     name: Optional[str] = Query(None, description="Buscar por nome (busca parcial)"),
@@ -95,32 +303,13 @@ async def search_cards(
         rarity=rarity
     )
     
-    convert_ids_in_list(cards)
-    
-    return {
-        "total": total,
-        "limit": limit,
-        "skip": skip,
-        "cards": cards
-    }
-
-
-@router.get("/all", response_model=CardListResponse)
-async def get_all_cards(
-    limit: int = Query(100, ge=1, le=100, description="Número máximo de resultados (máximo 100, padrão: 100)"),
-    skip: int = Query(0, ge=0, description="Número de resultados para pular (padrão: 0)")
-):
-    
-    cards = await crud_card.search_cards(
-        name=None,
-        colors=None,
-        type_line=None,
-        rarity=None,
-        limit=limit,
-        skip=skip
-    )
-    
-    total = await crud_card.count_cards()
+    if FAST_JSON_RESPONSES:
+        return MongoJSONResponse({
+            "total": total,
+            "limit": limit,
+            "skip": skip,
+            "cards": shape_documents(cards, CardResponse)
+        })
     
     convert_ids_in_list(cards)
     
@@ -1,7 +1,12 @@
-from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import Response, JSONResponse
-from typing import Optional, Dict, Any
+from fastapi import APIRouter, BackgroundTasks, Header, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, JSONResponse, StreamingResponse
+from typing import Optional, Dict, Any, List
+from datetime import datetime
+import json
+import os
 import httpx
+from bson import ObjectId
 from app.schemas import (
     DeckCreate,
     DeckUpdate,
@@ -11,13 +16,58 @@ from app.schemas import (
     AddCardToDeckRequest,
     UpdateCardQuantityRequest,
     BulkDeckImportRequest,
-    BulkDeckImportResponse
+    BulkDeckImportResponse,
+    DeckBatchGetRequest,
+    DeckBatchGetResponse,
+    UnresolvedCardsReport,
+    DeckStatsResponse,
+    DeckValidationResponse,
+    DeckDiffResponse,
+    DeckTextImportRequest,
+    DeckTextImportResponse,
+    DeckHistoryResponse,
+    SimilarDecksResponse,
+    DuplicateClustersResponse,
+    DeckProbabilitiesResponse,
+    DeckSimulationResponse,
+    SlowLogResponse,
+    IndexReportResponse,
+    QueryCacheResponse,
+    JobListResponse,
+    JobStatus,
+    DeckValueHistoryResponse
 )
+from app.core import profiling, query_cache, scheduler
+from app.core.config import FAST_JSON_RESPONSES, SLOW_QUERY_MS, SLOW_REQUEST_MS, STORAGE_BACKEND
+from app.core.instrumentation import InstrumentedRoute, is_admin_token
+from app.crud import card_prices as crud_card_prices
 from app.crud import deck as crud_deck
-from app.services.scryfall import get_card_by_id, get_cards_by_ids
-from app.utils import convert_id_to_string, convert_ids_in_list, is_valid_object_id
+from app.services import (
+    card_backfill,
+    card_cooccurrence,
+    deck_backup,
+    deck_diff,
+    deck_export,
+    deck_probabilities,
+    deck_similarity,
+    deck_validation,
+    decklist_import,
+    deck_value,
+    goldfish,
+    index_report
+)
+from app.services.deck_stats import clean_stats
+from app.utils import (
+    convert_id_to_string,
+    convert_ids_in_list,
+    is_valid_object_id,
+    BodyConsumingStreamingResponse,
+    iter_ndjson_lines,
+    MongoJSONResponse,
+    shape_documents
+)
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 
 async def _fetch_missing_card_names(deck: Dict[str, Any]) -> Dict[str, Any]:
@@ -32,20 +82,20 @@ async def _fetch_missing_card_names(deck: Dict[str, Any]) -> Dict[str, Any]:
                 missing_scryfall_ids.append(scryfall_id)
                 cards_without_name.append((i, scryfall_id))
     
-    scryfall_map = {}
+    cards_map = {}
     if missing_scryfall_ids:
         try:
-            scryfall_results = await get_cards_by_ids(missing_scryfall_ids)
-            for card_data in scryfall_results:
-                scryfall_id = card_data.get("id")
-                if scryfall_id:
-                    scryfall_map[scryfall_id] = card_data.get("name", scryfall_id)
+            # As cartas buscadas são gravadas no banco: a próxima exportação é local
+            cards_map = await card_backfill.backfill_cards(missing_scryfall_ids)
         except (httpx.HTTPStatusError, httpx.RequestError, Exception):
             pass
     
     for i, scryfall_id in cards_without_name:
-        if scryfall_id in scryfall_map:
-            deck["cards"][i]["name"] = scryfall_map[scryfall_id]
+        if scryfall_id in cards_map:
+            deck["cards"][i] = {
+                **cards_map[scryfall_id],
+                "quantity": deck["cards"][i].get("quantity", 1)
+            }
     
     return deck
 
@@ -64,52 +114,91 @@ def _format_export_text(deck: Dict[str, Any]) -> str:
     return "\n".join(lines)
 
 
+def _deck_create_to_dict(deck_data: DeckCreate) -> Dict[str, Any]:
+    return {
+        "name": deck_data.name,
+        "format": deck_data.format,
+        "cards": [
+            {
+                "scryfall_id": card.scryfall_id,
+                "quantity": card.quantity
+            }
+            for card in deck_data.cards
+        ]
+    }
+
+
+def _prepare_deck_with_cards(deck: Dict[str, Any]) -> Dict[str, Any]:
+    convert_id_to_string(deck)
+    if "_id" in deck:
+        deck["deck_id"] = deck["_id"]
+    
+    convert_ids_in_list(deck.get("cards", []))
+    return deck
+
+
+async def _stream_decks_ndjson(decks: List[Dict[str, Any]]):
+    for deck in decks:
+        yield json.dumps(jsonable_encoder(_prepare_deck_with_cards(deck))) + "\n"
+
+
+@router.post("/batch-get", response_model=DeckBatchGetResponse)
+async def batch_get_decks(
+    batch_data: DeckBatchGetRequest,
+    stream: bool = Query(False, description="Retorna os decks como NDJSON (um deck por linha)")
+):
+    
+    if not batch_data.ids and not batch_data.names:
+        raise HTTPException(
+            status_code=400,
+            detail="Informe ao menos um ID ou nome de deck"
+        )
+    
+    decks = await crud_deck.get_decks_with_cards(batch_data.ids, batch_data.names)
+    
+    if stream:
+        return StreamingResponse(
+            _stream_decks_ndjson(decks),
+            media_type="application/x-ndjson"
+        )
+    
+    found_ids = {str(deck["_id"]) for deck in decks}
+    found_names = {deck.get("name") for deck in decks}
+    # str(ObjectId) é hex minúsculo: normaliza os IDs pedidos antes de comparar
+    not_found = [
+        deck_id for deck_id in batch_data.ids
+        if not is_valid_object_id(deck_id) or str(ObjectId(deck_id)) not in found_ids
+    ]
+    not_found.extend(name for name in batch_data.names if name not in found_names)
+    
+    for deck in decks:
+        _prepare_deck_with_cards(deck)
+    
+    return {
+        "total": len(decks),
+        "decks": decks,
+        "not_found": not_found
+    }
+
+
 @router.post("/import-bulk", response_model=BulkDeckImportResponse, status_code=200)
 async def import_decks_bulk(bulk_data: BulkDeckImportRequest):
     
-    successful_decks = []
-    failed_decks = []
-    
-    deck_names = [deck_data.name for deck_data in bulk_data.decks]
-    existing_decks_map = await crud_deck.get_decks_by_names(deck_names)
+    decks = [_deck_create_to_dict(deck_data) for deck_data in bulk_data.decks]
     
-    for deck_data in bulk_data.decks:
-        try:
-            if deck_data.name in existing_decks_map:
-                failed_decks.append({
-                    "name": deck_data.name,
-                    "error": f"Já existe um deck com o nome '{deck_data.name}'"
-                })
-                continue
-            
-            deck_dict = {
-                "name": deck_data.name,
-                "format": deck_data.format,
-                "cards": [
-                    {
-                        "scryfall_id": card.scryfall_id,
-                        "quantity": card.quantity
-                    }
-                    for card in deck_data.cards
-                ]
-            }
-            
-            deck = await crud_deck.create_deck(
-                name=deck_dict["name"],
-                format=deck_dict["format"],
-                cards=deck_dict["cards"]
-            )
-            
-            convert_id_to_string(deck)
-            
-            existing_decks_map[deck_data.name] = deck
-            successful_decks.append(deck)
-            
-        except Exception as e:
-            failed_decks.append({
-                "name": deck_data.name,
+    try:
+        successful_decks, failed_decks = await crud_deck.insert_decks_bulk(decks)
+    except Exception as e:
+        successful_decks = []
+        failed_decks = [
+            {
+                "name": deck["name"],
                 "error": f"Erro ao importar: {str(e)}"
-            })
+            }
+            for deck in decks
+        ]
+    
+    convert_ids_in_list(successful_decks)
     
     return {
         "total": len(bulk_data.decks),
@@ -120,6 +209,53 @@ async def import_decks_bulk(bulk_data: BulkDeckImportRequest):
     }
 
 
+async def _stream_progress_ndjson(events):
+    async for event in events:
+        yield json.dumps(event) + "\n"
+
+
+@router.post("/import-bulk/stream")
+async def import_decks_bulk_stream(request: Request):
+    
+    events = deck_backup.import_decks_ndjson(iter_ndjson_lines(request.stream()))
+    
+    return BodyConsumingStreamingResponse(
+        _stream_progress_ndjson(events),
+        media_type="application/x-ndjson"
+    )
+
+
+@router.post("/import-text", response_model=DeckTextImportResponse, status_code=201)
+async def import_deck_text(import_data: DeckTextImportRequest):
+    
+    try:
+        result = await decklist_import.import_decklist(
+            name=import_data.name,
+            format=import_data.format,
+            text=import_data.text,
+            include_sideboard=import_data.include_sideboard
+        )
+    except decklist_import.DecklistImportError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Erro na requisição para Scryfall: {e.response.status_code}"
+        )
+    except httpx.RequestError:
+        raise HTTPException(
+            status_code=503,
+            detail="Scryfall indisponível (timeout ou falha de conexão); tente novamente"
+        )
+    
+    convert_id_to_string(result["deck"])
+    
+    return result
+
+
 @router.post("/", response_model=DeckResponse, status_code=201)
 async def create_deck(deck_data: DeckCreate):
 
@@ -130,17 +266,7 @@ async def create_deck(deck_data: DeckCreate):
             detail=f"Já existe um deck com o nome '{deck_data.name}'"
         )
     
-    deck_dict = {
-        "name": deck_data.name,
-        "format": deck_data.format,
-        "cards": [
-            {
-                "scryfall_id": card.scryfall_id,
-                "quantity": card.quantity
-            }
-            for card in deck_data.cards
-        ]
-    }
+    deck_dict = _deck_create_to_dict(deck_data)
     
     deck = await crud_deck.create_deck(
         name=deck_dict["name"],
@@ -154,28 +280,182 @@ async def create_deck(deck_data: DeckCreate):
 
 
 @router.get("/backup")
-async def backup_all_decks():
+async def backup_all_decks(
+    format: str = Query("json", pattern="^(json|ndjson)$", description="Formato do backup: json (array) ou ndjson"),
+    compress: bool = Query(False, description="Compactar o backup com gzip")
+):
     
-    decks = await crud_deck.get_all_decks(limit=10000, skip=0)
+    extension = "ndjson" if format == "ndjson" else "json"
+    media_type = "application/x-ndjson" if format == "ndjson" else "application/json"
+    filename = f"all_decks.{extension}"
     
-    export_data = []
-    for deck in decks:
-        export_data.append({
-            "name": deck.get("name"),
-            "format": deck.get("format"),
-            "cards": [
-                {
-                    "scryfall_id": card.get("scryfall_id"),
-                    "quantity": card.get("quantity", 1)
-                }
-                for card in deck.get("cards", [])
-            ]
-        })
+    if compress:
+        media_type = "application/gzip"
+        filename += ".gz"
     
-    return JSONResponse(
-        content=export_data,
+    return StreamingResponse(
+        deck_backup.iter_backup(format=format, compress=compress),
+        media_type=media_type,
         headers={
-            "Content-Disposition": 'attachment; filename="all_decks.json"'
+            "Content-Disposition": f'attachment; filename="{filename}"'
+        }
+    )
+
+
+@router.post("/restore")
+async def restore_decks(
+    request: Request,
+    resume_from: int = Query(0, ge=0, description="Número de decks já processados a pular (retomada)")
+):
+    
+    lines = iter_ndjson_lines(deck_backup.gunzip_chunks(request.stream()))
+    events = deck_backup.import_decks_ndjson(lines, resume_from=resume_from)
+    
+    return BodyConsumingStreamingResponse(
+        _stream_progress_ndjson(events),
+        media_type="application/x-ndjson"
+    )
+
+
+@router.get("/admin/unresolved-cards", response_model=UnresolvedCardsReport)
+async def unresolved_cards_report(
+    limit: int = Query(100, ge=1, le=1000, description="Número máximo de decks no relatório"),
+    missing_limit: int = Query(1000, ge=1, le=10000, description="Número máximo de scryfall_ids ausentes listados")
+):
+    
+    missing_total, missing_ids, decks = await crud_deck.get_decks_with_unresolved_cards(
+        limit=limit,
+        missing_limit=missing_limit
+    )
+    convert_ids_in_list(decks)
+    
+    return {
+        "missing_cards": missing_total,
+        "missing_scryfall_ids": missing_ids,
+        "missing_truncated": missing_total > len(missing_ids),
+        "decks": decks
+    }
+
+
+@router.post("/admin/backfill-cards", status_code=202)
+async def backfill_unresolved_cards(background_tasks: BackgroundTasks):
+    
+    background_tasks.add_task(card_backfill.backfill_unresolved_deck_cards)
+    return {"status": "scheduled"}
+
+
+@router.post("/admin/recompute-stats", status_code=202)
+async def recompute_deck_stats(background_tasks: BackgroundTasks):
+    
+    background_tasks.add_task(crud_deck.recompute_all_deck_stats)
+    return {"status": "scheduled"}
+
+
+@router.post("/admin/revalidate", status_code=202)
+async def revalidate_all_decks(background_tasks: BackgroundTasks):
+    
+    background_tasks.add_task(deck_validation.revalidate_all_decks)
+    return {"status": "scheduled"}
+
+
+@router.post("/admin/rebuild-cooccurrence", status_code=202)
+async def rebuild_card_cooccurrence(background_tasks: BackgroundTasks):
+    
+    background_tasks.add_task(card_cooccurrence.rebuild_cooccurrence)
+    return {"status": "scheduled"}
+
+
+@router.get("/admin/duplicates", response_model=DuplicateClustersResponse)
+async def list_duplicate_decks(
+    threshold: float = Query(0.9, ge=0.5, le=1.0, description="Similaridade mínima entre os decks de um grupo"),
+    format: Optional[str] = Query(None, description="Considerar apenas decks deste formato"),
+    limit: int = Query(50, ge=1, le=500, description="Número máximo de grupos")
+):
+    
+    clusters = await deck_similarity.find_duplicate_clusters(threshold=threshold, format=format, limit=limit)
+    return {
+        "threshold": threshold,
+        "total": len(clusters),
+        "clusters": clusters
+    }
+
+
+@router.get("/admin/slow-log", response_model=SlowLogResponse)
+async def get_slow_log(x_admin_token: Optional[str] = Header(None)):
+    
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(
+            status_code=403,
+            detail="Acesso negado: informe o header X-Admin-Token (ADMIN_TOKEN precisa estar definido)"
+        )
+    
+    return {
+        "pid": os.getpid(),
+        "slow_request_ms": SLOW_REQUEST_MS,
+        "slow_query_ms": SLOW_QUERY_MS,
+        "requests": list(reversed(profiling.slow_requests)),
+        "queries": list(reversed(profiling.slow_queries))
+    }
+
+
+@router.get("/admin/index-report", response_model=IndexReportResponse)
+async def get_index_report():
+    
+    if STORAGE_BACKEND == "memory":
+        raise HTTPException(status_code=400, detail="Relatório de índices indisponível no backend em memória (sem explain)")
+    
+    return await index_report.build_index_report()
+
+
+@router.get("/admin/query-cache", response_model=QueryCacheResponse)
+async def get_query_cache_report():
+    
+    return await query_cache.cache_report()
+
+
+@router.get("/admin/jobs", response_model=JobListResponse)
+async def get_jobs():
+    
+    return await scheduler.get_jobs_status()
+
+
+@router.post("/admin/jobs/{job_name}/run", response_model=JobStatus)
+async def run_job(job_name: str, wait: bool = Query(False, description="Executa neste worker e espera o fim, em vez de antecipar para o líder")):
+    
+    try:
+        job = scheduler.get_job(job_name)
+    except scheduler.JobNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Tarefa '{job_name}' não encontrada")
+    
+    if wait:
+        await scheduler.run_job(job)
+    else:
+        await scheduler.trigger_job(job_name)
+    
+    status = await scheduler.get_jobs_status()
+    return next(item for item in status["jobs"] if item["name"] == job_name)
+
+
+@router.post("/admin/rebuild-signatures", status_code=202)
+async def rebuild_deck_signatures(background_tasks: BackgroundTasks):
+    
+    background_tasks.add_task(crud_deck.recompute_all_deck_signatures)
+    return {"status": "scheduled"}
+
+
+@router.get("/export/zip")
+async def export_decks_zip(
+    export_format: str = Query("text", pattern="^(text|arena|dek|csv)$", description="Formato de cada arquivo: text, arena, dek ou csv"),
+    format: Optional[str] = Query(None, description="Exportar apenas decks deste formato (ex: modern)")
+):
+    
+    filename = f"decks_{format or 'all'}_{export_format}.zip"
+    
+    return StreamingResponse(
+        deck_export.stream_decks_zip(export_format, format=format),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"'
         }
     )
 
@@ -183,11 +463,20 @@ async def backup_all_decks():
 @router.get("/", response_model=DeckListResponse)
 async def list_decks(
     format: Optional[str] = Query(None, description="Filtrar por formato (ex: commander, standard, modern)"),
+    valid: Optional[bool] = Query(None, description="Filtrar pelo resultado da última validação de formato"),
     limit: int = Query(50, ge=1, le=100, description="Número máximo de resultados"),
     skip: int = Query(0, ge=0, description="Número de resultados para pular")
 ):
-    decks = await crud_deck.get_all_decks(format=format, limit=limit, skip=skip)
-    total = await crud_deck.count_decks(format=format)
+    decks = await crud_deck.get_all_decks(format=format, limit=limit, skip=skip, valid=valid)
+    total = await crud_deck.count_decks(format=format, valid=valid)
+    
+    if FAST_JSON_RESPONSES:
+        return MongoJSONResponse({
+            "total": total,
+            "limit": limit,
+            "skip": skip,
+            "decks": shape_documents(decks, DeckResponse)
+        })
     
     convert_ids_in_list(decks)
     
@@ -297,6 +586,358 @@ async def update_card_quantity(deck_id: str, scryfall_id: str, quantity_data: Up
     return updated_deck
 
 
+@router.get("/{deck_id}/stats", response_model=DeckStatsResponse)
+async def get_deck_stats(deck_id: str):
+    
+    if not is_valid_object_id(deck_id):
+        raise HTTPException(
+            status_code=400,
+            detail=f"ID de deck inválido: '{deck_id}'"
+        )
+    
+    stats = await crud_deck.get_deck_stats(deck_id)
+    
+    if stats is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Deck com ID '{deck_id}' não encontrado"
+        )
+    
+    return {
+        "deck_id": deck_id,
+        **clean_stats(stats)
+    }
+
+
+@router.get("/{deck_id}/history", response_model=DeckHistoryResponse)
+async def get_deck_history(
+    deck_id: str,
+    limit: int = Query(50, ge=1, le=500, description="Número máximo de versões"),
+    before_version: Optional[int] = Query(None, ge=1, description="Retorna apenas versões anteriores a esta (paginação)")
+):
+    
+    if not is_valid_object_id(deck_id):
+        raise HTTPException(
+            status_code=400,
+            detail=f"ID de deck inválido: '{deck_id}'"
+        )
+    
+    entries = await crud_deck.get_deck_history(deck_id, limit, before_version)
+    
+    if entries is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Deck com ID '{deck_id}' não encontrado"
+        )
+    
+    next_before_version = None
+    if len(entries) == limit and entries[-1]["version"] > 1:
+        next_before_version = entries[-1]["version"]
+    
+    return {
+        "deck_id": deck_id,
+        "entries": entries,
+        "next_before_version": next_before_version
+    }
+
+
+@router.get("/{deck_id}/similar", response_model=SimilarDecksResponse)
+async def get_similar_decks(
+    deck_id: str,
+    threshold: float = Query(0.8, ge=0.5, le=1.0, description="Similaridade mínima (Jaccard estimado entre os conjuntos de cartas)"),
+    limit: int = Query(20, ge=1, le=100, description="Número máximo de decks"),
+    same_format: bool = Query(False, description="Considerar apenas decks do mesmo formato")
+):
+    
+    if not is_valid_object_id(deck_id):
+        raise HTTPException(
+            status_code=400,
+            detail=f"ID de deck inválido: '{deck_id}'"
+        )
+    
+    similar = await deck_similarity.find_similar_decks(
+        deck_id,
+        threshold=threshold,
+        limit=limit,
+        same_format=same_format
+    )
+    
+    if similar is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Deck com ID '{deck_id}' não encontrado"
+        )
+    
+    return {
+        "deck_id": deck_id,
+        "threshold": threshold,
+        "decks": similar
+    }
+
+
+@router.get("/{deck_id}/probabilities", response_model=DeckProbabilitiesResponse)
+async def get_deck_probabilities(
+    deck_id: str,
+    target: Optional[List[str]] = Query(None, description="Alvos '<seletor>[>=N]': land, nonland, mv:2, mv:1-3, type:Creature, source:R, card:<scryfall_id>"),
+    turns: int = Query(7, ge=1, le=20, description="Último turno calculado"),
+    on_the_play: bool = Query(True, description="Jogador começa a partida (não compra no primeiro turno)"),
+    mulligans: int = Query(2, ge=0, le=6, description="Número máximo de mulligans considerado na mão inicial")
+):
+    
+    if not is_valid_object_id(deck_id):
+        raise HTTPException(
+            status_code=400,
+            detail=f"ID de deck inválido: '{deck_id}'"
+        )
+    
+    try:
+        result = await deck_probabilities.get_deck_probabilities(
+            deck_id,
+            targets=target,
+            turns=turns,
+            on_the_play=on_the_play,
+            mulligans=mulligans
+        )
+    except deck_probabilities.ProbabilityTargetError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if result is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Deck com ID '{deck_id}' não encontrado"
+        )
+    
+    return result
+
+
+@router.get("/{deck_id}/value-history", response_model=DeckValueHistoryResponse)
+async def get_deck_value_history(
+    deck_id: str,
+    since: Optional[datetime] = Query(None, description="Início do intervalo (padrão: 90 dias antes de 'until')"),
+    until: Optional[datetime] = Query(None, description="Fim do intervalo (padrão: agora)"),
+    currency: str = Query("usd", description="Preço usado: usd, usd_foil, usd_etched, eur, eur_foil ou tix"),
+    interval: str = Query("day", description="Intervalo entre os pontos: day ou week")
+):
+    
+    if not is_valid_object_id(deck_id):
+        raise HTTPException(
+            status_code=400,
+            detail=f"ID de deck inválido: '{deck_id}'"
+        )
+    
+    try:
+        result = await deck_value.get_deck_value_history(
+            deck_id,
+            since=since,
+            until=until,
+            currency=currency,
+            interval=interval
+        )
+    except deck_value.DeckValueQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if result is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Deck com ID '{deck_id}' não encontrado"
+        )
+    
+    return result
+
+
+@router.get("/{deck_id}/simulate", response_model=DeckSimulationResponse)
+async def simulate_deck(
+    deck_id: str,
+    games: int = Query(10000, ge=1000, le=100000, description="Número de partidas simuladas"),
+    turns: int = Query(7, ge=2, le=15, description="Turnos por partida"),
+    on_the_play: bool = Query(True, description="Jogador começa a partida (não compra no primeiro turno)"),
+    seed: int = Query(0, ge=0, description="Seed da simulação")
+):
+    
+    if not is_valid_object_id(deck_id):
+        raise HTTPException(
+            status_code=400,
+            detail=f"ID de deck inválido: '{deck_id}'"
+        )
+    
+    result = await goldfish.simulate_deck(
+        deck_id,
+        games=games,
+        turns=turns,
+        on_the_play=on_the_play,
+        seed=seed
+    )
+    
+    if result is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Deck com ID '{deck_id}' não encontrado"
+        )
+    
+    return result
+
+
+@router.get("/{deck_id}/validate", response_model=DeckValidationResponse)
+async def validate_deck(
+    deck_id: str,
+    commander: Optional[List[str]] = Query(None, description="scryfall_id do(s) comandante(s); se omitido, é inferido entre as cartas do deck")
+):
+    
+    if not is_valid_object_id(deck_id):
+        raise HTTPException(
+            status_code=400,
+            detail=f"ID de deck inválido: '{deck_id}'"
+        )
+    
+    deck = await crud_deck.get_deck_by_id(deck_id)
+    
+    if not deck:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Deck com ID '{deck_id}' não encontrado"
+        )
+    
+    legality = await deck_validation.validate_deck_document(deck, commanders=commander)
+    
+    return {
+        "deck_id": deck_id,
+        **legality
+    }
+
+
+@router.post("/{deck_id}/validate", response_model=DeckValidationResponse)
+async def revalidate_deck(deck_id: str):
+    
+    if not is_valid_object_id(deck_id):
+        raise HTTPException(
+            status_code=400,
+            detail=f"ID de deck inválido: '{deck_id}'"
+        )
+    
+    deck = await crud_deck.get_deck_by_id(deck_id)
+    
+    if not deck:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Deck com ID '{deck_id}' não encontrado"
+        )
+    
+    # Sem comandantes informados pelo cliente: o resultado gravado é o mesmo de /admin/revalidate
+    legality = await deck_validation.validate_deck_document(deck)
+    await crud_deck.set_decks_field(deck_validation.LEGALITY_FIELD, [(deck["_id"], legality)])
+    
+    return {
+        "deck_id": deck_id,
+        **legality
+    }
+
+
+def _find_deck(decks: List[Dict[str, Any]], identifier: str) -> Optional[Dict[str, Any]]:
+    for deck in decks:
+        if str(deck["_id"]) == identifier:
+            return deck
+    for deck in decks:
+        if deck.get("name") == identifier:
+            return deck
+    return None
+
+
+def _format_diff_text(diff: Dict[str, List[Dict[str, Any]]]) -> str:
+    removed = [{**entry, "quantity": entry["quantity_a"]} for entry in diff["removed"] + diff["changed"]]
+    added = [{**entry, "quantity": entry["quantity_b"]} for entry in diff["added"] + diff["changed"]]
+    
+    lines = [f"- {line}" for line in _format_export_text({"cards": removed}).splitlines()]
+    lines.extend(f"+ {line}" for line in _format_export_text({"cards": added}).splitlines())
+    
+    return "\n".join(lines)
+
+
+@router.get("/{deck_a}/diff/{deck_b}", response_model=DeckDiffResponse)
+async def diff_decks(
+    deck_a: str,
+    deck_b: str,
+    format: str = Query("json", pattern="^(json|text)$", description="Formato da resposta: json ou text")
+):
+    
+    identifiers = [deck_a, deck_b]
+    decks = await crud_deck.get_decks_by_ids_or_names(identifiers, identifiers)
+    
+    found = {}
+    for identifier in identifiers:
+        deck = _find_deck(decks, identifier)
+        if not deck:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Deck com ID ou nome '{identifier}' não encontrado"
+            )
+        found[identifier] = deck
+    
+    first, second = found[deck_a], found[deck_b]
+    diff = deck_diff.compute_diff(first.get("cards", []), second.get("cards", []))
+    diff = await deck_diff.hydrate_diff(diff)
+    
+    if format == "text":
+        return Response(
+            content=_format_diff_text(diff),
+            media_type="text/plain"
+        )
+    
+    return {
+        "deck_a": {"_id": str(first["_id"]), "name": first.get("name")},
+        "deck_b": {"_id": str(second["_id"]), "name": second.get("name")},
+        **diff
+    }
+
+
+@router.get("/{deck_id}/export/{export_format}")
+async def export_deck_format(
+    deck_id: str,
+    export_format: str,
+    if_none_match: Optional[str] = Header(None)
+):
+    
+    if export_format not in deck_export.EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Formato de exportação inválido: '{export_format}' (use {', '.join(deck_export.EXPORT_FORMATS)})"
+        )
+    
+    if not is_valid_object_id(deck_id):
+        raise HTTPException(
+            status_code=400,
+            detail=f"ID de deck inválido: '{deck_id}'"
+        )
+    
+    deck = await crud_deck.get_deck_by_id(deck_id)
+    
+    if not deck:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Deck com ID '{deck_id}' não encontrado"
+        )
+    
+    # O arquivo só muda quando o deck muda: o ETag deriva de updated_at
+    updated_at = deck.get("updated_at") or deck.get("created_at")
+    etag = f'W/"{deck_id}-{int(updated_at.timestamp() * 1000) if updated_at else 0}-{export_format}"'
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if updated_at:
+        cache_headers["Last-Modified"] = updated_at.strftime("%a, %d %b %Y %H:%M:%S GMT")
+    
+    if if_none_match == etag:
+        return Response(status_code=304, headers=cache_headers)
+    
+    media_type = deck_export.EXPORT_FORMATS[export_format][0]
+    
+    return StreamingResponse(
+        deck_export.stream_deck_export(deck, export_format),
+        media_type=media_type,
+        headers={
+            **cache_headers,
+            "Content-Disposition": f'attachment; filename="{deck_export.export_filename(deck, export_format)}"'
+        }
+    )
+
+
 @router.get("/{deck_id}/export-json")
 async def export_deck_json(deck_id: str):
     
@@ -446,17 +1087,14 @@ async def get_deck_by_name(deck_name: str):
             detail=f"Deck com nome '{deck_name}' não encontrado"
         )
     
-    convert_id_to_string(deck)
-    if "_id" in deck:
-        deck["deck_id"] = deck["_id"]
-    
-    convert_ids_in_list(deck.get("cards", []))
-    
-    return deck
+    return _prepare_deck_with_cards(deck)
 
 
 @router.get("/{deck_id}", response_model=DeckWithCardsResponse)
-async def get_deck(deck_id: str):
+async def get_deck(
+    deck_id: str,
+    at: Optional[datetime] = Query(None, description="Retorna o deck como estava nesta data (ISO 8601)")
+):
 
     if not is_valid_object_id(deck_id):
         raise HTTPException(
@@ -464,21 +1102,21 @@ async def get_deck(deck_id: str):
             detail=f"ID de deck inválido: '{deck_id}'"
         )
 
-    deck = await crud_deck.get_deck_with_cards(deck_id)
+    deck = await crud_deck.get_deck_with_cards(
+        deck_id,
+        at=crud_card_prices.utc_naive(at) if at else None
+    )
     
     if not deck:
+        detail = f"Deck com ID '{deck_id}' não encontrado"
+        if at is not None:
+            detail = f"Nenhuma versão do deck '{deck_id}' encontrada em {at.isoformat()}"
         raise HTTPException(
             status_code=404,
-            detail=f"Deck com ID '{deck_id}' não encontrado"
+            detail=detail
         )
     
-    convert_id_to_string(deck)
-    if "_id" in deck:
-        deck["deck_id"] = deck["_id"]
-    
-    convert_ids_in_list(deck.get("cards", []))
-    
-    return deck
+    return _prepare_deck_with_cards(deck)
 
 
 @router.put("/by-name/{deck_name}", response_model=DeckResponse)
@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.core.health import check_health
+
+router = APIRouter()
+
+
+@router.get("/health")
+async def get_health():
+    
+    health = await check_health()
+    # 503 só quando o banco não responde; pool saturado é "degraded" com 200
+    status_code = 503 if health["status"] == "error" else 200
+    return JSONResponse(content=health, status_code=status_code)
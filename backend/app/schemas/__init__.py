@@ -6,7 +6,16 @@ from app.schemas.card import (
     CardBulkImportRequest,
     CardBulkImportResponse,
     CardSearchRequest,
-    CardListResponse
+    CardListResponse,
+    CardDeckReference,
+    CardDecksResponse,
+    CardUsageResponse,
+    CardUsageRankingItem,
+    CardUsageRankingResponse,
+    CardRelatedItem,
+    CardRelatedResponse,
+    CardPricePoint,
+    CardPriceHistoryResponse
 )
 from app.schemas.deck import (
     DeckCard,
@@ -19,7 +28,42 @@ from app.schemas.deck import (
     AddCardToDeckRequest,
     UpdateCardQuantityRequest,
     BulkDeckImportRequest,
-    BulkDeckImportResponse
+    BulkDeckImportResponse,
+    DeckBatchGetRequest,
+    DeckBatchGetResponse,
+    UnresolvedDeck,
+    UnresolvedCardsReport,
+    DeckStatsResponse,
+    DeckValidationResponse,
+    DeckDiffSide,
+    DeckDiffResponse,
+    DeckTextImportRequest,
+    DeckTextImportResponse,
+    DeckHistoryEntry,
+    DeckHistoryResponse,
+    SimilarDeck,
+    SimilarDecksResponse,
+    DuplicateClusterDeck,
+    DuplicateCluster,
+    DuplicateClustersResponse,
+    TurnProbability,
+    ProbabilityCurve,
+    TargetProbability,
+    DeckProbabilitiesResponse,
+    SimulationTurn,
+    DeckSimulationResponse,
+    SlowRequestEntry,
+    SlowQueryEntry,
+    SlowLogResponse,
+    IndexQueryPlan,
+    CollectionIndexReport,
+    IndexReportResponse,
+    QueryCacheShapeStats,
+    QueryCacheResponse,
+    JobStatus,
+    JobListResponse,
+    DeckValuePoint,
+    DeckValueHistoryResponse
 )
 
 __all__ = [
@@ -32,6 +76,15 @@ __all__ = [
     "CardBulkImportResponse",
     "CardSearchRequest",
     "CardListResponse",
+    "CardDeckReference",
+    "CardDecksResponse",
+    "CardUsageResponse",
+    "CardUsageRankingItem",
+    "CardUsageRankingResponse",
+    "CardRelatedItem",
+    "CardRelatedResponse",
+    "CardPricePoint",
+    "CardPriceHistoryResponse",
     # Deck schemas
     "DeckCard",
     "DeckBase",
@@ -44,5 +97,40 @@ __all__ = [
     "UpdateCardQuantityRequest",
     "BulkDeckImportRequest",
     "BulkDeckImportResponse",
+    "DeckBatchGetRequest",
+    "DeckBatchGetResponse",
+    "UnresolvedDeck",
+    "UnresolvedCardsReport",
+    "DeckStatsResponse",
+    "DeckValidationResponse",
+    "DeckDiffSide",
+    "DeckDiffResponse",
+    "DeckTextImportRequest",
+    "DeckTextImportResponse",
+    "DeckHistoryEntry",
+    "DeckHistoryResponse",
+    "SimilarDeck",
+    "SimilarDecksResponse",
+    "DuplicateClusterDeck",
+    "DuplicateCluster",
+    "DuplicateClustersResponse",
+    "TurnProbability",
+    "ProbabilityCurve",
+    "TargetProbability",
+    "DeckProbabilitiesResponse",
+    "SimulationTurn",
+    "DeckSimulationResponse",
+    "SlowRequestEntry",
+    "SlowQueryEntry",
+    "SlowLogResponse",
+    "IndexQueryPlan",
+    "CollectionIndexReport",
+    "IndexReportResponse",
+    "QueryCacheShapeStats",
+    "QueryCacheResponse",
+    "JobStatus",
+    "JobListResponse",
+    "DeckValuePoint",
+    "DeckValueHistoryResponse",
 ]
 
@@ -1,4 +1,5 @@
 from typing import Optional, List
+from datetime import datetime
 from pydantic import BaseModel, Field, HttpUrl
 
 
@@ -20,12 +21,18 @@ class CardBase(BaseModel):
         default_factory=list, 
         description="Identidade de cor (ex: ['R'])"
     )
+    produced_mana: Optional[List[str]] = Field(
+        None,
+        description="Cores de mana que a carta produz (ex: ['R', 'G'])"
+    )
     rarity: Optional[str] = Field(
         None, 
         description="Raridade: common, uncommon, rare, mythic, special, bonus"
     )
     set_name: Optional[str] = Field(None, description="Nome do set")
     set_code: Optional[str] = Field(None, description="Código do set (ex: 'lea')")
+    collector_number: Optional[str] = Field(None, description="Número de coleção no set (ex: '146')")
+    mtgo_id: Optional[int] = Field(None, description="ID da carta no Magic Online (CatID)")
     image_uris: Optional[dict] = Field(
         None, 
         description="URIs das imagens: {small, normal, large, png, art_crop, border_crop}"
@@ -116,3 +123,72 @@ class CardBulkImportResponse(BaseModel):
             }
         }
 
+
+
+class CardDeckReference(BaseModel):
+    id: str = Field(..., alias="_id", description="ID do deck")
+    name: str = Field(..., description="Nome do deck")
+    format: str = Field(..., description="Formato do deck")
+    quantity: int = Field(..., description="Cópias da carta no deck")
+    
+    class Config:
+        populate_by_name = True
+
+
+class CardDecksResponse(BaseModel):
+    scryfall_id: str = Field(..., description="Carta consultada")
+    scryfall_ids: List[str] = Field(..., description="Impressões consideradas na busca")
+    decks: List[CardDeckReference] = Field(..., description="Decks que contêm a carta")
+    next_cursor: Optional[str] = Field(None, description="Cursor para a próxima página (None se não houver)")
+
+
+class CardUsageResponse(BaseModel):
+    scryfall_id: str = Field(..., description="Carta consultada")
+    scryfall_ids: List[str] = Field(..., description="Impressões consideradas na contagem")
+    decks: int = Field(..., description="Número de decks que usam a carta")
+    copies: int = Field(..., description="Total de cópias em todos os decks")
+    by_format: dict = Field(..., description="Contagens por formato: {formato: {decks, copies}}")
+
+
+class CardUsageRankingItem(BaseModel):
+    scryfall_id: str = Field(..., description="ID da carta (scryfall_id)")
+    decks: int = Field(..., description="Número de decks que usam a carta")
+    copies: int = Field(..., description="Total de cópias em todos os decks")
+
+
+class CardUsageRankingResponse(BaseModel):
+    items: List[CardUsageRankingItem] = Field(..., description="Cartas ordenadas por número de decks")
+    next_cursor: Optional[str] = Field(None, description="Cursor para a próxima página (None se não houver)")
+
+
+class CardRelatedItem(BaseModel):
+    oracle_id: str = Field(..., description="oracle_id da carta parceira (ou scryfall_id se não houver)")
+    scryfall_id: Optional[str] = Field(None, description="Uma impressão da carta parceira")
+    name: Optional[str] = Field(None, description="Nome da carta parceira")
+    count: int = Field(..., description="Decks do formato com as duas cartas")
+    lift: float = Field(..., description="Quanto a dupla aparece acima do esperado ao acaso (> 1 indica associação)")
+    confidence: float = Field(..., description="Fração dos decks com a carta consultada que também usam a parceira")
+
+
+class CardRelatedResponse(BaseModel):
+    scryfall_id: str = Field(..., description="Carta consultada")
+    oracle_id: str = Field(..., description="Chave da carta no índice (oracle_id ou scryfall_id)")
+    format: str = Field(..., description="Formato considerado")
+    decks: int = Field(..., description="Decks do formato que usam a carta")
+    related: List[CardRelatedItem] = Field(..., description="Parceiros ordenados por lift")
+
+
+class CardPricePoint(BaseModel):
+    at: datetime = Field(..., description="Data da mudança de preço")
+    usd: Optional[float] = Field(None, description="Preço em USD")
+    usd_foil: Optional[float] = Field(None, description="Preço foil em USD")
+    usd_etched: Optional[float] = Field(None, description="Preço etched em USD")
+    eur: Optional[float] = Field(None, description="Preço em EUR")
+    eur_foil: Optional[float] = Field(None, description="Preço foil em EUR")
+    tix: Optional[float] = Field(None, description="Preço em tickets do MTGO")
+
+
+class CardPriceHistoryResponse(BaseModel):
+    scryfall_id: str = Field(..., description="Carta consultada")
+    name: Optional[str] = Field(None, description="Nome da carta")
+    points: List[CardPricePoint] = Field(..., description="Preços a cada mudança, em ordem de data")
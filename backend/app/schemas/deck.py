@@ -1,4 +1,4 @@
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from datetime import datetime
 from pydantic import BaseModel, Field
 
@@ -52,6 +52,7 @@ class DeckResponse(DeckBase):
     id: str = Field(..., alias="_id", description="ID do deck no MongoDB")
     created_at: datetime = Field(..., description="Data de criação")
     updated_at: datetime = Field(..., description="Data de última atualização")
+    version: Optional[int] = Field(None, description="Versão atual do deck")
     
     class Config:
         populate_by_name = True
@@ -78,6 +79,7 @@ class DeckWithCardsResponse(BaseModel):
     cards: List[dict] = Field(..., description="Lista de cartas com dados completos")
     created_at: datetime = Field(..., description="Data de criação")
     updated_at: datetime = Field(..., description="Data de última atualização")
+    version: Optional[int] = Field(None, description="Versão do deck")
     
     class Config:
         populate_by_name = True
@@ -161,3 +163,313 @@ class BulkDeckImportResponse(BaseModel):
             }
         }
 
+
+
+class DeckBatchGetRequest(BaseModel):
+    ids: List[str] = Field(default_factory=list, max_items=500, description="IDs dos decks (máximo 500)")
+    names: List[str] = Field(default_factory=list, max_items=500, description="Nomes dos decks (máximo 500)")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "ids": ["507f1f77bcf86cd799439011"],
+                "names": ["Red Deck Wins"]
+            }
+        }
+
+
+class DeckBatchGetResponse(BaseModel):
+    total: int = Field(..., description="Total de decks encontrados")
+    decks: List[DeckWithCardsResponse] = Field(..., description="Decks com cartas expandidas")
+    not_found: List[str] = Field(..., description="IDs ou nomes que não foram encontrados")
+
+
+class UnresolvedDeck(BaseModel):
+    id: str = Field(..., alias="_id", description="ID do deck")
+    name: str = Field(..., description="Nome do deck")
+    format: str = Field(..., description="Formato do deck")
+    missing_scryfall_ids: List[str] = Field(..., description="Cartas referenciadas que não existem em db.cards")
+    
+    class Config:
+        populate_by_name = True
+
+
+class UnresolvedCardsReport(BaseModel):
+    missing_cards: int = Field(..., description="Total de cartas referenciadas ausentes no banco")
+    missing_scryfall_ids: List[str] = Field(..., description="scryfall_ids ausentes no banco (até missing_limit)")
+    missing_truncated: bool = Field(..., description="Se a lista de scryfall_ids ausentes foi cortada em missing_limit")
+    decks: List[UnresolvedDeck] = Field(..., description="Decks com referências não resolvidas")
+
+
+class DeckStatsResponse(BaseModel):
+    deck_id: str = Field(..., description="ID do deck")
+    total_cards: int = Field(..., description="Total de cópias no deck")
+    unique_cards: int = Field(..., description="Número de cartas distintas")
+    missing_cards: int = Field(..., description="Cartas distintas ausentes em db.cards")
+    mana_curve: dict = Field(..., description="Cópias por custo de mana, sem terrenos: {'0': n, ..., '7+': n}")
+    colors: dict = Field(..., description="Cópias por cor, sem terrenos ('C' para incolor)")
+    types: dict = Field(..., description="Cópias por tipo de carta (ex: {'Creature': 20, 'Land': 24})")
+    total_price_usd: float = Field(..., description="Preço total do deck em USD")
+    computed_at: Optional[datetime] = Field(None, description="Data da última atualização das estatísticas")
+
+
+class DeckValidationResponse(BaseModel):
+    deck_id: str = Field(..., description="ID do deck")
+    format: str = Field(..., description="Formato validado")
+    valid: Optional[bool] = Field(None, description="Se o deck é válido (None se o formato não possui regras)")
+    errors: List[str] = Field(..., description="Violações das regras do formato")
+    warnings: List[str] = Field(..., description="Avisos (cartas ausentes ou sem legalidade conhecida)")
+    checked_at: datetime = Field(..., description="Data da validação")
+
+
+class DeckDiffSide(BaseModel):
+    id: str = Field(..., alias="_id", description="ID do deck")
+    name: str = Field(..., description="Nome do deck")
+    
+    class Config:
+        populate_by_name = True
+
+
+class DeckDiffResponse(BaseModel):
+    deck_a: DeckDiffSide = Field(..., description="Deck de referência")
+    deck_b: DeckDiffSide = Field(..., description="Deck comparado")
+    added: List[dict] = Field(..., description="Cartas presentes apenas no deck B")
+    removed: List[dict] = Field(..., description="Cartas presentes apenas no deck A")
+    changed: List[dict] = Field(..., description="Cartas com quantidade diferente (quantity_a, quantity_b, delta)")
+
+
+class DeckTextImportRequest(BaseModel):
+    name: str = Field(..., min_length=3, max_length=200, description="Nome do deck (minimo 3 caracteres)")
+    format: str = Field(..., description="Formato do deck (ex: commander, standard, modern, legacy, vintage, pauper, bulk)")
+    text: str = Field(..., min_length=1, description="Lista do deck em texto (MTGO, Arena ou '4 Lightning Bolt')")
+    include_sideboard: bool = Field(False, description="Incluir as cartas do sideboard/maybeboard no deck")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "name": "Red Deck Wins",
+                "format": "modern",
+                "text": "Deck\n4 Lightning Bolt (M10) 146\n20 Mountain\n\nSideboard\n3 Smash to Smithereens",
+                "include_sideboard": False
+            }
+        }
+
+
+class DeckTextImportResponse(BaseModel):
+    deck: DeckResponse = Field(..., description="Deck criado")
+    parsed_cards: int = Field(..., description="Linhas de carta lidas da lista")
+    skipped_cards: int = Field(..., description="Linhas ignoradas (sideboard/maybeboard)")
+    local_matches: int = Field(..., description="Nomes resolvidos no banco local")
+    remote_matches: int = Field(..., description="Nomes resolvidos na Scryfall")
+
+
+class DeckHistoryEntry(BaseModel):
+    version: int = Field(..., description="Versão do deck")
+    at: datetime = Field(..., description="Data da alteração")
+    cards: List[List] = Field(..., description="Cartas alteradas: pares [scryfall_id, nova quantidade]; 0 indica carta removida")
+    fields: dict = Field(..., description="Campos alterados (name, format)")
+
+
+class DeckHistoryResponse(BaseModel):
+    deck_id: str = Field(..., description="ID do deck")
+    entries: List[DeckHistoryEntry] = Field(..., description="Versões do deck, da mais recente para a mais antiga")
+    next_before_version: Optional[int] = Field(None, description="Valor de before_version para a próxima página")
+
+
+class SimilarDeck(BaseModel):
+    id: str = Field(..., alias="_id", description="ID do deck")
+    name: str = Field(..., description="Nome do deck")
+    format: str = Field(..., description="Formato do deck")
+    similarity: float = Field(..., description="Similaridade de Jaccard estimada entre os conjuntos de cartas (0 a 1)")
+    
+    class Config:
+        populate_by_name = True
+
+
+class SimilarDecksResponse(BaseModel):
+    deck_id: str = Field(..., description="Deck consultado")
+    threshold: float = Field(..., description="Similaridade mínima aplicada")
+    decks: List[SimilarDeck] = Field(..., description="Decks parecidos, do mais parecido para o menos parecido")
+
+
+class DuplicateClusterDeck(BaseModel):
+    id: str = Field(..., alias="_id", description="ID do deck")
+    name: Optional[str] = Field(None, description="Nome do deck")
+    format: Optional[str] = Field(None, description="Formato do deck")
+    
+    class Config:
+        populate_by_name = True
+
+
+class DuplicateCluster(BaseModel):
+    size: int = Field(..., description="Número de decks no grupo")
+    decks: List[DuplicateClusterDeck] = Field(..., description="Decks quase idênticos entre si")
+
+
+class DuplicateClustersResponse(BaseModel):
+    threshold: float = Field(..., description="Similaridade mínima aplicada")
+    total: int = Field(..., description="Número de grupos retornados")
+    clusters: List[DuplicateCluster] = Field(..., description="Grupos de decks quase idênticos, dos maiores para os menores")
+
+
+class TurnProbability(BaseModel):
+    turn: int = Field(..., description="Turno")
+    cards_seen: int = Field(..., description="Cartas vistas até o turno (mão inicial + compras)")
+    probability: float = Field(..., description="Probabilidade de atingir o alvo até o turno")
+
+
+class ProbabilityCurve(BaseModel):
+    by_turn: List[TurnProbability] = Field(..., description="Probabilidade acumulada por turno")
+    opening_hand: List[float] = Field(..., description="Probabilidade na mão inicial com 0, 1, 2... mulligans (London)")
+
+
+class TargetProbability(ProbabilityCurve):
+    target: str = Field(..., description="Alvo consultado (ex: 'land>=3', 'source:R>=2')")
+    cards: int = Field(..., description="Cartas do deck que contam para o alvo")
+    at_least: int = Field(..., description="Mínimo de cartas do alvo")
+
+
+class DeckProbabilitiesResponse(BaseModel):
+    deck_id: str = Field(..., description="ID do deck")
+    version: Optional[int] = Field(None, description="Versão do deck usada no cálculo")
+    total_cards: int = Field(..., description="Total de cartas do deck")
+    turns: int = Field(..., description="Último turno calculado")
+    on_the_play: bool = Field(..., description="Se o jogador começa (não compra no primeiro turno)")
+    mulligans: int = Field(..., description="Número máximo de mulligans considerado")
+    targets: List[TargetProbability] = Field(..., description="Probabilidades de cada alvo")
+    all_targets: Optional[ProbabilityCurve] = Field(None, description="Probabilidade de atingir todos os alvos juntos (até 4 alvos)")
+
+
+class SimulationTurn(BaseModel):
+    turn: int = Field(..., description="Turno")
+    average_mana_spent: float = Field(..., description="Mana gasta em média no turno")
+    average_lands_in_play: float = Field(..., description="Terrenos em jogo em média no fim do turno")
+
+
+class DeckSimulationResponse(BaseModel):
+    deck_id: str = Field(..., description="ID do deck")
+    version: Optional[int] = Field(None, description="Versão do deck simulada")
+    games: int = Field(..., description="Partidas simuladas")
+    turns: int = Field(..., description="Turnos por partida")
+    on_the_play: bool = Field(..., description="Se o jogador começa (não compra no primeiro turno)")
+    seed: int = Field(..., description="Seed da simulação (mesma seed e partidas = mesmo resultado)")
+    missing_cards: int = Field(..., description="Cópias de cartas ausentes em db.cards (nunca conjuradas)")
+    curve_out_turn: dict = Field(..., description="Distribuição do último turno de curva perfeita a partir do turno 2: {turno: fração das partidas}")
+    curve_out_rate: Optional[float] = Field(None, description="Fração das partidas com curva perfeita do turno 2 até o último turno")
+    screw_rate: float = Field(..., description="Fração das partidas com 2+ terrenos a menos que o turno no turno 4")
+    flood_rate: float = Field(..., description="Fração das partidas que terminam com 3+ terrenos parados na mão")
+    average_mulligans: float = Field(..., description="Mulligans por partida em média")
+    by_turn: List[SimulationTurn] = Field(..., description="Médias por turno")
+
+
+class SlowRequestEntry(BaseModel):
+    method: str = Field(..., description="Método HTTP")
+    route: str = Field(..., description="Template da rota (ex: /decks/{deck_id}/export)")
+    status: str = Field(..., description="Status da resposta")
+    total_ms: float = Field(..., description="Duração total da requisição")
+    db_ms: float = Field(..., description="Tempo somado dos comandos do MongoDB")
+    db_commands: int = Field(..., description="Comandos do MongoDB executados")
+    upstream_ms: float = Field(..., description="Tempo somado das chamadas à Scryfall")
+    upstream_calls: int = Field(..., description="Chamadas à Scryfall")
+    serialize_ms: Optional[float] = Field(None, description="Tempo do retorno da rota até o último byte da resposta")
+
+
+class SlowQueryEntry(BaseModel):
+    collection: Optional[Any] = Field(None, description="Coleção consultada")
+    command: str = Field(..., description="Comando (find, aggregate, count, distinct, findAndModify)")
+    duration_ms: float = Field(..., description="Duração do comando")
+    shape: Any = Field(..., description="Formato do filtro ou pipeline, com os valores trocados por '?'")
+    skip: Optional[int] = Field(None, description="skip da consulta")
+    limit: Optional[int] = Field(None, description="limit da consulta")
+    explain: Optional[dict] = Field(None, description="Resumo do explain (apenas na primeira ocorrência de cada formato)")
+
+
+class SlowLogResponse(BaseModel):
+    pid: int = Field(..., description="Processo (worker) que atendeu: o log é de cada processo")
+    slow_request_ms: int = Field(..., description="Limite do log de requisições lentas (0 = desligado)")
+    slow_query_ms: int = Field(..., description="Limite do log de consultas lentas (0 = desligado)")
+    requests: List[SlowRequestEntry] = Field(..., description="Últimas requisições lentas, da mais recente para a mais antiga")
+    queries: List[SlowQueryEntry] = Field(..., description="Últimas consultas lentas, da mais recente para a mais antiga")
+
+
+class IndexQueryPlan(BaseModel):
+    name: str = Field(..., description="Nome da consulta canônica")
+    source: str = Field(..., description="Função de app/crud que faz a consulta")
+    collection: str = Field(..., description="Coleção consultada")
+    indexes: List[str] = Field(..., description="Índices usados pelo plano vencedor")
+    problems: List[str] = Field(..., description="Problemas do plano (COLLSCAN, SORT em memória)")
+    plan: str = Field(..., description="Estágios do plano vencedor, do topo para a folha")
+    returned: Optional[int] = Field(None, description="Documentos retornados")
+    keys_examined: Optional[int] = Field(None, description="Chaves de índice examinadas")
+    docs_examined: Optional[int] = Field(None, description="Documentos examinados")
+    execution_ms: Optional[int] = Field(None, description="Tempo de execução do explain")
+
+
+class CollectionIndexReport(BaseModel):
+    collection: str = Field(..., description="Coleção")
+    missing: List[str] = Field(..., description="Índices da especificação que não existem no banco")
+    unmanaged: List[str] = Field(..., description="Índices existentes fora da especificação")
+    unused: List[str] = Field(..., description="Índices da especificação não usados por nenhuma consulta canônica")
+    ops: Dict[str, int] = Field(..., description="Operações por índice desde o último restart do MongoDB ($indexStats)")
+
+
+class IndexReportResponse(BaseModel):
+    ok: bool = Field(..., description="True se nenhum problema foi encontrado")
+    problems: int = Field(..., description="Total de problemas encontrados")
+    queries: List[IndexQueryPlan] = Field(..., description="Plano de cada consulta canônica")
+    collections: List[CollectionIndexReport] = Field(..., description="Índices por coleção")
+
+
+class QueryCacheShapeStats(BaseModel):
+    query: str = Field(..., description="Consulta em cache (cards.search ou cards.count)")
+    shape: str = Field(..., description="Campos do filtro (ex: colors+rarity; all = sem filtro)")
+    hits: int = Field(..., description="Resultados lidos do cache")
+    misses: int = Field(..., description="Resultados buscados no banco")
+    hit_rate: float = Field(..., description="Taxa de acerto (0 a 1)")
+
+
+class QueryCacheResponse(BaseModel):
+    backend: str = Field(..., description="Backend do cache: memory, mongo ou off")
+    pid: int = Field(..., description="Processo (worker) que atendeu: entradas e contagens são dele")
+    entries: Optional[int] = Field(None, description="Entradas no cache do processo (null no backend mongo)")
+    generation: int = Field(..., description="Geração atual da coleção de cartas")
+    shapes: List[QueryCacheShapeStats] = Field(..., description="Acertos e faltas por consulta e formato do filtro, neste processo")
+
+
+class JobStatus(BaseModel):
+    name: str = Field(..., description="Nome da tarefa")
+    description: str = Field(..., description="O que a tarefa faz")
+    interval_seconds: float = Field(..., description="Intervalo entre execuções")
+    runs: int = Field(0, description="Execuções registradas")
+    failures: int = Field(0, description="Execuções que terminaram em erro")
+    running: bool = Field(False, description="Execução em andamento")
+    owner: Optional[str] = Field(None, description="Worker (host:pid) da última execução")
+    last_started_at: Optional[datetime] = Field(None, description="Início da última execução")
+    last_finished_at: Optional[datetime] = Field(None, description="Fim da última execução")
+    last_duration_ms: Optional[float] = Field(None, description="Duração da última execução")
+    last_status: Optional[str] = Field(None, description="Resultado da última execução: ok ou error")
+    last_error: Optional[str] = Field(None, description="Erro da última execução")
+    last_result: Optional[Dict[str, Any]] = Field(None, description="Resumo da última execução")
+    next_run_at: Optional[datetime] = Field(None, description="Próxima execução (no próximo tick do líder, se já passou)")
+    state: Optional[Dict[str, Any]] = Field(None, description="Estado próprio da tarefa (ex: cursor da passada pelo catálogo)")
+
+
+class JobListResponse(BaseModel):
+    leader: Optional[str] = Field(None, description="Worker (host:pid) líder do agendador, se a lease estiver válida")
+    worker: str = Field(..., description="Worker que atendeu a requisição")
+    jobs: List[JobStatus] = Field(..., description="Tarefas registradas")
+
+
+class DeckValuePoint(BaseModel):
+    at: datetime = Field(..., description="Data do ponto")
+    value: float = Field(..., description="Valor da lista na data (quantidade x preço em vigor)")
+    priced_cards: int = Field(..., description="Cartas distintas com preço na data")
+    missing_cards: int = Field(..., description="Cartas distintas sem preço na data")
+
+
+class DeckValueHistoryResponse(BaseModel):
+    deck_id: str = Field(..., description="ID do deck")
+    name: str = Field(..., description="Nome do deck")
+    currency: str = Field(..., description="Preço usado (usd, usd_foil, eur, tix...)")
+    interval: str = Field(..., description="Intervalo entre os pontos: day ou week")
+    points: List[DeckValuePoint] = Field(..., description="Valor do deck em cada data, do mais antigo ao mais recente")
@@ -0,0 +1,48 @@
+"""
+Backfill de cartas referenciadas por decks mas ausentes em db.cards
+"""
+from typing import List, Dict, Any
+
+import httpx
+
+from app.crud import card as crud_card
+from app.crud import deck as crud_deck
+from app.services.scryfall import get_cards_by_ids
+from app.utils import map_scryfall_to_card
+
+
+async def backfill_cards(scryfall_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Busca as cartas na Scryfall e grava no banco (write-through), para que
+    as próximas leituras sejam locais.
+    
+    Returns:
+        Mapa scryfall_id -> carta mapeada, apenas para as cartas encontradas
+    """
+    if not scryfall_ids:
+        return {}
+    
+    scryfall_results = await get_cards_by_ids(scryfall_ids)
+    
+    cards_map = {}
+    for scryfall_data in scryfall_results:
+        try:
+            card_data = map_scryfall_to_card(scryfall_data)
+        except ValueError:
+            continue
+        cards_map[card_data["scryfall_id"]] = card_data
+    
+    await crud_card.upsert_cards_bulk(list(cards_map.values()))
+    return cards_map
+
+
+async def backfill_unresolved_deck_cards() -> int:
+    backfilled = 0
+    async for missing_ids in crud_deck.iter_unresolved_scryfall_ids():
+        try:
+            cards_map = await backfill_cards(missing_ids)
+        except (httpx.HTTPStatusError, httpx.RequestError):
+            return backfilled
+        backfilled += len(cards_map)
+    
+    return backfilled
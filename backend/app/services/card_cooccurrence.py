@@ -0,0 +1,94 @@
+"""
+Reconstrução completa do índice de co-ocorrência de cartas
+
+O índice é mantido incrementalmente pelas escritas em app.crud.deck; este
+job o recalcula do zero (ex: na primeira implantação ou após mudanças de
+oracle_id). A contagem dos pares, que é quadrática no tamanho de cada deck,
+roda em um pool de processos enquanto o cursor de decks continua sendo lido.
+"""
+import asyncio
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.crud import card_cooccurrence as crud_cooccurrence
+from app.crud import deck as crud_deck
+
+
+def _count_batch(decks_keys: List[List[str]]) -> Tuple[Counter, Counter]:
+    pair_counts: Counter = Counter()
+    card_counts: Counter = Counter()
+    for keys in decks_keys:
+        keys = sorted(set(keys))
+        card_counts.update(keys)
+        pair_counts.update(combinations(keys, 2))
+    return pair_counts, card_counts
+
+
+async def _batch_keys(batch: List[Dict[str, Any]], keys_cache: Dict[str, str]) -> List[List[str]]:
+    missing_ids = {
+        card.get("scryfall_id")
+        for deck in batch
+        for card in deck.get("cards", [])
+        if card.get("scryfall_id") and card.get("scryfall_id") not in keys_cache
+    }
+    keys_cache.update(await crud_cooccurrence.get_card_keys(missing_ids))
+    return [list(crud_cooccurrence.deck_card_keys(deck, keys_cache)) for deck in batch]
+
+
+async def rebuild_cooccurrence(
+    workers: Optional[int] = None,
+    batch_size: int = crud_deck.DECK_IMPORT_CHUNK_SIZE
+) -> Dict[str, int]:
+    """
+    Recalcula as contagens formato a formato em coleções temporárias e as
+    publica no final. Escritas feitas durante o rebuild não entram no
+    resultado; rode o job com pouco tráfego de escrita.
+    """
+    loop = asyncio.get_running_loop()
+    keys_cache: Dict[str, str] = {}
+    summary = {"formats": 0, "decks": 0, "pairs": 0}
+
+    await crud_cooccurrence.reset_staging()
+
+    workers = workers or os.cpu_count() or 1
+    max_pending = 2 * workers
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for format in await crud_deck.get_deck_formats():
+            if not format:
+                continue
+            pair_counts: Counter = Counter()
+            card_counts: Counter = Counter()
+            pending = []
+
+            def merge(result: Tuple[Counter, Counter]) -> None:
+                pair_counts.update(result[0])
+                card_counts.update(result[1])
+
+            async def submit(batch: List[Dict[str, Any]]) -> None:
+                decks_keys = await _batch_keys(batch, keys_cache)
+                pending.append(loop.run_in_executor(executor, _count_batch, decks_keys))
+                if len(pending) >= max_pending:
+                    merge(await pending.pop(0))
+
+            batch = []
+            async for deck in crud_deck.iter_all_decks({"cards.scryfall_id": 1}, batch_size, format=format):
+                batch.append(deck)
+                summary["decks"] += 1
+                if len(batch) >= batch_size:
+                    await submit(batch)
+                    batch = []
+
+            if batch:
+                await submit(batch)
+            for result in await asyncio.gather(*pending):
+                merge(result)
+
+            summary["pairs"] += await crud_cooccurrence.write_staging(format, pair_counts, card_counts)
+            summary["formats"] += 1
+
+    await crud_cooccurrence.publish_staging()
+    return summary
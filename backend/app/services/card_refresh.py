@@ -0,0 +1,131 @@
+"""
+Atualização contínua do catálogo de cartas pela Scryfall (tarefa do agendador)
+
+Cada execução da tarefa "card-refresh" busca na Scryfall o próximo lote de
+cartas do banco, em ordem de scryfall_id (uma chamada a /cards/collection
+por lote), e grava apenas as cartas que mudaram (preços, legalidades,
+imagens etc.). O cursor da passada fica no estado da tarefa: a passada
+continua de onde parou após restarts ou troca de líder. Ao fim de uma
+passada, a próxima começa quando a anterior completar CARD_REFRESH_MAX_AGE_HOURS,
+então nenhuma carta fica mais velha que isso (mais o tempo da passada).
+Com o catálogo vazio nenhuma passada começa: a tarefa volta a olhar a cada
+CARD_REFRESH_INTERVAL_SECONDS e a primeira passada começa assim que houver cartas.
+
+Com um lote a cada CARD_REFRESH_INTERVAL_SECONDS, a Scryfall recebe uma
+requisição por intervalo, bem abaixo do limite de 10 por segundo.
+"""
+from datetime import datetime, timedelta
+from typing import List, Dict, Any
+
+from app.core.config import (
+    CARD_REFRESH_BATCH_SIZE,
+    CARD_REFRESH_INTERVAL_SECONDS,
+    CARD_REFRESH_MAX_AGE_HOURS
+)
+from app.core.scheduler import Job, JobOutcome
+from app.crud import card as crud_card
+from app.services.scryfall import get_cards_by_ids
+from app.utils import map_scryfall_to_card
+
+
+def changed_cards(stored_map: Dict[str, Dict[str, Any]], cards_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Cartas mapeadas com algum campo diferente do documento salvo."""
+    changed = []
+    for card_data in cards_data:
+        stored = stored_map.get(card_data["scryfall_id"])
+        if stored is None:
+            continue
+        if any(stored.get(key) != value for key, value in card_data.items()):
+            changed.append(card_data)
+    return changed
+
+
+async def refresh_cards(scryfall_ids: List[str]) -> Dict[str, int]:
+    """
+    Busca as cartas na Scryfall e grava só as que mudaram.
+
+    Returns:
+        Contagens do lote: checked (pedidas), changed (gravadas) e missing
+        (não encontradas na Scryfall)
+    """
+    scryfall_results = await get_cards_by_ids(scryfall_ids)
+
+    cards_data = []
+    for scryfall_data in scryfall_results:
+        try:
+            cards_data.append(map_scryfall_to_card(scryfall_data))
+        except ValueError:
+            continue
+
+    stored_map = await crud_card.get_cards_by_scryfall_ids([card_data["scryfall_id"] for card_data in cards_data])
+    changed = changed_cards(stored_map, cards_data)
+    if changed:
+        await crud_card.upsert_cards_bulk(changed)
+
+    return {
+        "checked": len(scryfall_ids),
+        "changed": len(changed),
+        "missing": len(scryfall_ids) - len(cards_data),
+    }
+
+
+async def refresh_catalog_step(state: Dict[str, Any]) -> JobOutcome:
+    now = datetime.utcnow()
+    max_age = timedelta(hours=CARD_REFRESH_MAX_AGE_HOURS)
+    cursor = state.get("cursor")
+
+    if cursor is None:
+        pass_started_at = state.get("pass_started_at")
+        if pass_started_at and now - pass_started_at < max_age:
+            next_pass_at = pass_started_at + max_age
+            return JobOutcome(
+                state,
+                {"status": "idle", "next_pass_at": next_pass_at},
+                next_run_in=(next_pass_at - now).total_seconds()
+            )
+
+    scryfall_ids = await crud_card.get_scryfall_ids_after(cursor, CARD_REFRESH_BATCH_SIZE)
+    if cursor is None and not scryfall_ids:
+        # Catálogo vazio: nenhuma passada começa (nem termina), só volta a olhar no próximo intervalo
+        return JobOutcome(state, {"status": "empty"}, next_run_in=CARD_REFRESH_INTERVAL_SECONDS)
+
+    if cursor is None:
+        state = {
+            "pass_started_at": now,
+            "cursor": None,
+            "checked": 0,
+            "changed": 0,
+            "missing": 0,
+            "last_pass": state.get("last_pass"),
+        }
+
+    if not scryfall_ids:
+        state["cursor"] = None
+        state["last_pass"] = {
+            "started_at": state["pass_started_at"],
+            "completed_at": now,
+            "checked": state["checked"],
+            "changed": state["changed"],
+            "missing": state["missing"],
+        }
+        next_pass_at = state["pass_started_at"] + max_age
+        return JobOutcome(
+            state,
+            {"status": "pass_completed", **state["last_pass"]},
+            next_run_in=max((next_pass_at - now).total_seconds(), CARD_REFRESH_INTERVAL_SECONDS)
+        )
+
+    batch = await refresh_cards(scryfall_ids)
+    state["cursor"] = scryfall_ids[-1]
+    for key, value in batch.items():
+        state[key] += value
+
+    return JobOutcome(state, {"status": "batch", **batch})
+
+
+CARD_REFRESH_JOB = Job(
+    "card-refresh",
+    "Atualiza as cartas do catálogo pela Scryfall em lotes, gravando só as que mudaram",
+    CARD_REFRESH_INTERVAL_SECONDS,
+    refresh_catalog_step
+)
@@ -0,0 +1,221 @@
+"""
+Backup e restauração de decks em streaming (NDJSON, opcionalmente gzip)
+"""
+import hashlib
+import json
+import zlib
+from typing import AsyncIterator, Dict, Any, Tuple
+
+from pydantic import ValidationError
+
+from app.crud import deck as crud_deck
+from app.schemas import DeckCreate
+
+BACKUP_PROJECTION = {"_id": 0, "name": 1, "format": 1, "cards": 1}
+TRAILER_KEY = "_trailer"
+_TRAILER_PREFIX = b'{"' + TRAILER_KEY.encode() + b'"'
+
+
+def _backup_deck(deck: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "name": deck.get("name"),
+        "format": deck.get("format"),
+        "cards": [
+            {
+                "scryfall_id": card.get("scryfall_id"),
+                "quantity": card.get("quantity", 1)
+            }
+            for card in deck.get("cards", [])
+        ]
+    }
+
+
+async def _iter_backup_batches(batch_size: int) -> AsyncIterator[list]:
+    batch = []
+    async for deck in crud_deck.iter_all_decks(BACKUP_PROJECTION, batch_size, heavy_read=True):
+        batch.append(_backup_deck(deck))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+async def _gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+async def gunzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Descompacta um fluxo gzip incrementalmente; fluxos sem o cabeçalho gzip
+    são repassados sem alteração.
+    """
+    decompressor = None
+    first = True
+
+    async for chunk in chunks:
+        if first and chunk:
+            first = False
+            if chunk[:2] == b"\x1f\x8b":
+                decompressor = zlib.decompressobj(wbits=31)
+
+        if decompressor is None:
+            yield chunk
+        else:
+            yield decompressor.decompress(chunk)
+
+    if decompressor is not None:
+        yield decompressor.flush()
+
+
+async def _iter_backup_ndjson(batch_size: int) -> AsyncIterator[bytes]:
+    checksum = hashlib.sha256()
+    count = 0
+
+    async for batch in _iter_backup_batches(batch_size):
+        payload = "".join(json.dumps(deck) + "\n" for deck in batch).encode()
+        checksum.update(payload)
+        count += len(batch)
+        yield payload
+
+    trailer = {TRAILER_KEY: {"count": count, "sha256": checksum.hexdigest()}}
+    yield (json.dumps(trailer) + "\n").encode()
+
+
+async def _iter_backup_json(batch_size: int) -> AsyncIterator[bytes]:
+    yield b"["
+    first = True
+
+    async for batch in _iter_backup_batches(batch_size):
+        payload = ",".join(json.dumps(deck) for deck in batch)
+        yield (payload if first else "," + payload).encode()
+        first = False
+
+    yield b"]"
+
+
+def iter_backup(
+    format: str = "ndjson",
+    compress: bool = False,
+    batch_size: int = crud_deck.DECK_IMPORT_CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    """
+    Gera o backup de todos os decks percorrendo um cursor, lote a lote.
+
+    No formato NDJSON a última linha é um trailer
+    `{"_trailer": {"count": N, "sha256": "..."}}` calculado sobre as linhas de decks.
+    """
+    if format == "json":
+        chunks = _iter_backup_json(batch_size)
+    else:
+        chunks = _iter_backup_ndjson(batch_size)
+
+    if compress:
+        return _gzip_chunks(chunks)
+    return chunks
+
+
+async def _insert_chunk(decks: list) -> Tuple[int, list]:
+    try:
+        inserted, failures = await crud_deck.insert_decks_bulk(decks)
+        return len(inserted), failures
+    except Exception as e:
+        return 0, [
+            {"name": deck["name"], "error": f"Erro ao importar: {str(e)}"}
+            for deck in decks
+        ]
+
+
+async def import_decks_ndjson(
+    lines: AsyncIterator[Tuple[int, bytes]],
+    resume_from: int = 0,
+    chunk_size: int = crud_deck.DECK_IMPORT_CHUNK_SIZE
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Importa decks de linhas NDJSON em lotes de insert_many, gerando um evento
+    de progresso por lote e um evento final.
+
+    `processed` conta as linhas de deck lidas (incluindo as puladas), então o
+    valor do último evento pode ser reenviado como `resume_from` para retomar
+    uma restauração interrompida. Se houver um trailer de backup, o checksum
+    das linhas é conferido.
+    """
+    checksum = hashlib.sha256()
+    processed = 0
+    success = 0
+    failed = 0
+    chunk = []
+    chunk_failures = []
+    trailer = None
+
+    async def flush() -> Dict[str, Any]:
+        nonlocal success, failed
+
+        inserted_count, insert_failures = await _insert_chunk(chunk)
+        failures = chunk_failures + insert_failures
+        chunk.clear()
+        chunk_failures.clear()
+
+        success += inserted_count
+        failed += len(failures)
+
+        return {
+            "processed": processed,
+            "success": success,
+            "failed": failed,
+            "failed_decks": failures
+        }
+
+    async for line_number, line in lines:
+        if line.startswith(_TRAILER_PREFIX):
+            trailer = json.loads(line).get(TRAILER_KEY, {})
+            continue
+
+        checksum.update(line + b"\n")
+        processed += 1
+
+        if processed <= resume_from:
+            continue
+
+        try:
+            deck_data = DeckCreate.model_validate_json(line)
+            chunk.append({
+                "name": deck_data.name,
+                "format": deck_data.format,
+                "cards": [
+                    {"scryfall_id": card.scryfall_id, "quantity": card.quantity}
+                    for card in deck_data.cards
+                ]
+            })
+        except ValidationError as e:
+            chunk_failures.append({
+                "line": line_number,
+                "error": f"Deck inválido: {e.errors(include_url=False)}"
+            })
+
+        if len(chunk) + len(chunk_failures) >= chunk_size:
+            yield await flush()
+
+    if chunk or chunk_failures:
+        yield await flush()
+
+    summary = {
+        "done": True,
+        "total": processed,
+        "success": success,
+        "failed": failed
+    }
+
+    if trailer is not None:
+        summary["checksum_ok"] = (
+            trailer.get("sha256") == checksum.hexdigest()
+            and trailer.get("count") == processed
+        )
+
+    yield summary
@@ -0,0 +1,63 @@
+"""
+Diferença entre dois decks calculada sobre as listas compactas de cartas
+"""
+from typing import Dict, Any, List
+
+from app.crud.card import get_cards_by_scryfall_ids, DECK_CARD_PROJECTION
+
+
+def _quantities(deck_cards: List[Dict[str, Any]]) -> Dict[str, int]:
+    quantities: Dict[str, int] = {}
+    for card in deck_cards:
+        scryfall_id = card.get("scryfall_id")
+        if scryfall_id:
+            quantities[scryfall_id] = quantities.get(scryfall_id, 0) + card.get("quantity", 1)
+    return quantities
+
+
+def compute_diff(
+    cards_a: List[Dict[str, Any]],
+    cards_b: List[Dict[str, Any]]
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Compara as listas `{scryfall_id, quantity}` dos decks A e B.
+
+    Returns:
+        {"added": [...], "removed": [...], "changed": [...]} em relação a A,
+        com `quantity_a`/`quantity_b` em cada entrada
+    """
+    quantities_a = _quantities(cards_a)
+    quantities_b = _quantities(cards_b)
+
+    diff = {"added": [], "removed": [], "changed": []}
+
+    for scryfall_id, quantity_b in quantities_b.items():
+        quantity_a = quantities_a.get(scryfall_id, 0)
+        if quantity_a == 0:
+            diff["added"].append({"scryfall_id": scryfall_id, "quantity_a": 0, "quantity_b": quantity_b})
+        elif quantity_a != quantity_b:
+            diff["changed"].append({"scryfall_id": scryfall_id, "quantity_a": quantity_a, "quantity_b": quantity_b})
+
+    for scryfall_id, quantity_a in quantities_a.items():
+        if scryfall_id not in quantities_b:
+            diff["removed"].append({"scryfall_id": scryfall_id, "quantity_a": quantity_a, "quantity_b": 0})
+
+    return diff
+
+
+async def hydrate_diff(diff: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Expande apenas as cartas alteradas, com uma única query projetada.
+    """
+    scryfall_ids = [entry["scryfall_id"] for entries in diff.values() for entry in entries]
+    cards_map = await get_cards_by_scryfall_ids(scryfall_ids, DECK_CARD_PROJECTION)
+
+    for entries in diff.values():
+        for entry in entries:
+            card = cards_map.get(entry["scryfall_id"])
+            if card:
+                card.pop("_id", None)
+                entry.update({**card, **entry})
+            entry["delta"] = entry["quantity_b"] - entry["quantity_a"]
+
+    return diff
@@ -0,0 +1,219 @@
+"""
+Exportação de decks em formatos de outros clientes (Arena, MTGO .dek, CSV)
+e exportação de vários decks em um único zip
+
+Os arquivos são gerados em streaming: cada carta é escrita assim que sai
+do cursor de hidratação, sem montar o arquivo inteiro em memória.
+"""
+import csv
+import io
+import re
+import zipfile
+from typing import AsyncIterator, Dict, Any, Optional
+from xml.sax.saxutils import quoteattr
+
+from app.crud import deck as crud_deck
+from app.crud.card import get_cards_by_scryfall_ids
+
+EXPORT_CARD_PROJECTION = {
+    "_id": 0,
+    "scryfall_id": 1,
+    "name": 1,
+    "set_code": 1,
+    "collector_number": 1,
+    "mtgo_id": 1,
+    "mana_cost": 1,
+    "type_line": 1,
+    "rarity": 1,
+    "prices.usd": 1,
+}
+
+CSV_COLUMNS = (
+    "quantity",
+    "name",
+    "scryfall_id",
+    "set_code",
+    "collector_number",
+    "mana_cost",
+    "type_line",
+    "rarity",
+    "price_usd",
+)
+
+# Formato -> (media type, extensão)
+EXPORT_FORMATS = {
+    "text": ("text/plain", "txt"),
+    "arena": ("text/plain", "txt"),
+    "dek": ("application/xml", "dek"),
+    "csv": ("text/csv", "csv"),
+}
+
+ZIP_DECK_BATCH_SIZE = 100
+
+
+def _card_name(entry: Dict[str, Any]) -> str:
+    return entry.get("name") or entry.get("scryfall_id", "Unknown")
+
+
+async def _render_text(entries: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    first = True
+    async for entry in entries:
+        yield ("" if first else "\n") + f"{entry.get('quantity', 1)} {_card_name(entry)}"
+        first = False
+
+
+async def _render_arena(entries: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    yield "Deck"
+    async for entry in entries:
+        line = f"{entry.get('quantity', 1)} {_card_name(entry)}"
+        if entry.get("set_code") and entry.get("collector_number"):
+            line += f" ({entry['set_code'].upper()}) {entry['collector_number']}"
+        yield "\n" + line
+
+
+async def _render_dek(entries: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    yield (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<Deck xmlns:xsd="http://www.w3.org/2001/XMLSchema" '
+        'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">\n'
+        "  <NetDeckID>0</NetDeckID>\n"
+        "  <PreconstructedDeckID>0</PreconstructedDeckID>\n"
+    )
+    async for entry in entries:
+        cat_id = f' CatID="{entry["mtgo_id"]}"' if entry.get("mtgo_id") else ""
+        yield (
+            f'  <Cards{cat_id} Quantity="{entry.get("quantity", 1)}" '
+            f'Sideboard="false" Name={quoteattr(_card_name(entry))} />\n'
+        )
+    yield "</Deck>\n"
+
+
+async def _render_csv(entries: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    writer.writerow(CSV_COLUMNS)
+    yield flush()
+
+    async for entry in entries:
+        writer.writerow([
+            entry.get("quantity", 1),
+            _card_name(entry),
+            entry.get("scryfall_id"),
+            entry.get("set_code"),
+            entry.get("collector_number"),
+            entry.get("mana_cost"),
+            entry.get("type_line"),
+            entry.get("rarity"),
+            (entry.get("prices") or {}).get("usd"),
+        ])
+        yield flush()
+
+
+_RENDERERS = {
+    "text": _render_text,
+    "arena": _render_arena,
+    "dek": _render_dek,
+    "csv": _render_csv,
+}
+
+
+def export_filename(deck: Dict[str, Any], export_format: str) -> str:
+    name = re.sub(r'[\\/:*?"<>|]+', "_", deck.get("name") or "export")
+    return f"deck_{name}.{EXPORT_FORMATS[export_format][1]}"
+
+
+async def stream_deck_export(deck: Dict[str, Any], export_format: str) -> AsyncIterator[bytes]:
+    """
+    Gera o arquivo de um deck hidratando as cartas direto de um cursor.
+    """
+    entries = crud_deck.iter_deck_cards(deck, EXPORT_CARD_PROJECTION)
+    async for chunk in _RENDERERS[export_format](entries):
+        yield chunk.encode("utf-8")
+
+
+class _ZipStream:
+    """
+    Arquivo somente-escrita e não posicionável para o ZipFile: os bytes
+    escritos são acumulados e drenados entre um deck e outro.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+async def _iter_from_map(
+    deck: Dict[str, Any],
+    cards_map: Dict[str, Dict[str, Any]]
+) -> AsyncIterator[Dict[str, Any]]:
+    for deck_card in deck.get("cards", []):
+        scryfall_id = deck_card.get("scryfall_id")
+        card = cards_map.get(scryfall_id) or {"scryfall_id": scryfall_id}
+        yield {**card, "quantity": deck_card.get("quantity", 1)}
+
+
+async def stream_decks_zip(
+    export_format: str,
+    format: Optional[str] = None
+) -> AsyncIterator[bytes]:
+    """
+    Gera um zip com um arquivo por deck. Os decks são lidos de um cursor e as
+    cartas de cada lote de decks são hidratadas com uma única query.
+    """
+    stream = _ZipStream()
+    archive = zipfile.ZipFile(stream, mode="w", compression=zipfile.ZIP_DEFLATED)
+    query_projection = {"name": 1, "cards": 1}
+    render = _RENDERERS[export_format]
+
+    async def write_batch(batch):
+        scryfall_ids = list({
+            card.get("scryfall_id")
+            for deck in batch
+            for card in deck.get("cards", [])
+            if card.get("scryfall_id")
+        })
+        cards_map = await get_cards_by_scryfall_ids(scryfall_ids, EXPORT_CARD_PROJECTION, heavy_read=True)
+
+        for deck in batch:
+            with archive.open(export_filename(deck, export_format), mode="w") as file:
+                async for chunk in render(_iter_from_map(deck, cards_map)):
+                    file.write(chunk.encode("utf-8"))
+
+    batch = []
+    async for deck in crud_deck.iter_all_decks(
+        query_projection, ZIP_DECK_BATCH_SIZE, format=format, heavy_read=True
+    ):
+        batch.append(deck)
+        if len(batch) >= ZIP_DECK_BATCH_SIZE:
+            await write_batch(batch)
+            batch = []
+            yield stream.drain()
+
+    if batch:
+        await write_batch(batch)
+
+    archive.close()
+    yield stream.drain()
@@ -0,0 +1,298 @@
+"""
+Probabilidades de compra de um deck (mão inicial e compras até o turno N)
+
+As probabilidades são exatas (hipergeométrica multivariada). Cada alvo, como
+"3 terrenos" ou "1 fonte de R", divide o deck em células disjuntas conforme os
+alvos a que cada carta pertence. Uma programação dinâmica em NumPy conta, para
+cada número de cartas vistas, as combinações que atingem todos os mínimos.
+O estado guarda quantas cartas de cada alvo já foram compradas, limitado ao
+mínimo pedido.
+"""
+import re
+from math import comb
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from app.crud import card as crud_card
+from app.crud import deck as crud_deck
+from app.utils.cache import LRUCache
+from app.utils.mana import MANA_SYMBOLS, is_land, produced_colors
+
+PROBABILITY_CARD_PROJECTION = {
+    "_id": 0,
+    "scryfall_id": 1,
+    "name": 1,
+    "cmc": 1,
+    "type_line": 1,
+    "oracle_text": 1,
+    "produced_mana": 1,
+}
+
+OPENING_HAND_SIZE = 7
+MAX_TARGETS = 8
+# Acima disso a probabilidade conjunta de todos os alvos não é calculada
+MAX_JOINT_TARGETS = 4
+
+DEFAULT_TARGETS = ("land>=2", "land>=3", "land>=4", "land>=5")
+
+_TARGET_PATTERN = re.compile(r"^(?P<selector>.+?)(?:>=(?P<at_least>\d+))?$")
+_MV_PATTERN = re.compile(r"^(?P<low>\d+)(?:-(?P<high>\d+))?$")
+
+_cache = LRUCache(maxsize=512)
+
+
+class ProbabilityTargetError(ValueError):
+    pass
+
+
+def parse_target(text: str) -> Dict[str, Any]:
+    """
+    Lê um alvo no formato `<seletor>[>=N]` (N padrão 1). Seletores:
+    `land`, `nonland`, `mv:2` ou `mv:1-3` (cartas que não são terreno),
+    `type:Creature`, `source:R` (W, U, B, R, G ou C) e `card:<scryfall_id>`.
+    """
+    match = _TARGET_PATTERN.match(text.strip())
+    if not match:
+        raise ProbabilityTargetError(f"Alvo inválido: '{text}'")
+
+    selector = match.group("selector").strip()
+    at_least = int(match.group("at_least") or 1)
+    kind, _, value = selector.partition(":")
+    target = {"target": text, "kind": kind.lower(), "value": value.strip(), "at_least": at_least}
+
+    if target["kind"] in ("land", "nonland") and not value:
+        return target
+    if target["kind"] == "mv":
+        mv = _MV_PATTERN.match(target["value"])
+        if mv:
+            target["low"] = int(mv.group("low"))
+            target["high"] = int(mv.group("high") or mv.group("low"))
+            return target
+    if target["kind"] == "type" and target["value"]:
+        return target
+    if target["kind"] == "source" and target["value"].upper() in MANA_SYMBOLS:
+        target["value"] = target["value"].upper()
+        return target
+    if target["kind"] == "card" and target["value"]:
+        return target
+
+    raise ProbabilityTargetError(f"Alvo inválido: '{text}'")
+
+
+def _matches(target: Dict[str, Any], scryfall_id: str, card: Optional[Dict[str, Any]], card_names: Dict[str, str]) -> bool:
+    kind = target["kind"]
+
+    if kind == "card":
+        # Outras impressões da mesma carta no deck também contam
+        name = card_names.get(target["value"])
+        return scryfall_id == target["value"] or (name is not None and card_names.get(scryfall_id) == name)
+
+    if card is None:
+        return False
+    if kind == "land":
+        return is_land(card)
+    if kind == "nonland":
+        return not is_land(card)
+    if kind == "mv":
+        return not is_land(card) and target["low"] <= int(card.get("cmc") or 0) <= target["high"]
+    if kind == "type":
+        return target["value"].lower() in (card.get("type_line") or "").lower()
+    if kind == "source":
+        return target["value"] in produced_colors(card)
+    return False
+
+
+def _shift(array: np.ndarray, axis: int, amount: int, cap: Optional[int] = None) -> np.ndarray:
+    """
+    Desloca `array` em `amount` posições no eixo. Com `cap`, os valores que
+    passariam do último índice se acumulam nele; sem `cap`, são descartados.
+    """
+    if amount == 0:
+        return array
+
+    result = np.zeros_like(array)
+    source = np.moveaxis(array, axis, 0)
+    target = np.moveaxis(result, axis, 0)
+    size = source.shape[0]
+
+    if cap is None:
+        if amount < size:
+            target[amount:] = source[:size - amount]
+        return result
+
+    if amount < cap:
+        target[amount:cap] = source[:cap - amount]
+    target[cap] = source[max(cap - amount, 0):].sum(axis=0)
+    return result
+
+
+def hit_probabilities(
+    cells: Dict[int, int],
+    at_least: List[int],
+    total: int,
+    max_seen: int
+) -> np.ndarray:
+    """
+    Probabilidade de ter ao menos `at_least[i]` cartas de cada alvo i entre as
+    primeiras n cartas do deck, para n = 0..max_seen.
+
+    Args:
+        cells: Máscara de alvos (bit i = alvo i) -> número de cartas do deck
+        at_least: Mínimo de cada alvo
+        total: Total de cartas do deck
+        max_seen: Maior número de cartas vistas
+    """
+    max_seen = min(max_seen, total)
+    ways = np.zeros((max_seen + 1,) + tuple(k + 1 for k in at_least))
+    ways[(0,) * ways.ndim] = 1.0
+
+    for mask, size in cells.items():
+        updated = np.zeros_like(ways)
+        for drawn in range(min(size, max_seen) + 1):
+            shifted = _shift(ways, 0, drawn)
+            for index, k in enumerate(at_least):
+                if mask >> index & 1:
+                    shifted = _shift(shifted, index + 1, drawn, cap=k)
+            updated += comb(size, drawn) * shifted
+        ways = updated
+
+    hits = ways[(slice(None),) + tuple(at_least)]
+    combinations = np.array([float(comb(total, seen)) for seen in range(max_seen + 1)])
+    return hits / combinations
+
+
+def _cards_seen(turn: int, on_the_play: bool) -> int:
+    return OPENING_HAND_SIZE + turn - (1 if on_the_play else 0)
+
+
+def _curve(
+    cells: Dict[int, int],
+    at_least: List[int],
+    total: int,
+    turns: int,
+    on_the_play: bool,
+    mulligans: int
+) -> Dict[str, Any]:
+    max_seen = _cards_seen(turns, on_the_play)
+    probabilities = hit_probabilities(cells, at_least, total, max_seen)
+
+    def at(seen: int) -> float:
+        return float(probabilities[min(seen, len(probabilities) - 1)])
+
+    opening = at(OPENING_HAND_SIZE)
+    return {
+        "by_turn": [
+            {
+                "turn": turn,
+                "cards_seen": min(_cards_seen(turn, on_the_play), total),
+                "probability": round(at(_cards_seen(turn, on_the_play)), 6)
+            }
+            for turn in range(1, turns + 1)
+        ],
+        # London mulligan: cada mulligan é uma nova mão de 7 cartas
+        "opening_hand": [
+            round(1 - (1 - opening) ** (attempt + 1), 6)
+            for attempt in range(mulligans + 1)
+        ],
+    }
+
+
+def compute_probabilities(
+    deck_cards: List[Dict[str, Any]],
+    cards_map: Dict[str, Dict[str, Any]],
+    targets: List[Dict[str, Any]],
+    turns: int = 7,
+    on_the_play: bool = True,
+    mulligans: int = 2
+) -> Dict[str, Any]:
+    card_names = {
+        scryfall_id: card.get("name")
+        for scryfall_id, card in cards_map.items()
+    }
+
+    cells: Dict[int, int] = {}
+    target_sizes = [0] * len(targets)
+    total = 0
+    for deck_card in deck_cards:
+        scryfall_id = deck_card.get("scryfall_id")
+        quantity = deck_card.get("quantity", 1)
+        card = cards_map.get(scryfall_id)
+        total += quantity
+
+        mask = 0
+        for index, target in enumerate(targets):
+            if _matches(target, scryfall_id, card, card_names):
+                mask |= 1 << index
+                target_sizes[index] += quantity
+        cells[mask] = cells.get(mask, 0) + quantity
+
+    result: Dict[str, Any] = {"total_cards": total, "targets": [], "all_targets": None}
+    if not total:
+        return result
+
+    for index, target in enumerate(targets):
+        single_cells: Dict[int, int] = {}
+        for mask, size in cells.items():
+            key = mask >> index & 1
+            single_cells[key] = single_cells.get(key, 0) + size
+
+        result["targets"].append({
+            "target": target["target"],
+            "cards": target_sizes[index],
+            "at_least": target["at_least"],
+            **_curve(single_cells, [target["at_least"]], total, turns, on_the_play, mulligans)
+        })
+
+    if 1 < len(targets) <= MAX_JOINT_TARGETS:
+        at_least = [target["at_least"] for target in targets]
+        result["all_targets"] = _curve(cells, at_least, total, turns, on_the_play, mulligans)
+
+    return result
+
+
+def _deck_version(deck: Dict[str, Any]) -> Any:
+    # Decks anteriores ao versionamento usam a data da última alteração
+    return deck.get("version") or deck.get("updated_at")
+
+
+async def get_deck_probabilities(
+    deck_id: str,
+    targets: Optional[List[str]] = None,
+    turns: int = 7,
+    on_the_play: bool = True,
+    mulligans: int = 2
+) -> Optional[Dict[str, Any]]:
+    """
+    Calcula (ou lê do cache, por versão do deck) as probabilidades dos alvos.
+    Retorna None se o deck não existe; alvos inválidos geram ProbabilityTargetError.
+    """
+    target_texts = list(dict.fromkeys(targets or DEFAULT_TARGETS))
+    if len(target_texts) > MAX_TARGETS:
+        raise ProbabilityTargetError(f"Informe no máximo {MAX_TARGETS} alvos")
+    parsed_targets = [parse_target(text) for text in target_texts]
+
+    deck = await crud_deck.get_deck_by_id(deck_id)
+    if not deck:
+        return None
+
+    version = _deck_version(deck)
+    cache_key: Tuple = (deck_id, version, tuple(target_texts), turns, on_the_play, mulligans)
+    cached = _cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    deck_cards = deck.get("cards", [])
+    scryfall_ids = [card.get("scryfall_id") for card in deck_cards if card.get("scryfall_id")]
+    cards_map = await crud_card.get_cards_by_scryfall_ids(scryfall_ids, PROBABILITY_CARD_PROJECTION)
+
+    result = {
+        "deck_id": deck_id,
+        "version": deck.get("version"),
+        "turns": turns,
+        "on_the_play": on_the_play,
+        "mulligans": mulligans,
+        **compute_probabilities(deck_cards, cards_map, parsed_targets, turns, on_the_play, mulligans)
+    }
+    _cache.set(cache_key, result)
+    return result
@@ -0,0 +1,124 @@
+"""
+Busca de decks quase idênticos com MinHash/LSH
+
+Cada deck guarda uma assinatura MinHash do seu conjunto de cartas e as bandas
+LSH dessa assinatura (ver app.utils.minhash), mantidas a cada escrita. As
+buscas consultam o índice multikey de `lsh_bands` e comparam assinaturas
+apenas entre decks que compartilham alguma banda, sem comparar todos os pares.
+"""
+from typing import Dict, Any, List, Optional
+
+from app.crud import deck as crud_deck
+from app.utils.minhash import estimate_similarity
+
+
+async def find_similar_decks(
+    deck_id: str,
+    threshold: float = 0.8,
+    limit: int = 20,
+    same_format: bool = False
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Decks com similaridade de Jaccard estimada >= threshold, do mais parecido
+    para o menos parecido. Retorna None se o deck não existe.
+    """
+    deck = await crud_deck.get_deck_signature(deck_id)
+    if not deck:
+        return None
+
+    signature = deck.get(crud_deck.MINHASH_FIELD)
+    candidates = await crud_deck.get_similar_deck_candidates(
+        deck.get(crud_deck.LSH_BANDS_FIELD, []),
+        deck["_id"],
+        format=deck.get("format") if same_format else None
+    )
+
+    similar = []
+    for candidate in candidates:
+        similarity = estimate_similarity(signature, candidate.get(crud_deck.MINHASH_FIELD))
+        if similarity >= threshold:
+            similar.append({
+                "_id": str(candidate["_id"]),
+                "name": candidate.get("name"),
+                "format": candidate.get("format"),
+                "similarity": round(similarity, 4)
+            })
+
+    similar.sort(key=lambda item: item["similarity"], reverse=True)
+    return similar[:limit]
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent: Dict[Any, Any] = {}
+
+    def find(self, item: Any) -> Any:
+        self.parent.setdefault(item, item)
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a: Any, b: Any) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+
+async def find_duplicate_clusters(
+    threshold: float = 0.9,
+    format: Optional[str] = None,
+    limit: int = 50
+) -> List[Dict[str, Any]]:
+    """
+    Agrupa decks quase idênticos da coleção. Os pares comparados vêm apenas
+    dos buckets LSH; pares com similaridade >= threshold são unidos e cada
+    componente conectado vira um cluster.
+    """
+    buckets = await crud_deck.get_lsh_buckets(format=format)
+
+    object_ids = list({deck_id for bucket in buckets for deck_id in bucket})
+    decks = await crud_deck.get_decks_signatures(object_ids)
+
+    clusters = _UnionFind()
+    compared = set()
+    for bucket in buckets:
+        for i, a in enumerate(bucket):
+            for b in bucket[i + 1:]:
+                pair = (a, b) if a < b else (b, a)
+                if pair in compared:
+                    continue
+                compared.add(pair)
+
+                similarity = estimate_similarity(
+                    decks.get(a, {}).get(crud_deck.MINHASH_FIELD),
+                    decks.get(b, {}).get(crud_deck.MINHASH_FIELD)
+                )
+                if similarity >= threshold:
+                    clusters.union(a, b)
+
+    groups: Dict[Any, List[Any]] = {}
+    for deck_id in list(clusters.parent):
+        groups.setdefault(clusters.find(deck_id), []).append(deck_id)
+
+    result = []
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        members.sort()
+        result.append({
+            "size": len(members),
+            "decks": [
+                {
+                    "_id": str(deck_id),
+                    "name": decks.get(deck_id, {}).get("name"),
+                    "format": decks.get(deck_id, {}).get("format")
+                }
+                for deck_id in members
+            ]
+        })
+
+    result.sort(key=lambda cluster: (-cluster["size"], cluster["decks"][0]["_id"]))
+    return result[:limit]
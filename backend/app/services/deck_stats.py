@@ -0,0 +1,164 @@
+"""
+Estatísticas materializadas de decks (curva de mana, cores, tipos e preço)
+
+As estatísticas são a soma das contribuições de cada carta do deck, então
+podem ser mantidas com `$inc` a cada alteração em vez de recalculadas.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+STATS_FIELD = "stats"
+
+# Campos de carta necessários para calcular as estatísticas
+STATS_CARD_PROJECTION = {
+    "_id": 0,
+    "scryfall_id": 1,
+    "cmc": 1,
+    "colors": 1,
+    "type_line": 1,
+    "prices.usd": 1,
+}
+
+# Campos cuja alteração exige recalcular as estatísticas dos decks
+STATS_CARD_FIELDS = ("cmc", "colors", "type_line", "prices")
+
+CARD_TYPES = (
+    "Artifact",
+    "Battle",
+    "Creature",
+    "Enchantment",
+    "Instant",
+    "Land",
+    "Planeswalker",
+    "Sorcery",
+    "Kindred",
+)
+
+MAX_CURVE_BUCKET = 7
+
+
+def _card_types(type_line: Optional[str]) -> List[str]:
+    if not type_line:
+        return []
+
+    # Em cartas de duas faces considera apenas a face da frente
+    front = type_line.split(" // ")[0]
+    main_types = front.split("—")[0].split()
+    return [card_type for card_type in CARD_TYPES if card_type in main_types]
+
+
+def _price_usd(card: Dict[str, Any]) -> float:
+    price = (card.get("prices") or {}).get("usd")
+    try:
+        return float(price) if price else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def card_contribution(
+    card: Optional[Dict[str, Any]],
+    quantity: int,
+    entries: int = 0
+) -> Dict[str, float]:
+    """
+    Contribuição de `quantity` cópias de uma carta para as estatísticas,
+    em caminhos relativos ao subdocumento (ex: "mana_curve.3").
+
+    Args:
+        card: Dados da carta (None se a carta não existe em db.cards)
+        quantity: Variação no número de cópias (pode ser negativa)
+        entries: Variação no número de cartas distintas (1, 0 ou -1)
+    """
+    contribution: Dict[str, float] = defaultdict(int)
+    contribution["total_cards"] += quantity
+    contribution["unique_cards"] += entries
+
+    if card is None:
+        contribution["missing_cards"] += entries
+        return dict(contribution)
+
+    types = _card_types(card.get("type_line"))
+    for card_type in types:
+        contribution[f"types.{card_type}"] += quantity
+
+    if "Land" not in types:
+        cmc = int(card.get("cmc") or 0)
+        bucket = f"{MAX_CURVE_BUCKET}+" if cmc >= MAX_CURVE_BUCKET else str(cmc)
+        contribution[f"mana_curve.{bucket}"] += quantity
+
+        for color in card.get("colors") or ["C"]:
+            contribution[f"colors.{color}"] += quantity
+
+    contribution["total_price_usd"] += _price_usd(card) * quantity
+    return dict(contribution)
+
+
+def stats_fields_changed(
+    previous: Optional[Dict[str, Any]],
+    current: Dict[str, Any]
+) -> bool:
+    if previous is None:
+        return True
+
+    if _price_usd(previous) != _price_usd(current):
+        return True
+
+    return any(
+        previous.get(field) != current.get(field)
+        for field in STATS_CARD_FIELDS
+        if field != "prices"
+    )
+
+
+def stats_increment(contribution: Dict[str, float]) -> Dict[str, float]:
+    return {
+        f"{STATS_FIELD}.{path}": value
+        for path, value in contribution.items()
+        if value
+    }
+
+
+def compute_deck_stats(
+    deck_cards: List[Dict[str, Any]],
+    cards_map: Dict[str, Dict[str, Any]]
+) -> Dict[str, Any]:
+    stats: Dict[str, Any] = {
+        "total_cards": 0,
+        "unique_cards": 0,
+        "missing_cards": 0,
+        "mana_curve": {},
+        "colors": {},
+        "types": {},
+        "total_price_usd": 0.0,
+    }
+
+    for deck_card in deck_cards:
+        card = cards_map.get(deck_card.get("scryfall_id"))
+        contribution = card_contribution(card, deck_card.get("quantity", 1), entries=1)
+
+        for path, value in contribution.items():
+            if "." in path:
+                group, key = path.split(".", 1)
+                stats[group][key] = stats[group].get(key, 0) + value
+            else:
+                stats[path] += value
+
+    stats["computed_at"] = datetime.utcnow()
+    return stats
+
+
+def clean_stats(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Remove contadores zerados pelos `$inc` e arredonda o preço acumulado.
+    """
+    cleaned = dict(stats)
+    for group in ("mana_curve", "colors", "types"):
+        cleaned[group] = {
+            key: int(value)
+            for key, value in (stats.get(group) or {}).items()
+            if value
+        }
+
+    cleaned["total_price_usd"] = round(stats.get("total_price_usd", 0.0), 2)
+    return cleaned
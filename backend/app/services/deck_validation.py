@@ -0,0 +1,242 @@
+"""
+Validação de decks contra as regras de formato
+
+Usa os bitmaps de legalidade gravados em cada carta (ver app.utils.legality)
+e percorre a lista de cartas do deck uma única vez.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from app.crud import card as crud_card
+from app.crud import deck as crud_deck
+from app.utils.legality import legality_status
+
+LEGALITY_FIELD = "legality"
+
+# Campos de carta necessários para validar um deck
+VALIDATION_CARD_PROJECTION = {
+    "_id": 0,
+    "scryfall_id": 1,
+    "oracle_id": 1,
+    "name": 1,
+    "type_line": 1,
+    "oracle_text": 1,
+    "color_identity": 1,
+    "legal_mask": 1,
+    "restricted_mask": 1,
+}
+
+_CONSTRUCTED = {"min_size": 60, "max_copies": 4}
+_COMMANDER = {"size": 100, "max_copies": 1, "commander": True}
+
+FORMAT_RULES: Dict[str, Dict[str, Any]] = {
+    "standard": _CONSTRUCTED,
+    "future": _CONSTRUCTED,
+    "historic": _CONSTRUCTED,
+    "timeless": _CONSTRUCTED,
+    "pioneer": _CONSTRUCTED,
+    "explorer": _CONSTRUCTED,
+    "modern": _CONSTRUCTED,
+    "legacy": _CONSTRUCTED,
+    "vintage": _CONSTRUCTED,
+    "pauper": _CONSTRUCTED,
+    "penny": _CONSTRUCTED,
+    "alchemy": _CONSTRUCTED,
+    "oldschool": _CONSTRUCTED,
+    "premodern": _CONSTRUCTED,
+    "gladiator": {"size": 100, "max_copies": 1},
+    "commander": _COMMANDER,
+    "duel": _COMMANDER,
+    "predh": _COMMANDER,
+    "paupercommander": _COMMANDER,
+    "brawl": _COMMANDER,
+    "standardbrawl": {"size": 60, "max_copies": 1, "commander": True},
+    "oathbreaker": {"size": 60, "max_copies": 1, "commander": True},
+    # Formato livre da aplicação: sem regras
+    "bulk": {},
+}
+
+
+def _ignores_copy_limit(card: Dict[str, Any]) -> bool:
+    type_line = card.get("type_line") or ""
+    oracle_text = card.get("oracle_text") or ""
+    return type_line.startswith("Basic") or "any number of cards named" in oracle_text
+
+
+def _can_be_commander(card: Dict[str, Any]) -> bool:
+    type_line = card.get("type_line") or ""
+    oracle_text = card.get("oracle_text") or ""
+    front = type_line.split(" // ")[0]
+    return (
+        ("Legendary" in front and ("Creature" in front or "Planeswalker" in front))
+        or "can be your commander" in oracle_text
+    )
+
+
+def _check_color_identity(
+    deck_identity: set,
+    candidates: List[Dict[str, Any]],
+    commanders: Optional[List[str]]
+) -> Optional[str]:
+    if commanders:
+        commander_cards = [card for card in candidates if card.get("scryfall_id") in commanders]
+        if len(commander_cards) != len(set(commanders)):
+            return "Comandante informado não está no deck ou não pode ser comandante"
+        identity = set().union(*(set(card.get("color_identity") or []) for card in commander_cards))
+        if not deck_identity <= identity:
+            outside = ", ".join(sorted(deck_identity - identity))
+            return f"Cartas fora da identidade de cor do comandante: {outside}"
+        return None
+
+    # Sem comandante informado: algum candidato (ou par com Partner) precisa cobrir a identidade do deck
+    identities = [set(card.get("color_identity") or []) for card in candidates]
+    partners = [
+        set(card.get("color_identity") or []) for card in candidates
+        if "Partner" in (card.get("oracle_text") or "")
+    ]
+    if any(deck_identity <= identity for identity in identities):
+        return None
+    if any(deck_identity <= a | b for i, a in enumerate(partners) for b in partners[i + 1:]):
+        return None
+    return "Nenhum comandante possível cobre a identidade de cor do deck"
+
+
+def validate_deck(
+    deck_cards: List[Dict[str, Any]],
+    format: str,
+    cards_map: Dict[str, Dict[str, Any]],
+    commanders: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Valida um deck contra as regras do formato.
+
+    Returns:
+        {"format", "valid", "errors", "warnings", "checked_at"}; `valid` é None
+        quando o formato não é conhecido.
+    """
+    result = {
+        "format": format,
+        "valid": None,
+        "errors": [],
+        "warnings": [],
+        "checked_at": datetime.utcnow(),
+    }
+
+    rules = FORMAT_RULES.get(format)
+    if rules is None:
+        result["warnings"].append(f"Formato '{format}' não possui regras de validação")
+        return result
+
+    errors = result["errors"]
+    warnings = result["warnings"]
+    total_cards = 0
+    copies = defaultdict(int)
+    names = {}
+    limited = {}
+    deck_identity = set()
+    candidates = []
+
+    for deck_card in deck_cards:
+        scryfall_id = deck_card.get("scryfall_id")
+        quantity = deck_card.get("quantity", 1)
+        total_cards += quantity
+
+        card = cards_map.get(scryfall_id)
+        if card is None:
+            warnings.append(f"Carta '{scryfall_id}' não encontrada no banco")
+            continue
+
+        name = card.get("name") or scryfall_id
+        key = card.get("oracle_id") or name
+        names[key] = name
+        copies[key] += quantity
+
+        status = legality_status(card.get("legal_mask"), card.get("restricted_mask"), format)
+        if status == "not_legal":
+            errors.append(f"'{name}' não é legal em {format}")
+        elif status == "restricted":
+            limited[key] = 1
+        elif status is None and format != "bulk":
+            warnings.append(f"Legalidade de '{name}' desconhecida (reimporte a carta)")
+
+        if not _ignores_copy_limit(card) and "max_copies" in rules:
+            limited.setdefault(key, rules["max_copies"])
+
+        if rules.get("commander"):
+            deck_identity.update(card.get("color_identity") or [])
+            if _can_be_commander(card):
+                candidates.append(card)
+
+    for key, limit in limited.items():
+        if copies[key] > limit:
+            errors.append(f"'{names[key]}' tem {copies[key]} cópias (máximo {limit})")
+
+    if "size" in rules and total_cards != rules["size"]:
+        errors.append(f"O deck deve ter exatamente {rules['size']} cartas (tem {total_cards})")
+    if "min_size" in rules and total_cards < rules["min_size"]:
+        errors.append(f"O deck deve ter no mínimo {rules['min_size']} cartas (tem {total_cards})")
+
+    if rules.get("commander"):
+        identity_error = _check_color_identity(deck_identity, candidates, commanders)
+        if identity_error:
+            errors.append(identity_error)
+
+    result["valid"] = not errors
+    return result
+
+
+async def validate_deck_document(
+    deck: Dict[str, Any],
+    commanders: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    deck_cards = deck.get("cards", [])
+    scryfall_ids = [card.get("scryfall_id") for card in deck_cards if card.get("scryfall_id")]
+    cards_map = await crud_card.get_cards_by_scryfall_ids(scryfall_ids, VALIDATION_CARD_PROJECTION)
+    return validate_deck(deck_cards, deck.get("format"), cards_map, commanders)
+
+
+async def revalidate_all_decks(batch_size: int = crud_deck.DECK_IMPORT_CHUNK_SIZE) -> Dict[str, int]:
+    """
+    Revalida todos os decks percorrendo um cursor em lotes e grava o resultado
+    em `legality` de cada deck. As cartas já carregadas são reaproveitadas
+    entre os lotes, então cada carta é lida no máximo uma vez.
+    """
+    cards_cache: Dict[str, Dict[str, Any]] = {}
+    summary = {"checked": 0, "valid": 0, "invalid": 0}
+    batch = []
+
+    async def flush():
+        missing_ids = list({
+            card.get("scryfall_id")
+            for deck in batch
+            for card in deck.get("cards", [])
+            if card.get("scryfall_id") and card.get("scryfall_id") not in cards_cache
+        })
+        cards_cache.update(
+            await crud_card.get_cards_by_scryfall_ids(missing_ids, VALIDATION_CARD_PROJECTION)
+        )
+
+        results = []
+        for deck in batch:
+            legality = validate_deck(deck.get("cards", []), deck.get("format"), cards_cache)
+            results.append((deck["_id"], legality))
+            summary["checked"] += 1
+            if legality["valid"] is True:
+                summary["valid"] += 1
+            elif legality["valid"] is False:
+                summary["invalid"] += 1
+
+        await crud_deck.set_decks_field(LEGALITY_FIELD, results)
+
+    projection = {"format": 1, "cards": 1}
+    async for deck in crud_deck.iter_all_decks(projection, batch_size):
+        batch.append(deck)
+        if len(batch) >= batch_size:
+            await flush()
+            batch = []
+
+    if batch:
+        await flush()
+
+    return summary
@@ -0,0 +1,114 @@
+"""
+Valor de um deck ao longo do tempo, a partir do histórico de preços das cartas
+
+O valor em cada data é a soma de quantidade x preço em vigor de cada carta
+da lista atual do deck (o último ponto do histórico até aquela data). As
+séries de todas as cartas são lidas de uma vez (um bucket por carta por mês,
+mais o último bucket anterior ao intervalo) e percorridas em conjunto, uma
+passada por série.
+"""
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List
+
+from app.crud import card_prices as crud_card_prices
+from app.crud import deck as crud_deck
+
+INTERVALS = {"day": timedelta(days=1), "week": timedelta(weeks=1)}
+DEFAULT_RANGE = timedelta(days=90)
+MAX_POINTS = 1000
+
+
+class DeckValueQueryError(ValueError):
+    pass
+
+
+def _sample_dates(since: datetime, until: datetime, step: timedelta) -> List[datetime]:
+    dates = []
+    at = since
+    while at < until:
+        dates.append(at)
+        at += step
+    dates.append(until)
+    return dates
+
+
+async def compute_deck_value_history(
+    deck: Dict[str, Any],
+    since: datetime,
+    until: datetime,
+    currency: str = "usd",
+    interval: str = "day"
+) -> List[Dict[str, Any]]:
+    dates = _sample_dates(since, until, INTERVALS[interval])
+    if len(dates) > MAX_POINTS:
+        raise DeckValueQueryError(
+            f"Intervalo muito longo para '{interval}': {len(dates)} pontos (máximo {MAX_POINTS})"
+        )
+
+    quantities: Dict[str, int] = {}
+    for card in deck.get("cards", []):
+        scryfall_id = card.get("scryfall_id")
+        if scryfall_id:
+            quantities[scryfall_id] = quantities.get(scryfall_id, 0) + card.get("quantity", 1)
+
+    series = await crud_card_prices.get_prices_series(list(quantities), since, until, currency)
+
+    positions = {scryfall_id: 0 for scryfall_id in series}
+    current: Dict[str, Optional[float]] = {}
+    points = []
+    for at in dates:
+        for scryfall_id, card_points in series.items():
+            position = positions[scryfall_id]
+            while position < len(card_points) and card_points[position][0] <= at:
+                current[scryfall_id] = card_points[position][1]
+                position += 1
+            positions[scryfall_id] = position
+
+        priced = [scryfall_id for scryfall_id in quantities if current.get(scryfall_id) is not None]
+        points.append({
+            "at": at,
+            "value": round(sum(quantities[scryfall_id] * current[scryfall_id] for scryfall_id in priced), 2),
+            "priced_cards": len(priced),
+            "missing_cards": len(quantities) - len(priced),
+        })
+
+    return points
+
+
+async def get_deck_value_history(
+    deck_id: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    currency: str = "usd",
+    interval: str = "day"
+) -> Optional[Dict[str, Any]]:
+    """
+    Valor do deck entre `since` e `until` (padrão: últimos 90 dias), um
+    ponto por `interval` mais o ponto final em `until`.
+
+    Returns:
+        None se o deck não existir
+    """
+    if currency not in crud_card_prices.PRICE_FIELDS:
+        raise DeckValueQueryError(
+            f"Preço inválido: '{currency}' (use um de: {', '.join(crud_card_prices.PRICE_FIELDS)})"
+        )
+    if interval not in INTERVALS:
+        raise DeckValueQueryError(f"Intervalo inválido: '{interval}' (use 'day' ou 'week')")
+
+    until = crud_card_prices.utc_naive(until) if until else datetime.utcnow()
+    since = crud_card_prices.utc_naive(since) if since else until - DEFAULT_RANGE
+    if since >= until:
+        raise DeckValueQueryError("'since' deve ser anterior a 'until'")
+
+    deck = await crud_deck.get_deck_by_id(deck_id)
+    if not deck:
+        return None
+
+    return {
+        "deck_id": deck_id,
+        "name": deck.get("name"),
+        "currency": currency,
+        "interval": interval,
+        "points": await compute_deck_value_history(deck, since, until, currency, interval),
+    }
@@ -0,0 +1,153 @@
+"""
+Importação de listas de deck em texto com resolução de nomes em lote
+
+Os nomes são resolvidos primeiro no banco (uma query indexada) e só os que
+faltarem são buscados na Scryfall, em lotes da API /cards/collection.
+"""
+from typing import Dict, Any, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.crud import card as crud_card
+from app.crud import deck as crud_deck
+from app.schemas import DeckCard
+from app.services.scryfall import get_cards_by_identifiers
+from app.utils import map_scryfall_to_card
+from app.utils.decklist_parser import SIDEBOARD, MAYBEBOARD, parse_decklist
+
+RESOLVE_CARD_PROJECTION = {"_id": 0, "name": 1, "scryfall_id": 1, "set_code": 1}
+
+_EXCLUDED_SECTIONS = (SIDEBOARD, MAYBEBOARD)
+
+Key = Tuple[str, Optional[str]]
+
+
+class DecklistImportError(ValueError):
+    def __init__(self, message: str, unresolved: Optional[List[str]] = None):
+        super().__init__(message)
+        self.unresolved = unresolved or []
+
+
+def _name_keys(name: str) -> List[str]:
+    # "Fire // Ice" também pode ser referenciada pela face da frente ("Fire")
+    lowered = name.lower()
+    return [lowered, lowered.split(" // ")[0]]
+
+
+def _index_cards(cards: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    index: Dict[str, List[Dict[str, Any]]] = {}
+    for card in cards:
+        for key in _name_keys(card.get("name") or ""):
+            index.setdefault(key, []).append(card)
+    return index
+
+
+def _pick(candidates: List[Dict[str, Any]], set_code: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not candidates:
+        return None
+    if set_code is None:
+        return candidates[0]
+    for card in candidates:
+        if (card.get("set_code") or "").lower() == set_code:
+            return card
+    return None
+
+
+async def resolve_card_names(keys: List[Key]) -> Tuple[Dict[Key, str], Dict[str, int]]:
+    """
+    Resolve pares (nome, set_code) para scryfall_id.
+
+    Returns:
+        (mapa chave -> scryfall_id, contagem {"local", "remote"})
+    """
+    names = list({name for name, _ in keys})
+    local_index = _index_cards(await crud_card.get_cards_by_names(names, RESOLVE_CARD_PROJECTION))
+
+    resolved: Dict[Key, str] = {}
+    counts = {"local": 0, "remote": 0}
+    misses: List[Key] = []
+
+    for key in keys:
+        name, set_code = key
+        card = _pick(local_index.get(name.lower(), []), set_code)
+        if card:
+            resolved[key] = card["scryfall_id"]
+            counts["local"] += 1
+        else:
+            misses.append(key)
+
+    if not misses:
+        return resolved, counts
+
+    identifiers = [
+        {"name": name, "set": set_code} if set_code else {"name": name}
+        for name, set_code in misses
+    ]
+    remote_cards = [map_scryfall_to_card(data) for data in await get_cards_by_identifiers(identifiers)]
+    await crud_card.upsert_cards_bulk(remote_cards)
+    remote_index = _index_cards(remote_cards)
+
+    for key in misses:
+        name, set_code = key
+        candidates = remote_index.get(name.lower(), [])
+        # Se a impressão pedida não existir, aceita qualquer impressão da carta
+        card = _pick(candidates, set_code) or _pick(local_index.get(name.lower(), []), None) or _pick(candidates, None)
+        if card:
+            resolved[key] = card["scryfall_id"]
+            counts["remote"] += 1
+
+    return resolved, counts
+
+
+async def import_decklist(
+    name: str,
+    format: str,
+    text: str,
+    include_sideboard: bool = False
+) -> Dict[str, Any]:
+    entries = parse_decklist(text)
+    if not entries:
+        raise DecklistImportError("Nenhuma carta encontrada na lista")
+
+    included = [
+        entry for entry in entries
+        if include_sideboard or entry["section"] not in _EXCLUDED_SECTIONS
+    ]
+
+    keys = list(dict.fromkeys((entry["name"], entry["set_code"]) for entry in included))
+    resolved, counts = await resolve_card_names(keys)
+
+    unresolved = [key_name for key_name, set_code in keys if (key_name, set_code) not in resolved]
+    if unresolved:
+        raise DecklistImportError(
+            f"Cartas não encontradas: {', '.join(unresolved)}",
+            unresolved=unresolved
+        )
+
+    quantities: Dict[str, int] = {}
+    for entry in included:
+        scryfall_id = resolved[(entry["name"], entry["set_code"])]
+        quantities[scryfall_id] = quantities.get(scryfall_id, 0) + entry["quantity"]
+
+    # insert_decks_bulk grava direto: valida as cartas como a criação de deck pela API
+    try:
+        cards = [
+            DeckCard(scryfall_id=scryfall_id, quantity=quantity).model_dump()
+            for scryfall_id, quantity in quantities.items()
+        ]
+    except ValidationError as e:
+        raise DecklistImportError(f"Lista inválida: {e.errors(include_url=False)}")
+
+    inserted, failures = await crud_deck.insert_decks_bulk([
+        {"name": name, "format": format, "cards": cards}
+    ])
+    if failures:
+        raise DecklistImportError(failures[0]["error"])
+
+    return {
+        "deck": inserted[0],
+        "parsed_cards": len(entries),
+        "skipped_cards": len(entries) - len(included),
+        "local_matches": counts["local"],
+        "remote_matches": counts["remote"],
+    }
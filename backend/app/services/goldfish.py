@@ -0,0 +1,351 @@
+"""
+Simulação "goldfish" de decks (partidas solitárias sem oponente)
+
+Cada partida embaralha o deck, faz mulligans (London) em mãos com poucos ou
+muitos terrenos, baixa um terreno por turno e conjura as mágicas que o custo
+de mana e as fontes de cor em jogo permitem. As partidas são divididas em
+lotes de tamanho fixo, cada um com sua própria seed, e os lotes rodam em um
+pool de processos; o resultado só depende da seed e do número de partidas,
+não do número de workers.
+"""
+import asyncio
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.core.config import SIMULATION_WORKERS
+from app.crud import card as crud_card
+from app.crud import deck as crud_deck
+from app.utils.cache import LRUCache
+from app.utils.mana import is_land, parse_mana_cost, produced_colors
+
+SIMULATION_CARD_PROJECTION = {
+    "_id": 0,
+    "scryfall_id": 1,
+    "cmc": 1,
+    "mana_cost": 1,
+    "type_line": 1,
+    "oracle_text": 1,
+    "produced_mana": 1,
+}
+
+CHUNK_GAMES = 1000
+OPENING_HAND_SIZE = 7
+MAX_MULLIGANS = 2
+KEEP_LANDS = (2, 5)
+SCREW_TURN = 4
+FLOOD_LANDS_IN_HAND = 3
+
+# Fonte de mana de cor desconhecida (ex: fetchlands): paga qualquer cor
+ANY_COLOR = "*"
+
+_cache = LRUCache(maxsize=256)
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+# Carta compacta enviada aos workers:
+# (terreno, cores produzidas, valor de mana, mana genérica, símbolos coloridos, conjurável, permanente)
+CardSpec = Tuple[bool, Tuple[str, ...], int, int, Tuple[str, ...], bool, bool]
+
+
+def _card_spec(card: Optional[Dict[str, Any]]) -> CardSpec:
+    if card is None:
+        # Carta ausente em db.cards: ocupa espaço no deck, mas nunca é conjurada
+        return (False, (), 0, 0, (), False, False)
+
+    colors = tuple(sorted(produced_colors(card)))
+    if is_land(card):
+        return (True, colors or (ANY_COLOR,), 0, 0, (), False, True)
+
+    generic, colored = parse_mana_cost(card.get("mana_cost"))
+    pips = tuple(color for color, count in sorted(colored.items()) for _ in range(count))
+    type_line = card.get("type_line") or ""
+    permanent = "Instant" not in type_line and "Sorcery" not in type_line
+    return (False, colors, int(card.get("cmc") or 0), generic, pips, True, permanent)
+
+
+def _pay(spec: CardSpec, sources: List[Tuple[str, ...]]) -> Optional[List[int]]:
+    """
+    Índices das fontes usadas para pagar a carta, ou None se não for possível.
+    Cada símbolo colorido precisa de uma fonte diferente daquela cor.
+    """
+    _, _, _, generic, pips, _, _ = spec
+    if len(pips) + generic > len(sources):
+        return None
+
+    used: List[int] = []
+
+    def assign(index: int) -> bool:
+        if index == len(pips):
+            return True
+        color = pips[index]
+        for source_index, colors in enumerate(sources):
+            if source_index not in used and (color in colors or ANY_COLOR in colors):
+                used.append(source_index)
+                if assign(index + 1):
+                    return True
+                used.pop()
+        return False
+
+    if not assign(0):
+        return None
+
+    # Mana genérica: usa primeiro as fontes com menos cores
+    remaining = sorted(
+        (index for index in range(len(sources)) if index not in used),
+        key=lambda index: len(sources[index])
+    )
+    return used + remaining[:generic]
+
+
+def _choose_land(hand: List[int], cards: List[CardSpec], sources: List[Tuple[str, ...]]) -> Optional[int]:
+    lands = [position for position, card in enumerate(hand) if cards[card][0]]
+    if not lands:
+        return None
+
+    available = {color for colors in sources for color in colors}
+    needed = {pip for card in hand for pip in cards[card][4]} - available
+
+    def score(position: int) -> Tuple[int, int]:
+        colors = set(cards[hand[position]][1])
+        return (len(colors & needed) + (1 if ANY_COLOR in colors and needed else 0), len(colors))
+
+    return max(lands, key=score)
+
+
+def _bottom(hand: List[int], cards: List[CardSpec], count: int) -> List[int]:
+    # London mulligan: devolve terrenos em excesso ou as mágicas mais caras
+    hand = list(hand)
+    for _ in range(count):
+        lands = [position for position, card in enumerate(hand) if cards[card][0]]
+        if len(lands) * 2 > len(hand):
+            hand.pop(lands[-1])
+        else:
+            spells = [position for position, card in enumerate(hand) if not cards[card][0]]
+            hand.pop(max(spells, key=lambda position: cards[hand[position]][2]))
+    return hand
+
+
+def _simulate_chunk(
+    cards: List[CardSpec],
+    deck: List[int],
+    games: int,
+    seed: int,
+    turns: int,
+    on_the_play: bool
+) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    stats = {
+        "games": 0,
+        "mulligans": 0,
+        "curve_out": [0] * (turns + 1),
+        "screw": 0,
+        "flood": 0,
+        "mana_spent": [0] * turns,
+        "lands_in_play": [0] * turns,
+    }
+    screw_turn = min(SCREW_TURN, turns)
+
+    for _ in range(games):
+        library = list(deck)
+        for mulligans in range(MAX_MULLIGANS + 1):
+            rng.shuffle(library)
+            hand = library[:OPENING_HAND_SIZE]
+            lands = sum(1 for card in hand if cards[card][0])
+            if KEEP_LANDS[0] <= lands <= KEEP_LANDS[1] or mulligans == MAX_MULLIGANS:
+                break
+        stats["mulligans"] += mulligans
+
+        kept = _bottom(hand, cards, mulligans)
+        bottomed = list(hand)
+        for card in kept:
+            bottomed.remove(card)
+        library = library[OPENING_HAND_SIZE:] + bottomed
+        hand = kept
+
+        lands_in_play: List[Tuple[str, ...]] = []
+        rocks: List[Tuple[str, ...]] = []
+        curve_intact = True
+        curve_out = 1
+
+        for turn in range(1, turns + 1):
+            if turn > 1 or not on_the_play:
+                if library:
+                    hand.append(library.pop(0))
+
+            land_position = _choose_land(hand, cards, lands_in_play + rocks)
+            if land_position is not None:
+                lands_in_play.append(cards[hand.pop(land_position)][1])
+
+            sources = lands_in_play + rocks
+            available = len(sources)
+            spent = 0
+            new_rocks = []
+            while True:
+                castable = []
+                for position, card in enumerate(hand):
+                    spec = cards[card]
+                    if spec[5] and spec[2] <= len(sources):
+                        payment = _pay(spec, sources)
+                        if payment is not None:
+                            castable.append((spec[2], len(spec[4]), position, payment))
+                if not castable:
+                    break
+                cmc, _, position, payment = max(castable)
+                spec = cards[hand.pop(position)]
+                sources = [source for index, source in enumerate(sources) if index not in payment]
+                spent += cmc
+                if spec[1] and spec[6]:
+                    new_rocks.append(spec[1])
+                elif spec[1]:
+                    # Mágica de mana (ex: Dark Ritual): a mana só vale neste turno
+                    sources.append(spec[1])
+            rocks.extend(new_rocks)
+
+            stats["mana_spent"][turn - 1] += spent
+            stats["lands_in_play"][turn - 1] += len(lands_in_play)
+
+            if turn >= 2 and curve_intact:
+                if land_position is not None and spent >= available:
+                    curve_out = turn
+                else:
+                    curve_intact = False
+
+            if turn == screw_turn and len(lands_in_play) <= turn - 2:
+                stats["screw"] += 1
+
+        stats["curve_out"][curve_out] += 1
+        if sum(1 for card in hand if cards[card][0]) >= FLOOD_LANDS_IN_HAND:
+            stats["flood"] += 1
+        stats["games"] += 1
+
+    return stats
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=SIMULATION_WORKERS or None)
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+def _merge(results: List[Dict[str, Any]], turns: int) -> Dict[str, Any]:
+    total = {
+        "games": 0,
+        "mulligans": 0,
+        "curve_out": [0] * (turns + 1),
+        "screw": 0,
+        "flood": 0,
+        "mana_spent": [0] * turns,
+        "lands_in_play": [0] * turns,
+    }
+    for result in results:
+        for key, value in result.items():
+            if isinstance(value, list):
+                total[key] = [a + b for a, b in zip(total[key], value)]
+            else:
+                total[key] += value
+    return total
+
+
+def _summarize(stats: Dict[str, Any], turns: int) -> Dict[str, Any]:
+    games = stats["games"] or 1
+    return {
+        "games": stats["games"],
+        "curve_out_turn": {
+            str(turn): round(stats["curve_out"][turn] / games, 4)
+            for turn in range(1, turns + 1)
+            if stats["curve_out"][turn]
+        },
+        "curve_out_rate": round(stats["curve_out"][turns] / games, 4) if turns > 1 else None,
+        "screw_rate": round(stats["screw"] / games, 4),
+        "flood_rate": round(stats["flood"] / games, 4),
+        "average_mulligans": round(stats["mulligans"] / games, 4),
+        "by_turn": [
+            {
+                "turn": turn,
+                "average_mana_spent": round(stats["mana_spent"][turn - 1] / games, 3),
+                "average_lands_in_play": round(stats["lands_in_play"][turn - 1] / games, 3),
+            }
+            for turn in range(1, turns + 1)
+        ],
+    }
+
+
+async def simulate_deck(
+    deck_id: str,
+    games: int = 10000,
+    turns: int = 7,
+    on_the_play: bool = True,
+    seed: int = 0
+) -> Optional[Dict[str, Any]]:
+    """
+    Simula `games` partidas do deck fora do event loop (lotes de CHUNK_GAMES
+    partidas no pool de processos). O resultado fica em cache por versão do
+    deck. Retorna None se o deck não existe.
+    """
+    deck = await crud_deck.get_deck_by_id(deck_id)
+    if not deck:
+        return None
+
+    # Decks anteriores ao versionamento usam a data da última alteração
+    version = deck.get("version") or deck.get("updated_at")
+    cache_key = (deck_id, version, games, turns, on_the_play, seed)
+    cached = _cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    deck_cards = deck.get("cards", [])
+    scryfall_ids = [card.get("scryfall_id") for card in deck_cards if card.get("scryfall_id")]
+    cards_map = await crud_card.get_cards_by_scryfall_ids(scryfall_ids, SIMULATION_CARD_PROJECTION)
+
+    cards: List[CardSpec] = []
+    library: List[int] = []
+    missing_cards = 0
+    for deck_card in deck_cards:
+        card = cards_map.get(deck_card.get("scryfall_id"))
+        if card is None:
+            missing_cards += deck_card.get("quantity", 1)
+        cards.append(_card_spec(card))
+        library.extend([len(cards) - 1] * deck_card.get("quantity", 1))
+
+    result: Dict[str, Any] = {
+        "deck_id": deck_id,
+        "version": deck.get("version"),
+        "turns": turns,
+        "on_the_play": on_the_play,
+        "seed": seed,
+        "missing_cards": missing_cards,
+    }
+
+    if len(library) < OPENING_HAND_SIZE:
+        result.update(_summarize(_merge([], turns), turns))
+        return result
+
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    chunks = [
+        loop.run_in_executor(
+            executor,
+            _simulate_chunk,
+            cards,
+            library,
+            min(CHUNK_GAMES, games - start),
+            seed * 1_000_003 + index,
+            turns,
+            on_the_play
+        )
+        for index, start in enumerate(range(0, games, CHUNK_GAMES))
+    ]
+    stats = _merge(await asyncio.gather(*chunks), turns)
+
+    result.update(_summarize(stats, turns))
+    _cache.set(cache_key, result)
+    return result
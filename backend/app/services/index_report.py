@@ -0,0 +1,172 @@
+"""
+Relatório de planos de consulta (explain) das consultas canônicas
+
+Cada consulta canônica reproduz o formato de uma consulta real de app/crud
+(filtro, ordenação, limit), com valores de exemplo. Os filtros vêm dos
+mesmos construtores que as funções de app/crud usam (_card_search_filter,
+_deck_list_filter...), então não divergem delas; só as buscas por um campo
+simples ficam escritas aqui. O relatório roda o explain de cada uma e aponta:
+
+- COLLSCAN: a consulta varre a coleção inteira
+- SORT: ordenação em memória (nenhum índice entrega a ordem pedida)
+- índices da especificação (app.core.indexes.INDEXES) que nenhuma consulta
+  canônica usou; índices únicos ficam de fora, já que garantem unicidade
+- índices existentes fora da especificação e índices da especificação que
+  ainda não existem no banco (migração pendente)
+
+`python -m app.cli index-report --strict` sai com erro se houver problemas,
+para rodar no CI contra um banco migrado; `pytest -m mongo` (tests/test_index_report.py)
+faz a mesma verificação na suíte de testes.
+"""
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, NamedTuple
+
+from bson import ObjectId
+
+from app.core.db import db
+from app.core.indexes import INDEXES, list_indexes
+from app.core.profiling import explain_summary
+from app.crud import card as crud_card
+from app.crud import card_cooccurrence as crud_card_cooccurrence
+from app.crud import card_prices as crud_card_prices
+from app.crud import deck as crud_deck
+from app.crud import deck_history as crud_deck_history
+
+SAMPLE_ID = ObjectId("000000000000000000000000")
+SAMPLE_AT = datetime(2026, 1, 1)
+
+
+class CanonicalQuery(NamedTuple):
+    name: str
+    source: str
+    collection: str
+    command: Dict[str, Any]
+
+
+def _find(collection: str, filter: Dict[str, Any], **options: Any) -> Dict[str, Any]:
+    return {"find": collection, "filter": filter, **options}
+
+
+CANONICAL_QUERIES: List[CanonicalQuery] = [
+    CanonicalQuery("cards_by_scryfall_id", "crud.card.get_cards_by_scryfall_ids", "cards",
+                   _find("cards", {"scryfall_id": {"$in": ["id-1", "id-2"]}})),
+    CanonicalQuery("cards_by_oracle_id", "crud.card.get_scryfall_ids_by_oracle_id", "cards",
+                   {"distinct": "cards", "key": "scryfall_id", "query": {"oracle_id": "oracle-1"}}),
+    CanonicalQuery("cards_by_name", "crud.card.get_cards_by_names", "cards",
+                   _find("cards", {"name": {"$in": ["Lightning Bolt"]}})),
+    CanonicalQuery("cards_search_name", "crud.card.search_cards", "cards",
+                   _find("cards", crud_card._card_search_filter(name="bolt"), limit=50)),
+    CanonicalQuery("cards_search_type", "crud.card.search_cards", "cards",
+                   _find("cards", crud_card._card_search_filter(type_line="creature"), limit=50)),
+    CanonicalQuery("cards_search_colors_rarity_type", "crud.card.search_cards", "cards",
+                   _find("cards", crud_card._card_search_filter(colors=["R", "G"], type_line="creature", rarity="rare"),
+                         limit=50)),
+    CanonicalQuery("cards_search_rarity", "crud.card.search_cards", "cards",
+                   _find("cards", crud_card._card_search_filter(rarity="mythic"), skip=50, limit=50)),
+    CanonicalQuery("decks_by_name", "crud.deck.get_deck_by_name", "decks",
+                   _find("decks", {"name": "Red Deck Wins"})),
+    CanonicalQuery("decks_list", "crud.deck.get_all_decks", "decks",
+                   _find("decks", crud_deck._deck_list_filter(), sort=dict(crud_deck.DECK_LIST_SORT), limit=50)),
+    CanonicalQuery("decks_list_by_format", "crud.deck.get_all_decks", "decks",
+                   _find("decks", crud_deck._deck_list_filter(format="modern"), sort=dict(crud_deck.DECK_LIST_SORT),
+                         skip=50, limit=50)),
+    CanonicalQuery("decks_list_by_validity", "crud.deck.get_all_decks", "decks",
+                   _find("decks", crud_deck._deck_list_filter(valid=False), sort=dict(crud_deck.DECK_LIST_SORT),
+                         limit=50)),
+    CanonicalQuery("decks_count_by_format", "crud.deck.count_decks", "decks",
+                   {"count": "decks", "query": crud_deck._deck_list_filter(format="modern")}),
+    CanonicalQuery("decks_containing_card", "crud.deck.get_decks_containing_cards", "decks",
+                   _find("decks", crud_deck._decks_containing_filter(["id-1"], after=str(SAMPLE_ID)),
+                         sort={"_id": 1}, limit=50)),
+    CanonicalQuery("decks_card_usage", "crud.deck.get_card_usage", "decks",
+                   {"aggregate": "decks", "cursor": {}, "pipeline": crud_deck._card_usage_pipeline(["id-1"])}),
+    CanonicalQuery("decks_similar_candidates", "crud.deck.get_similar_deck_candidates", "decks",
+                   _find("decks", crud_deck._similar_candidates_filter(["0:abc", "1:def"], SAMPLE_ID), limit=5000)),
+    CanonicalQuery("deck_history_versions", "crud.deck_history.get_deck_history", "deck_history",
+                   _find("deck_history", crud_deck_history._history_filter(SAMPLE_ID, before_version=10),
+                         sort={"version": -1}, limit=50)),
+    CanonicalQuery("deck_history_state_at", "crud.deck_history.get_deck_state_at", "deck_history",
+                   _find("deck_history", crud_deck_history._state_at_filter(SAMPLE_ID, SAMPLE_AT),
+                         sort={"version": -1}, limit=1)),
+    CanonicalQuery("card_pairs_related", "crud.card_cooccurrence.get_related_cards", "card_pairs",
+                   _find("card_pairs", crud_card_cooccurrence._pairs_filter("oracle-1", "modern", 2),
+                         sort={"count": -1}, limit=2000)),
+    CanonicalQuery("card_prices_range", "crud.card_prices.get_price_history", "card_price_history",
+                   _find("card_price_history",
+                         crud_card_prices._history_filter("id-1", since=datetime(2026, 1, 1), until=datetime(2026, 6, 30)),
+                         sort={"month": 1})),
+    CanonicalQuery("card_counts_partners", "crud.card_cooccurrence.get_related_cards", "card_counts",
+                   _find("card_counts", crud_card_cooccurrence._counts_filter(["oracle-1", "oracle-2"], "modern"))),
+]
+
+
+def _plan_nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    # Todos os estágios do plano, inclusive os ramos de $or
+    yield plan
+    children = plan.get("inputStages") or ([plan["inputStage"]] if plan.get("inputStage") else [])
+    for child in children:
+        yield from _plan_nodes(child)
+
+
+def _winning_plan(explain: Dict[str, Any]) -> Dict[str, Any]:
+    if "queryPlanner" not in explain and explain.get("stages"):
+        explain = explain["stages"][0].get("$cursor", {})
+    winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+    return winning_plan.get("queryPlan", winning_plan)
+
+
+async def explain_query(query: CanonicalQuery) -> Dict[str, Any]:
+    explain = await db.command({"explain": query.command, "verbosity": "executionStats"})
+    nodes = list(_plan_nodes(_winning_plan(explain)))
+    stages = {node.get("stage") for node in nodes}
+
+    problems = []
+    if "COLLSCAN" in stages:
+        problems.append("COLLSCAN")
+    if "SORT" in stages:
+        problems.append("SORT em memória")
+
+    return {
+        "name": query.name,
+        "source": query.source,
+        "collection": query.collection,
+        "indexes": sorted({node["indexName"] for node in nodes if node.get("indexName")}),
+        "problems": problems,
+        **explain_summary(explain),
+    }
+
+
+async def _index_usage(collection: str) -> Dict[str, int]:
+    # Operações por índice desde o último restart do servidor
+    try:
+        cursor = db[collection].aggregate([{"$indexStats": {}}])
+        return {stats["name"]: stats["accesses"]["ops"] async for stats in cursor}
+    except Exception:
+        return {}
+
+
+async def build_index_report() -> Dict[str, Any]:
+    queries = [await explain_query(query) for query in CANONICAL_QUERIES]
+    used = {(query["collection"], name) for query in queries for name in query["indexes"]}
+    existing = await list_indexes()
+
+    collections = []
+    for collection, specs in INDEXES.items():
+        names = existing.get(collection, {})
+        expected = {spec.name for spec in specs}
+        usage = await _index_usage(collection)
+        collections.append({
+            "collection": collection,
+            "missing": sorted(expected - set(names)),
+            "unmanaged": sorted(set(names) - expected - {"_id_"}),
+            "unused": [
+                spec.name for spec in specs
+                if not spec.unique and (collection, spec.name) not in used
+            ],
+            "ops": usage,
+        })
+
+    problems = sum(len(query["problems"]) for query in queries) + sum(
+        len(collection["missing"]) + len(collection["unused"]) for collection in collections
+    )
+    return {"ok": problems == 0, "problems": problems, "queries": queries, "collections": collections}
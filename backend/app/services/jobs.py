@@ -0,0 +1,11 @@
+"""
+Tarefas periódicas registradas no agendador (app.core.scheduler)
+"""
+from app.core import scheduler
+from app.core.config import CARD_REFRESH_ENABLED
+from app.services import card_refresh
+
+
+def register_jobs() -> None:
+    if CARD_REFRESH_ENABLED:
+        scheduler.register(card_refresh.CARD_REFRESH_JOB)
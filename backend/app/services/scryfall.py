@@ -1,12 +1,58 @@
+import asyncio
+import time
 import httpx
 from typing import List, Dict, Any
 
+from app.core import metrics, profiling
+
+# Respostas 429 (limite de requisições) e 5xx são repetidas até MAX_RETRIES vezes
+MAX_RETRIES = 2
+RETRY_BACKOFF_SECONDS = 0.5
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _retry_delay(response: httpx.Response, attempt: int) -> float:
+    retry_after = response.headers.get("Retry-After", "")
+    if retry_after.isdigit():
+        return float(retry_after)
+    return RETRY_BACKOFF_SECONDS * (2 ** attempt)
+
+
+def _record(endpoint: str, status: str, seconds: float) -> None:
+    metrics.scryfall_request_duration_seconds.observe(seconds, endpoint)
+    metrics.scryfall_requests_total.inc(endpoint, status)
+    profiling.add_upstream_time(seconds)
+
+
+async def _request(client: httpx.AsyncClient, method: str, url: str, endpoint: str, **kwargs) -> httpx.Response:
+    """
+    Faz a chamada à Scryfall registrando latência, status e retentativas
+    por endpoint (template fixo, ex: "cards/named") nas métricas e o tempo
+    no span "upstream" da requisição.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.RequestError:
+            _record(endpoint, "error", time.perf_counter() - start)
+            raise
+        _record(endpoint, str(response.status_code), time.perf_counter() - start)
+        
+        if response.status_code not in RETRY_STATUS_CODES or attempt == MAX_RETRIES:
+            break
+        metrics.scryfall_retries_total.inc(endpoint)
+        await asyncio.sleep(_retry_delay(response, attempt))
+    
+    response.raise_for_status()
+    return response
+
+
 async def get_card_data(name: str):
     url = f"https://api.scryfall.com/cards/named?exact={name}"
     
     async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        response.raise_for_status()
+        response = await _request(client, "GET", url, "cards/named")
         return response.json()
 
 
@@ -14,44 +60,30 @@ async def get_card_by_id(scryfall_id: str):
     url = f"https://api.scryfall.com/cards/{scryfall_id}"
     
     async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        response.raise_for_status()
+        response = await _request(client, "GET", url, "cards/{id}")
         return response.json()
 
 
-async def get_cards_collection(names: List[str]) -> List[Dict[str, Any]]:
+async def get_cards_by_identifiers(identifiers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     url = "https://api.scryfall.com/cards/collection"
     max_batch_size = 75
     all_results = []
     
-    for i in range(0, len(names), max_batch_size):
-        batch = names[i:i + max_batch_size]
-        identifiers = [{"name": name} for name in batch]
-        payload = {"identifiers": identifiers}
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload)
-            response.raise_for_status()
+    async with httpx.AsyncClient() as client:
+        for i in range(0, len(identifiers), max_batch_size):
+            batch = identifiers[i:i + max_batch_size]
+            payload = {"identifiers": batch}
+            
+            response = await _request(client, "POST", url, "cards/collection", json=payload)
             data = response.json()
             all_results.extend(data.get("data", []))
     
     return all_results
 
 
+async def get_cards_collection(names: List[str]) -> List[Dict[str, Any]]:
+    return await get_cards_by_identifiers([{"name": name} for name in names])
+
+
 async def get_cards_by_ids(scryfall_ids: List[str]) -> List[Dict[str, Any]]:
-    url = "https://api.scryfall.com/cards/collection"
-    max_batch_size = 75
-    all_results = []
-    
-    for i in range(0, len(scryfall_ids), max_batch_size):
-        batch = scryfall_ids[i:i + max_batch_size]
-        identifiers = [{"id": scryfall_id} for scryfall_id in batch]
-        payload = {"identifiers": identifiers}
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            all_results.extend(data.get("data", []))
-    
-    return all_results
\ No newline at end of file
+    return await get_cards_by_identifiers([{"id": scryfall_id} for scryfall_id in scryfall_ids])
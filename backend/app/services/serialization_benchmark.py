@@ -0,0 +1,136 @@
+"""
+Micro-benchmark da serialização das listagens (caminho padrão x orjson)
+
+Gera páginas sintéticas com documentos no formato gravado pela API (cartas
+com image_uris/prices completos e campos internos, decks com 60 cartas) e
+mede o tempo de CPU de cada caminho por endpoint:
+
+- padrão: convert_ids_in_list + validação pelo response_model + json.dumps
+- rápido: shape_documents + orjson (MongoJSONResponse)
+
+Antes de medir, confere que os dois caminhos geram o mesmo JSON.
+"""
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, Callable, List, Type
+
+from bson import ObjectId
+from pydantic import BaseModel
+
+from app.schemas import CardListResponse, CardResponse, DeckListResponse, DeckResponse
+from app.utils.helpers import convert_ids_in_list
+from app.utils.legality import encode_legalities
+from app.utils.serialization import dumps, shape_documents
+
+IMAGE_SIZES = ("small", "normal", "large", "png", "art_crop", "border_crop")
+
+
+def _card_document(index: int) -> Dict[str, Any]:
+    scryfall_id = f"{index:08x}-0000-4000-8000-000000000000"
+    legal_mask, restricted_mask = encode_legalities({"modern": "legal", "commander": "legal", "vintage": "restricted"})
+    return {
+        "_id": ObjectId(),
+        "scryfall_id": scryfall_id,
+        "oracle_id": f"{index:08x}-1111-4000-8000-000000000000",
+        "name": f"Benchmark Card {index}",
+        "mana_cost": "{2}{R}{R}",
+        "cmc": 4.0,
+        "type_line": "Creature — Dragon",
+        "oracle_text": "Flying\nWhen this creature enters, it deals 3 damage to any target.",
+        "power": "4",
+        "toughness": "4",
+        "colors": ["R"],
+        "color_identity": ["R"],
+        "produced_mana": None,
+        "rarity": "rare",
+        "set_name": "Benchmark Set",
+        "set_code": "bmk",
+        "collector_number": str(index),
+        "mtgo_id": 100000 + index,
+        "image_uris": {
+            size: f"https://cards.scryfall.io/{size}/front/0/0/{scryfall_id}.jpg?1700000000"
+            for size in IMAGE_SIZES
+        },
+        "prices": {"usd": "1.25", "usd_foil": "3.50", "usd_etched": None, "eur": "1.10", "eur_foil": "2.90", "tix": "0.05"},
+        "legal_mask": legal_mask,
+        "restricted_mask": restricted_mask,
+    }
+
+
+def _deck_document(index: int) -> Dict[str, Any]:
+    created_at = datetime(2024, 1, 1, 12, 0, 0, 123000) + timedelta(minutes=index)
+    return {
+        "_id": ObjectId(),
+        "name": f"Benchmark Deck {index}",
+        "format": "modern",
+        "cards": [
+            {"scryfall_id": f"{card:08x}-0000-4000-8000-000000000000", "quantity": 4}
+            for card in range(15)
+        ],
+        "created_at": created_at,
+        "updated_at": created_at,
+        "version": 3,
+        "stats": {"total_cards": 60, "mana_curve": {"1": 8, "2": 12, "3": 10}},
+        "validation": {"valid": True, "errors": []},
+    }
+
+
+def _standard(response_model: Type[BaseModel], key: str) -> Callable[[List[Dict[str, Any]]], bytes]:
+    def serialize(documents: List[Dict[str, Any]]) -> bytes:
+        convert_ids_in_list(documents)
+        content = {"total": len(documents), "limit": len(documents), "skip": 0, key: documents}
+        # Mesmo caminho da rota com response_model: valida, serializa pelo alias e codifica com json
+        encoded = response_model.model_validate(content).model_dump(mode="json", by_alias=True)
+        return json.dumps(encoded, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    return serialize
+
+
+def _fast(item_model: Type[BaseModel], key: str) -> Callable[[List[Dict[str, Any]]], bytes]:
+    def serialize(documents: List[Dict[str, Any]]) -> bytes:
+        content = {"total": len(documents), "limit": len(documents), "skip": 0, key: shape_documents(documents, item_model)}
+        return dumps(content)
+    return serialize
+
+
+ENDPOINTS = {
+    "GET /cards/ e /cards/all": (_card_document, _standard(CardListResponse, "cards"), _fast(CardResponse, "cards")),
+    "GET /decks/": (_deck_document, _standard(DeckListResponse, "decks"), _fast(DeckResponse, "decks")),
+}
+
+
+def _measure(serialize: Callable, make_page: Callable[[], List[Dict[str, Any]]], iterations: int) -> float:
+    # As páginas são geradas fora da medição: convert_ids_in_list altera os documentos
+    pages = [make_page() for _ in range(iterations)]
+    start = time.process_time()
+    for page in pages:
+        serialize(page)
+    return (time.process_time() - start) / iterations
+
+
+def run_benchmark(items: int = 100, iterations: int = 200) -> List[Dict[str, Any]]:
+    """
+    Tempo médio de CPU (ms) por página de `items` documentos em cada caminho.
+    Levanta AssertionError se os caminhos geram JSON diferente.
+    """
+    results = []
+    for endpoint, (make_document, standard, fast) in ENDPOINTS.items():
+        base = [make_document(index) for index in range(items)]
+
+        def make_page() -> List[Dict[str, Any]]:
+            return [dict(document) for document in base]
+
+        if json.loads(standard(make_page())) != json.loads(fast(make_page())):
+            raise AssertionError(f"{endpoint}: JSON do caminho rápido difere do padrão")
+
+        standard_ms = _measure(standard, make_page, iterations) * 1000
+        fast_ms = _measure(fast, make_page, iterations) * 1000
+        results.append({
+            "endpoint": endpoint,
+            "items": items,
+            "bytes": len(fast(make_page())),
+            "standard_ms": round(standard_ms, 3),
+            "fast_ms": round(fast_ms, 3),
+            "speedup": round(standard_ms / fast_ms, 1) if fast_ms else None,
+        })
+    return results
@@ -0,0 +1,187 @@
+"""
+Benchmark da busca de decks quase idênticos (MinHash/LSH) em escala
+
+Gera decks sintéticos no banco em memória (STORAGE_BACKEND=memory), em
+tamanhos crescentes (padrão: 1.000, 10.000 e 100.000 decks), e em cada
+tamanho mede:
+
+- candidatos LSH por deck consultado (decks lidos e comparados por
+  GET /decks/{id}/similar) e pares comparados por GET /decks/admin/duplicates,
+  contra o total de pares da coleção
+- latência das duas rotas, chamadas pela aplicação ASGI (httpx, sem rede)
+
+Os decks são variações de arquétipos: cada arquétipo tem uma lista de
+cartas (algumas de um grupo comum de staples) e cada deck troca de 0 a
+`max_swaps` cartas dela, então há quase-duplicatas de verdade e buckets do
+tamanho de um arquétipo, como em uma coleção real. A geração usa uma
+semente fixa: o mesmo comando gera os mesmos decks.
+
+As assinaturas são as mesmas gravadas pela API (app.utils.minhash); estatísticas,
+histórico e coocorrência não são calculados, já que as rotas medidas não os usam.
+"""
+import random
+import statistics
+import time
+from typing import Dict, Any, List, Tuple
+
+import httpx
+from bson import ObjectId
+
+from app.core.config import STORAGE_BACKEND
+from app.core.db import db
+from app.crud import deck as crud_deck
+from app.utils.minhash import minhash_signature, lsh_bands
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+CARD_POOL_SIZE = 30000
+STAPLES = 60
+STAPLES_PER_DECK = 8
+DISTINCT_CARDS_PER_DECK = 23
+DECKS_PER_ARCHETYPE = 10
+INSERT_CHUNK_SIZE = 1000
+SEED = 0x4D544744
+
+
+class SimilarityBenchmarkError(RuntimeError):
+    pass
+
+
+def _card_id(index: int) -> str:
+    return f"{index:08x}-0000-4000-8000-000000000000"
+
+
+class _DeckGenerator:
+    def __init__(self, max_swaps: int):
+        self.random = random.Random(SEED)
+        self.max_swaps = max_swaps
+        self.archetype: List[str] = []
+        self.count = 0
+
+    def _new_archetype(self) -> List[str]:
+        staples = self.random.sample(range(STAPLES), STAPLES_PER_DECK)
+        others = self.random.sample(range(STAPLES, CARD_POOL_SIZE), DISTINCT_CARDS_PER_DECK - STAPLES_PER_DECK)
+        return [_card_id(index) for index in staples + others]
+
+    def next_deck(self) -> Dict[str, Any]:
+        if self.count % DECKS_PER_ARCHETYPE == 0:
+            self.archetype = self._new_archetype()
+
+        card_ids = list(self.archetype)
+        for position in self.random.sample(range(len(card_ids)), self.random.randint(0, self.max_swaps)):
+            card_ids[position] = _card_id(self.random.randrange(STAPLES, CARD_POOL_SIZE))
+
+        signature = minhash_signature(card_ids)
+        deck = {
+            "_id": ObjectId(),
+            "name": f"Benchmark Deck {self.count}",
+            "format": "modern",
+            "cards": [{"scryfall_id": scryfall_id, "quantity": 4} for scryfall_id in dict.fromkeys(card_ids)],
+            crud_deck.MINHASH_FIELD: signature,
+            crud_deck.LSH_BANDS_FIELD: lsh_bands(signature),
+        }
+        self.count += 1
+        return deck
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def _grow_collection(generator: _DeckGenerator, size: int, deck_ids: List[ObjectId]) -> None:
+    while generator.count < size:
+        chunk = [generator.next_deck() for _ in range(min(INSERT_CHUNK_SIZE, size - generator.count))]
+        await db.decks.insert_many(chunk)
+        deck_ids.extend(deck["_id"] for deck in chunk)
+
+
+async def _candidate_pairs() -> Tuple[int, int]:
+    buckets = await crud_deck.get_lsh_buckets()
+    pairs = set()
+    for bucket in buckets:
+        for i, a in enumerate(bucket):
+            for b in bucket[i + 1:]:
+                pairs.add((a, b) if a < b else (b, a))
+    return len(buckets), len(pairs)
+
+
+async def _measure_size(
+    client: httpx.AsyncClient,
+    deck_ids: List[ObjectId],
+    sample: random.Random,
+    queries: int,
+    repeats: int
+) -> Dict[str, Any]:
+    size = len(deck_ids)
+
+    candidates = []
+    similar_ms = []
+    similar_found = []
+    for deck_id in sample.sample(deck_ids, min(queries, size)):
+        deck = await crud_deck.get_deck_signature(str(deck_id))
+        candidates.append(len(await crud_deck.get_similar_deck_candidates(deck[crud_deck.LSH_BANDS_FIELD], deck_id)))
+
+        start = time.perf_counter()
+        response = await client.get(f"/decks/{deck_id}/similar")
+        similar_ms.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+        similar_found.append(len(response.json()["decks"]))
+
+    duplicates_ms = []
+    clusters = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        response = await client.get("/decks/admin/duplicates", params={"limit": 500})
+        duplicates_ms.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+        clusters = response.json()["total"]
+
+    buckets, pairs = await _candidate_pairs()
+    return {
+        "decks": size,
+        "similar_queries": len(candidates),
+        "similar_candidates_avg": round(statistics.mean(candidates), 1),
+        "similar_candidates_max": max(candidates),
+        "similar_results_avg": round(statistics.mean(similar_found), 1),
+        "similar_p50_ms": round(statistics.median(similar_ms), 2),
+        "similar_p95_ms": round(_percentile(similar_ms, 0.95), 2),
+        "duplicates_buckets": buckets,
+        "duplicates_candidate_pairs": pairs,
+        "all_pairs": size * (size - 1) // 2,
+        "duplicates_clusters": clusters,
+        "duplicates_ms": round(statistics.median(duplicates_ms), 1),
+    }
+
+
+async def run_benchmark(
+    sizes: Tuple[int, ...] = DEFAULT_SIZES,
+    queries: int = 50,
+    repeats: int = 3,
+    max_swaps: int = 6
+):
+    """
+    Cresce a coleção até cada tamanho de `sizes` (em ordem crescente) e gera
+    um resultado por tamanho. Exige o backend em memória: os decks
+    sintéticos nunca são gravados em um MongoDB de verdade.
+    """
+    if STORAGE_BACKEND != "memory":
+        raise SimilarityBenchmarkError(
+            "O benchmark grava decks sintéticos e exige STORAGE_BACKEND=memory"
+        )
+    if await db.decks.estimated_document_count():
+        raise SimilarityBenchmarkError("O benchmark exige uma coleção de decks vazia")
+
+    from app.core.migrations import run_migrations
+    from app.main import app
+
+    await run_migrations()
+
+    generator = _DeckGenerator(max_swaps)
+    sample = random.Random(SEED + 1)
+    deck_ids: List[ObjectId] = []
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for size in sorted(sizes):
+            await _grow_collection(generator, size, deck_ids)
+            yield await _measure_size(client, deck_ids, sample, queries, repeats)
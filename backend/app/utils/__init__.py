@@ -3,6 +3,31 @@ Utils module - Funções auxiliares e utilitários
 """
 from app.utils.scryfall_mapper import map_scryfall_to_card
 from app.utils.helpers import convert_id_to_string, convert_ids_in_list, is_valid_object_id
+from app.utils.legality import FORMATS, encode_legalities, legality_status
+from app.utils.cache import LRUCache
+from app.utils.mana import parse_mana_cost, produced_colors, is_land
+from app.utils.minhash import minhash_signature, lsh_bands, estimate_similarity
+from app.utils.serialization import MongoJSONResponse, shape_documents
+from app.utils.streaming import BodyConsumingStreamingResponse, iter_ndjson_lines
 
-__all__ = ["map_scryfall_to_card", "convert_id_to_string", "convert_ids_in_list", "is_valid_object_id"]
+__all__ = [
+    "map_scryfall_to_card",
+    "convert_id_to_string",
+    "convert_ids_in_list",
+    "is_valid_object_id",
+    "BodyConsumingStreamingResponse",
+    "iter_ndjson_lines",
+    "MongoJSONResponse",
+    "shape_documents",
+    "FORMATS",
+    "encode_legalities",
+    "legality_status",
+    "minhash_signature",
+    "lsh_bands",
+    "estimate_similarity",
+    "LRUCache",
+    "parse_mana_cost",
+    "produced_colors",
+    "is_land",
+]
 
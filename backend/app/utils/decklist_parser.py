@@ -0,0 +1,91 @@
+"""
+Parser de listas de deck em texto (MTGO, Arena e o formato da exportação)
+"""
+import re
+from typing import Dict, Any, List
+
+MAIN = "main"
+SIDEBOARD = "sideboard"
+COMMANDER = "commander"
+COMPANION = "companion"
+MAYBEBOARD = "maybeboard"
+
+SECTION_HEADERS = {
+    "deck": MAIN,
+    "main": MAIN,
+    "maindeck": MAIN,
+    "mainboard": MAIN,
+    "sideboard": SIDEBOARD,
+    "commander": COMMANDER,
+    "companion": COMPANION,
+    "maybeboard": MAYBEBOARD,
+    "about": None,
+}
+
+# "4 Lightning Bolt", "4x Lightning Bolt", "SB: 2 Duress", "1 Lightning Bolt (M10) 146 *F*"
+LINE_PATTERN = re.compile(
+    r"^(?P<sideboard>SB:\s*)?"
+    r"(?:(?P<quantity>\d+)x?\s+)?"
+    r"(?P<name>.+?)"
+    r"(?:\s+\((?P<set_code>[A-Za-z0-9]{2,6})\)(?:\s+[A-Za-z0-9-]+)?)?"
+    r"(?:\s+\*[A-Z]\*)?\s*$"
+)
+
+
+def parse_decklist(text: str) -> List[Dict[str, Any]]:
+    """
+    Converte uma lista de deck em texto em entradas
+    `{"name", "quantity", "set_code", "section"}`.
+
+    Linhas sem quantidade contam como 1 cópia; linhas com quantidade 0
+    (ex: "0 Forest") são ignoradas. Sem cabeçalhos de seção, a
+    primeira linha em branco após cartas do deck principal inicia o
+    sideboard (convenção do MTGO).
+    """
+    entries: List[Dict[str, Any]] = []
+    section = MAIN
+    saw_header = False
+    main_has_cards = False
+
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+
+        if not line:
+            if not saw_header and main_has_cards:
+                section = SIDEBOARD
+            continue
+
+        if line.startswith(("//", "#")):
+            continue
+
+        header = line.rstrip(":").strip().lower()
+        if header in SECTION_HEADERS:
+            section = SECTION_HEADERS[header]
+            saw_header = True
+            continue
+
+        if section is None:
+            continue
+
+        match = LINE_PATTERN.match(line)
+        if not match:
+            continue
+
+        quantity = int(match.group("quantity") or 1)
+        if quantity < 1:
+            continue
+
+        entry_section = SIDEBOARD if match.group("sideboard") else section
+        set_code = match.group("set_code")
+
+        entries.append({
+            "name": match.group("name").strip(),
+            "quantity": quantity,
+            "set_code": set_code.lower() if set_code else None,
+            "section": entry_section,
+        })
+
+        if entry_section == MAIN:
+            main_has_cards = True
+
+    return entries
@@ -0,0 +1,73 @@
+"""
+Codificação compacta das legalidades da Scryfall em bitmaps
+
+Cada formato ocupa um bit fixo (a ordem de FORMATS só pode crescer no final).
+`legal_mask` marca os formatos em que a carta é legal ou restrita e
+`restricted_mask` os formatos em que ela é restrita.
+"""
+from typing import Dict, Optional, Tuple
+
+FORMATS = (
+    "standard",
+    "future",
+    "historic",
+    "timeless",
+    "gladiator",
+    "pioneer",
+    "explorer",
+    "modern",
+    "legacy",
+    "pauper",
+    "vintage",
+    "penny",
+    "commander",
+    "oathbreaker",
+    "standardbrawl",
+    "brawl",
+    "alchemy",
+    "paupercommander",
+    "duel",
+    "oldschool",
+    "premodern",
+    "predh",
+)
+
+FORMAT_BITS = {format: 1 << index for index, format in enumerate(FORMATS)}
+
+
+def encode_legalities(legalities: Optional[Dict[str, str]]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Converte `{"modern": "legal", "vintage": "restricted", ...}` em
+    (legal_mask, restricted_mask). Retorna (None, None) sem legalidades.
+    """
+    if not legalities:
+        return None, None
+    
+    legal_mask = 0
+    restricted_mask = 0
+    
+    for format, status in legalities.items():
+        bit = FORMAT_BITS.get(format)
+        if bit is None:
+            continue
+        if status in ("legal", "restricted"):
+            legal_mask |= bit
+        if status == "restricted":
+            restricted_mask |= bit
+    
+    return legal_mask, restricted_mask
+
+
+def legality_status(legal_mask: Optional[int], restricted_mask: Optional[int], format: str) -> Optional[str]:
+    """
+    Retorna "legal", "restricted", "not_legal" ou None se desconhecido.
+    """
+    bit = FORMAT_BITS.get(format)
+    if bit is None or legal_mask is None:
+        return None
+    
+    if not legal_mask & bit:
+        return "not_legal"
+    if restricted_mask and restricted_mask & bit:
+        return "restricted"
+    return "legal"
@@ -0,0 +1,78 @@
+"""
+Leitura de custos de mana e das cores de mana que uma carta produz
+"""
+import re
+from typing import Dict, Any, Optional, Set, Tuple
+
+COLORS = ("W", "U", "B", "R", "G")
+MANA_SYMBOLS = COLORS + ("C",)
+
+BASIC_LAND_TYPES = {
+    "Plains": "W",
+    "Island": "U",
+    "Swamp": "B",
+    "Mountain": "R",
+    "Forest": "G",
+}
+
+_SYMBOL_PATTERN = re.compile(r"\{([^}]+)\}")
+_ADD_PATTERN = re.compile(r"Add ([^.]*)")
+
+
+def is_land(card: Optional[Dict[str, Any]]) -> bool:
+    type_line = (card or {}).get("type_line") or ""
+    return "Land" in type_line.split(" // ")[0]
+
+
+def parse_mana_cost(mana_cost: Optional[str]) -> Tuple[int, Dict[str, int]]:
+    """
+    Separa um custo de mana em mana genérica e símbolos coloridos.
+
+    Símbolos híbridos e phyrexianos contam como genéricos (podem ser pagos de
+    mais de uma forma) e X conta como zero. Em cartas de duas faces considera
+    apenas a face da frente.
+
+    Exemplo:
+        >>> parse_mana_cost("{2}{R}{R}")
+        (2, {"R": 2})
+    """
+    generic = 0
+    colored: Dict[str, int] = {}
+
+    front = (mana_cost or "").split(" // ")[0]
+    for symbol in _SYMBOL_PATTERN.findall(front):
+        if symbol.isdigit():
+            generic += int(symbol)
+        elif symbol in MANA_SYMBOLS:
+            colored[symbol] = colored.get(symbol, 0) + 1
+        elif symbol not in ("X", "Y", "Z"):
+            generic += 1
+
+    return generic, colored
+
+
+def produced_colors(card: Optional[Dict[str, Any]]) -> Set[str]:
+    """
+    Cores de mana que a carta produz. Usa `produced_mana` da Scryfall quando
+    disponível; para cartas importadas antes desse campo, deduz as cores dos
+    terrenos pelos tipos básicos e pelo texto "Add {X}".
+    """
+    if not card:
+        return set()
+
+    produced = card.get("produced_mana")
+    if produced is not None:
+        return {symbol for symbol in produced if symbol in MANA_SYMBOLS}
+
+    if not is_land(card):
+        return set()
+
+    type_line = card.get("type_line") or ""
+    colors = {color for land_type, color in BASIC_LAND_TYPES.items() if land_type in type_line}
+
+    for clause in _ADD_PATTERN.findall(card.get("oracle_text") or ""):
+        if "any color" in clause:
+            colors.update(COLORS)
+        colors.update(symbol for symbol in _SYMBOL_PATTERN.findall(clause) if symbol in MANA_SYMBOLS)
+
+    return colors
@@ -0,0 +1,66 @@
+"""
+Assinaturas MinHash e bandas LSH para detectar decks quase idênticos
+
+A fração de posições iguais entre duas assinaturas estima a similaridade de
+Jaccard entre os conjuntos de cartas. Dividindo a assinatura em LSH_BANDS
+bandas de LSH_ROWS linhas, dois decks com Jaccard s compartilham ao menos uma
+banda com probabilidade 1 - (1 - s^LSH_ROWS)^LSH_BANDS (~0.5 em s = 0.5 e
+> 0.999 em s = 0.8), então basta comparar decks que têm alguma banda em comum.
+
+Alterar os parâmetros invalida as assinaturas gravadas (rode rebuild-signatures).
+"""
+import hashlib
+import random
+from typing import Iterable, List, Optional
+
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+
+# Primo de Mersenne 2^61 - 1: os valores cabem em um int64 do MongoDB
+_PRIME = (1 << 61) - 1
+
+_random = random.Random(0x4D544744)
+_PERMUTATIONS = [
+    (_random.randrange(1, _PRIME), _random.randrange(0, _PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+
+def _base_hash(value: str) -> int:
+    # hash() do Python muda a cada processo; blake2b é estável entre execuções
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big") % _PRIME
+
+
+def minhash_signature(values: Iterable[str]) -> Optional[List[int]]:
+    """
+    Assinatura MinHash de um conjunto de valores (None para conjunto vazio).
+    """
+    hashes = [_base_hash(value) for value in set(values)]
+    if not hashes:
+        return None
+
+    return [
+        min((a * value + b) % _PRIME for value in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def lsh_bands(signature: Optional[List[int]]) -> List[str]:
+    if not signature:
+        return []
+
+    bands = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        digest = hashlib.blake2b(repr(rows).encode(), digest_size=8).hexdigest()
+        bands.append(f"{band}:{digest}")
+    return bands
+
+
+def estimate_similarity(signature_a: Optional[List[int]], signature_b: Optional[List[int]]) -> float:
+    if not signature_a or not signature_b or len(signature_a) != len(signature_b):
+        return 0.0
+
+    matches = sum(1 for a, b in zip(signature_a, signature_b) if a == b)
+    return matches / len(signature_a)
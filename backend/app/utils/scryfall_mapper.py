@@ -3,6 +3,8 @@ Utilitário para mapear dados da API Scryfall para o formato do banco de dados
 """
 from typing import Dict, Any
 
+from app.utils.legality import encode_legalities
+
 
 def map_scryfall_to_card(scryfall_data: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -29,6 +31,8 @@ def map_scryfall_to_card(scryfall_data: Dict[str, Any]) -> Dict[str, Any]:
         >>> mapped["scryfall_id"]  # "abc123"
         >>> mapped["set_code"]     # "lea"
     """
+    legal_mask, restricted_mask = encode_legalities(scryfall_data.get("legalities"))
+    
     # Mapear campos principais
     mapped = {
         # IDs
@@ -49,15 +53,22 @@ def map_scryfall_to_card(scryfall_data: Dict[str, Any]) -> Dict[str, Any]:
         # Cores (já vem como array da API: ["W", "U", "B", "R", "G"])
         "colors": scryfall_data.get("colors", []),
         "color_identity": scryfall_data.get("color_identity", []),
+        "produced_mana": scryfall_data.get("produced_mana"),
         
         # Raridade e set
         "rarity": scryfall_data.get("rarity"),
         "set_name": scryfall_data.get("set_name"),
         "set_code": scryfall_data.get("set"),  # set → set_code
+        "collector_number": scryfall_data.get("collector_number"),
+        "mtgo_id": scryfall_data.get("mtgo_id"),
         
         # Imagens e preços (objetos completos)
         "image_uris": scryfall_data.get("image_uris"),
         "prices": scryfall_data.get("prices"),
+        
+        # Legalidades por formato em bitmaps (ver app.utils.legality)
+        "legal_mask": legal_mask,
+        "restricted_mask": restricted_mask,
     }
     
     # Validar que scryfall_id está presente (obrigatório)
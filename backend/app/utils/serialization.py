@@ -0,0 +1,70 @@
+"""
+Serialização rápida de documentos do MongoDB em JSON (orjson)
+
+O caminho padrão das listagens converte os ObjectIds, valida cada item contra
+o response_model e codifica com o json da biblioteca padrão. Como os
+documentos foram escritos pela própria API, o caminho rápido apenas recorta
+cada documento nos campos do schema (com os mesmos nomes e valores padrão) e
+codifica ObjectId e datetime direto com o orjson.
+"""
+from typing import Dict, Any, List, Tuple, Type
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+_fields_cache: Dict[Type[BaseModel], List[Tuple[str, Any]]] = {}
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Codifica em JSON aceitando ObjectId. Datetimes sem fuso saem no mesmo
+    formato do pydantic (ex: '2024-01-01T00:00:00.123000').
+    """
+    return orjson.dumps(
+        content,
+        default=_default,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    )
+
+
+def _model_fields(model: Type[BaseModel]) -> List[Tuple[str, Any]]:
+    fields = _fields_cache.get(model)
+    if fields is None:
+        fields = [
+            (field.alias or name, field.get_default(call_default_factory=True))
+            for name, field in model.model_fields.items()
+        ]
+        _fields_cache[model] = fields
+    return fields
+
+
+def shape_documents(documents: List[Dict[str, Any]], model: Type[BaseModel]) -> List[Dict[str, Any]]:
+    """
+    Recorta os documentos nos campos de `model` (pelo alias, como o
+    response_model faz), preenchendo os ausentes com o valor padrão.
+    Campos internos (ex: legal_mask, minhash) ficam de fora da resposta.
+    """
+    fields = _model_fields(model)
+    return [
+        {key: document.get(key, default) for key, default in fields}
+        for document in documents
+    ]
+
+
+class MongoJSONResponse(ORJSONResponse):
+    """
+    Resposta JSON codificada com orjson que aceita documentos do MongoDB.
+    Retornada direto pela rota, não passa pela validação do response_model.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
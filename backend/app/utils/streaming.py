@@ -0,0 +1,43 @@
+"""
+Utilitários para respostas e entradas em streaming (NDJSON)
+"""
+from typing import AsyncIterator, Tuple
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+
+class BodyConsumingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse para geradores que consomem o corpo da requisição.
+    
+    A StreamingResponse padrão escuta `http.disconnect` em paralelo lendo o
+    `receive` do ASGI, o que rouba as mensagens do corpo ainda não lidas.
+    Aqui o próprio gerador lê o corpo (e recebe a desconexão por ele).
+    """
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        
+        if self.background is not None:
+            await self.background()
+
+
+async def iter_ndjson_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """
+    Divide um fluxo de bytes em linhas NDJSON, ignorando linhas vazias.
+    
+    Retorna tuplas (número da linha, conteúdo) sem carregar o corpo inteiro em memória.
+    """
+    buffer = b""
+    line_number = 0
+    
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, line
+    
+    if buffer.strip():
+        yield line_number + 1, buffer
@@ -0,0 +1,67 @@
+"""
+Configuração do gunicorn para produção (CMD do Dockerfile)
+
+Workers uvicorn (asyncio), um por núcleo disponível ao container por padrão
+(sempre um com STORAGE_BACKEND=memory: cada processo teria o próprio banco).
+A aplicação é importada uma vez no processo master (preload) e os workers
+herdam os módulos pelo fork; no startup cada worker só confere a versão do
+esquema do banco (as migrações rodam antes, em `python -m app.cli migrate`).
+
+As métricas ficam na memória de cada worker: METRICS_MULTIPROC_DIR (definido
+aqui antes da aplicação ser importada) faz /metrics somar os valores de todos
+os workers, seja qual for o worker que atende o scrape (ver app.core.metrics).
+"""
+import os
+import sys
+import time
+
+# Lido por app.core.config no preload, depois deste arquivo
+os.environ.setdefault("METRICS_MULTIPROC_DIR", "/tmp/mtg_api_metrics")
+
+wsgi_app = "app.main:app"
+bind = f"0.0.0.0:{os.getenv('API_PORT', '8000')}"
+
+workers = int(os.getenv("WEB_CONCURRENCY", "0")) or len(os.sched_getaffinity(0))
+if os.getenv("STORAGE_BACKEND", "mongo").lower() == "memory" and workers != 1:
+    # Cada processo teria o próprio banco em memória: um worker só, não importa WEB_CONCURRENCY
+    print(f"STORAGE_BACKEND=memory: usando 1 worker em vez de {workers}", file=sys.stderr)
+    workers = 1
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+
+# No SIGTERM os workers param de aceitar conexões e têm este prazo para
+# terminar as requisições em andamento
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = 120
+keepalive = 5
+
+# Recicla os workers periodicamente, com jitter para não reiniciarem juntos
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+if os.getenv("STORAGE_BACKEND", "mongo").lower() == "memory":
+    # Reciclar o único worker apagaria o banco em memória
+    max_requests = 0
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
+
+
+def post_fork(server, worker):
+    # Com preload o módulo já foi importado no master: o cold start do worker conta a partir do fork
+    import app.main
+
+    app.main.boot_started = time.perf_counter()
+
+
+def on_starting(server):
+    from app.core import metrics
+
+    if metrics.METRICS_MULTIPROC_DIR:
+        metrics.reset_multiprocess_dir()
+
+
+def child_exit(server, worker):
+    # Contadores do worker que saiu (reciclado ou morto) continuam somados em /metrics
+    from app.core import metrics
+
+    if metrics.METRICS_MULTIPROC_DIR:
+        metrics.archive_process(worker.pid)
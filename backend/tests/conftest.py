@@ -0,0 +1,40 @@
+"""
+Configuração da suíte de testes
+
+Por padrão os testes rodam no backend em memória (STORAGE_BACKEND=memory),
+sem MongoDB. Com `-m mongo` o padrão passa a ser o MongoDB configurado
+(MONGO_USER, MONGO_PASS, MONGO_HOST), sempre no banco MONGO_TEST_DB.
+"""
+import asyncio
+import os
+
+import pytest
+
+
+def pytest_configure(config):
+    # Antes de importar a aplicação: app.core.config lê o ambiente na importação
+    markexpr = config.getoption("markexpr") or ""
+    wants_mongo = "mongo" in markexpr and "not mongo" not in markexpr
+    os.environ.setdefault("STORAGE_BACKEND", "mongo" if wants_mongo else "memory")
+    os.environ["MONGO_DB"] = os.getenv("MONGO_TEST_DB", "mtg_database_test")
+    os.environ.setdefault("MONGO_SERVER_SELECTION_TIMEOUT_MS", "2000")
+    os.environ.setdefault("SCHEDULER_ENABLED", "false")
+
+
+@pytest.fixture
+def run():
+    """Banco em memória vazio e migrado; devolve o executor das corrotinas do teste."""
+    from app.core.config import STORAGE_BACKEND
+    if STORAGE_BACKEND != "memory":
+        pytest.skip("Teste do backend em memória (rode sem -m mongo)")
+
+    from app.core.db import db
+    from app.core.migrations import run_migrations
+
+    async def reset():
+        for name in await db.list_collection_names():
+            await db.drop_collection(name)
+        await run_migrations()
+
+    asyncio.run(reset())
+    return asyncio.run
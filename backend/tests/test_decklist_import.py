@@ -0,0 +1,39 @@
+"""
+Importação de listas em texto (app.services.decklist_import) no backend em memória
+"""
+import pytest
+
+from app.crud import card as crud_card
+from app.services import decklist_import
+from app.utils import map_scryfall_to_card
+from app.utils.decklist_parser import parse_decklist
+
+
+def _card(scryfall_id, name):
+    return map_scryfall_to_card({
+        "id": scryfall_id,
+        "oracle_id": f"oracle-{scryfall_id}",
+        "name": name,
+        "type_line": "Basic Land",
+        "set": "lea",
+        "set_name": "Alpha",
+        "legalities": {"modern": "legal"},
+    })
+
+
+def test_parser_ignores_zero_quantity_lines():
+    entries = parse_decklist("4 Lightning Bolt\n0 Forest\n0x Island\nMountain\n\nSB: 0 Duress")
+    assert [(entry["name"], entry["quantity"]) for entry in entries] == [("Lightning Bolt", 4), ("Mountain", 1)]
+
+
+def test_import_never_stores_zero_quantities(run):
+    async def scenario():
+        await crud_card.upsert_cards_bulk([_card("sid-forest", "Forest"), _card("sid-mountain", "Mountain")])
+
+        result = await decklist_import.import_decklist("Lands", "modern", "0 Forest\n20 Mountain\n0 Mountain")
+        assert result["deck"]["cards"] == [{"scryfall_id": "sid-mountain", "quantity": 20}]
+
+        with pytest.raises(decklist_import.DecklistImportError):
+            await decklist_import.import_decklist("Empty", "modern", "0 Forest")
+
+    run(scenario())
@@ -0,0 +1,59 @@
+"""
+Planos de consulta das consultas canônicas (app.services.index_report)
+
+Precisa de um MongoDB de verdade (o backend em memória não tem explain):
+
+    MONGO_USER=... MONGO_PASS=... MONGO_HOST=localhost pytest -m mongo
+
+Roda as migrações em um banco separado (MONGO_TEST_DB, padrão
+mtg_database_test; ver tests/conftest.py), que é apagado no final.
+"""
+import asyncio
+import os
+
+import pytest
+
+pytestmark = pytest.mark.mongo
+
+
+def _problems(report):
+    lines = [
+        f"{query['name']} ({query['source']}): {', '.join(query['problems'])}"
+        for query in report["queries"] if query["problems"]
+    ]
+    for collection in report["collections"]:
+        if collection["missing"]:
+            lines.append(f"{collection['collection']}: índices ausentes {collection['missing']}")
+        if collection["unused"]:
+            lines.append(f"{collection['collection']}: índices não usados {collection['unused']}")
+    return "\n".join(lines)
+
+
+async def _migrated_report():
+    from pymongo.errors import PyMongoError
+
+    from app.core.db import client, db
+    from app.core.migrations import run_migrations
+    from app.services.index_report import build_index_report
+
+    try:
+        await db.command("ping")
+    except PyMongoError as e:
+        pytest.skip(f"MongoDB indisponível: {e}")
+
+    try:
+        await run_migrations()
+        return await build_index_report()
+    finally:
+        await client.drop_database(db.name)
+
+
+def test_canonical_queries_use_indexes():
+    if os.environ["STORAGE_BACKEND"] != "mongo":
+        pytest.skip("Precisa do MongoDB (rode com -m mongo)")
+    if not os.getenv("MONGO_USER") or not os.getenv("MONGO_PASS"):
+        pytest.skip("MONGO_USER e MONGO_PASS não definidos")
+
+    report = asyncio.run(_migrated_report())
+
+    assert report["ok"], _problems(report)
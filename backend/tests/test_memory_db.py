@@ -0,0 +1,243 @@
+"""
+Backend em memória (app.core.memory_db) exercitado pelas funções de app/crud
+
+Cada teste parte de um banco vazio e migrado (fixture `run` em conftest.py),
+então os índices hash e únicos são os mesmos criados pelas migrações.
+Operadores que app/crud ainda não usa ($elemMatch, find_one_and_update com
+sort) são testados direto na coleção.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pymongo import InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.core import scheduler
+from app.core.db import db
+from app.crud import card as crud_card
+from app.crud import card_prices as crud_card_prices
+from app.crud import deck as crud_deck
+from app.utils import map_scryfall_to_card
+
+BRT = timezone(timedelta(hours=-3))
+
+
+def _card(index, **fields):
+    data = {
+        "id": f"sid-{index:02d}",
+        "oracle_id": f"oid-{index:02d}",
+        "name": f"Card {index}",
+        "mana_cost": "{1}{R}",
+        "cmc": 2.0,
+        "type_line": "Instant",
+        "colors": ["R"],
+        "color_identity": ["R"],
+        "rarity": "common",
+        "set": "lea",
+        "set_name": "Alpha",
+        "prices": {"usd": "1.00"},
+        "legalities": {"modern": "legal"},
+    }
+    data.update(fields)
+    return map_scryfall_to_card(data)
+
+
+def _deck_cards(*entries):
+    return [{"scryfall_id": scryfall_id, "quantity": quantity} for scryfall_id, quantity in entries]
+
+
+def test_card_search_in_all_regex(run):
+    async def scenario():
+        await crud_card.upsert_cards_bulk([
+            _card(1, name="Lightning Bolt"),
+            _card(2, name="Bolt Bend", colors=["G", "R"], rarity="uncommon"),
+            _card(3, name="Llanowar Elves", type_line="Creature — Elf Druid", colors=["G"]),
+            _card(4, name="Kird Ape", type_line="Creature — Ape", colors=["R", "G"]),
+        ])
+
+        by_name = await crud_card.search_cards(name="BOLT")
+        assert sorted(card["name"] for card in by_name) == ["Bolt Bend", "Lightning Bolt"]
+
+        by_colors = await crud_card.search_cards(colors=["R", "G"])
+        assert sorted(card["name"] for card in by_colors) == ["Bolt Bend", "Kird Ape"]
+        assert await crud_card.count_cards(colors=["G"], type_line="creature") == 2
+        assert await crud_card.count_cards(colors=["G", "R"], rarity="Uncommon") == 1
+
+        found = await crud_card.get_cards_by_scryfall_ids(["sid-01", "sid-03", "sid-99"])
+        assert sorted(found) == ["sid-01", "sid-03"]
+
+    run(scenario())
+
+
+def test_elem_match(run):
+    async def scenario():
+        await crud_deck.create_deck("Burn", "modern", _deck_cards(("sid-01", 4), ("sid-02", 1)))
+        await crud_deck.create_deck("Elves", "modern", _deck_cards(("sid-01", 1), ("sid-03", 4)))
+
+        playsets = await db.decks.find(
+            {"cards": {"$elemMatch": {"scryfall_id": "sid-01", "quantity": {"$gte": 4}}}}
+        ).to_list(length=None)
+        assert [deck["name"] for deck in playsets] == ["Burn"]
+
+        # Sem $elemMatch as condições podem casar com elementos diferentes
+        loose = await db.decks.count_documents({"cards.scryfall_id": "sid-01", "cards.quantity": {"$gte": 4}})
+        assert loose == 2
+
+    run(scenario())
+
+
+def test_multikey_hash_index_lookups(run):
+    async def scenario():
+        cards = _deck_cards(*((f"sid-{index:02d}", 4) for index in range(15)))
+        original = await crud_deck.create_deck("Original", "modern", cards)
+        copy = await crud_deck.create_deck("Copy", "modern", cards)
+        await crud_deck.create_deck("Other", "legacy", _deck_cards(("sid-50", 4), ("sid-01", 1)))
+
+        signature = await crud_deck.get_deck_signature(str(original["_id"]))
+        bands = signature[crud_deck.LSH_BANDS_FIELD]
+        candidates = await crud_deck.get_similar_deck_candidates(bands, original["_id"])
+        assert [candidate["_id"] for candidate in candidates] == [copy["_id"]]
+
+        # O índice multikey tem uma entrada por banda: a consulta lê só os decks do bucket
+        index = next(index for index in db.decks._indexes.values() if index.fields == [crud_deck.LSH_BANDS_FIELD])
+        assert index.lookup({crud_deck.LSH_BANDS_FIELD: {"$in": bands}}) == {original["_id"], copy["_id"]}
+
+        containing = await crud_deck.get_decks_containing_cards(["sid-01"])
+        assert sorted(deck["name"] for deck in containing) == ["Copy", "Original", "Other"]
+        assert sorted(await crud_deck.get_card_usage(["sid-50"])) == ["legacy"]
+
+        deck = await crud_deck.get_deck_by_name("Copy")
+        assert deck["_id"] == copy["_id"]
+
+    run(scenario())
+
+
+def test_unique_violations_in_bulk_writes(run):
+    async def scenario():
+        await crud_deck.create_deck("Burn", "modern", [])
+
+        inserted, failed = await crud_deck.insert_decks_bulk([
+            {"name": "Burn", "format": "modern", "cards": []},
+            {"name": "Elves", "format": "legacy", "cards": []},
+            {"name": "Elves", "format": "modern", "cards": []},
+        ])
+        assert [deck["name"] for deck in inserted] == ["Elves"]
+        assert [failure["name"] for failure in failed] == ["Burn", "Elves"]
+        assert all(failure["error"].startswith("Já existe um deck") for failure in failed)
+        assert await crud_deck.count_decks() == 2
+
+        await crud_card.upsert_cards_bulk([_card(1)])
+        with pytest.raises(BulkWriteError) as unordered:
+            await db.cards.bulk_write([
+                InsertOne(_card(1)),
+                InsertOne(_card(2)),
+                UpdateOne({"scryfall_id": "sid-03"}, {"$set": _card(3)}, upsert=True),
+            ], ordered=False)
+        details = unordered.value.details
+        assert [(error["index"], error["code"]) for error in details["writeErrors"]] == [(0, 11000)]
+        assert (details["nInserted"], details["nUpserted"]) == (1, 1)
+
+        with pytest.raises(BulkWriteError) as ordered:
+            await db.cards.bulk_write([InsertOne(_card(4)), InsertOne(_card(1)), InsertOne(_card(5))])
+        assert ordered.value.details["nInserted"] == 1
+        assert await crud_card.get_existing_scryfall_ids(["sid-04", "sid-05"]) == {"sid-04"}
+
+    run(scenario())
+
+
+def test_find_one_and_update_with_sort_and_upsert(run, monkeypatch):
+    async def scenario():
+        # Upsert: devolve o documento anterior (nenhum) e depois atualiza o mesmo
+        await crud_card.create_or_update_card(_card(1, prices={"usd": "1.00"}))
+        updated = await crud_card.create_or_update_card(_card(1, prices={"usd": "2.50"}))
+        assert updated["prices"]["usd"] == "2.50"
+        assert await db.cards.count_documents({"scryfall_id": "sid-01"}) == 1
+
+        # Liderança: upsert com $or e $lt em datas; outro dono com a lease válida viola o _id
+        monkeypatch.setattr(scheduler, "_owner", "worker-a")
+        assert await scheduler.acquire_leadership()
+        monkeypatch.setattr(scheduler, "_owner", "worker-b")
+        assert not await scheduler.acquire_leadership()
+        await db.scheduler_leader.update_one({}, {"$set": {"expires_at": datetime.utcnow() - timedelta(seconds=1)}})
+        assert await scheduler.acquire_leadership()
+        assert (await db.scheduler_leader.find_one({}))["owner"] == "worker-b"
+
+        deck = await crud_deck.create_deck("Burn", "modern", [])
+        for name in ("Burn v2", "Burn v3"):
+            await crud_deck.update_deck(str(deck["_id"]), name=name)
+        latest = await db.deck_history.find_one_and_update(
+            {"deck_id": deck["_id"]},
+            {"$set": {"reviewed": True}},
+            sort=[("version", -1)],
+            return_document=ReturnDocument.AFTER
+        )
+        assert (latest["version"], latest["reviewed"]) == (3, True)
+        assert await db.deck_history.count_documents({"reviewed": True}) == 1
+
+        created = await db.deck_history.find_one_and_update(
+            {"deck_id": "missing", "version": 1},
+            {"$set": {"at": datetime(2026, 1, 1)}, "$setOnInsert": {"cards": []}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        assert (created["deck_id"], created["version"], created["cards"]) == ("missing", 1, [])
+
+    run(scenario())
+
+
+def test_unwind_group_sort(run):
+    async def scenario():
+        await crud_deck.create_deck("Burn", "modern", _deck_cards(("sid-01", 4), ("sid-02", 2)))
+        # Mesma carta em duas entradas do deck: conta um deck, somando as cópias
+        await crud_deck.create_deck("Zoo", "modern", _deck_cards(("sid-01", 2), ("sid-03", 4), ("sid-01", 1)))
+        await crud_deck.create_deck("Elves", "legacy", _deck_cards(("sid-03", 4)))
+
+        ranking = await crud_deck.get_card_usage_ranking()
+        assert ranking == [
+            {"scryfall_id": "sid-01", "decks": 2, "copies": 7},
+            {"scryfall_id": "sid-03", "decks": 2, "copies": 8},
+            {"scryfall_id": "sid-02", "decks": 1, "copies": 2},
+        ]
+
+        page = await crud_deck.get_card_usage_ranking(limit=1, after=(2, "sid-01"))
+        assert [entry["scryfall_id"] for entry in page] == ["sid-03"]
+        assert [entry["scryfall_id"] for entry in await crud_deck.get_card_usage_ranking(format="legacy")] == ["sid-03"]
+
+        usage = await crud_deck.get_card_usage(["sid-01", "sid-03"])
+        assert usage == {"modern": {"decks": 2, "copies": 11}, "legacy": {"decks": 1, "copies": 4}}
+
+    run(scenario())
+
+
+def test_datetime_range_filters(run):
+    async def scenario():
+        deck = await crud_deck.create_deck("Burn", "modern", _deck_cards(("sid-01", 4)))
+        await crud_deck.update_deck(str(deck["_id"]), name="Burn v2", cards=_deck_cards(("sid-01", 2)))
+        await db.deck_history.update_one({"deck_id": deck["_id"], "version": 1}, {"$set": {"at": datetime(2026, 1, 1, 10)}})
+        await db.deck_history.update_one({"deck_id": deck["_id"], "version": 2}, {"$set": {"at": datetime(2026, 1, 1, 12)}})
+
+        async def name_at(at):
+            state = await crud_deck.get_deck_with_cards(str(deck["_id"]), at=at)
+            return state and state["name"]
+
+        assert await name_at(datetime(2026, 1, 1, 9)) is None
+        assert await name_at(datetime(2026, 1, 1, 11)) == "Burn"
+        assert await name_at(datetime(2026, 1, 1, 12)) == "Burn v2"
+        # Datas com fuso comparadas em UTC, como no MongoDB: 08:00-03:00 = 11:00 UTC
+        assert await name_at(datetime(2026, 1, 1, 8, tzinfo=BRT)) == "Burn"
+        assert await name_at(datetime(2026, 1, 1, 9, 30, tzinfo=BRT)) == "Burn v2"
+        assert await name_at(datetime(2026, 1, 1, 12, tzinfo=timezone.utc)) == "Burn v2"
+
+        for at, usd in ((datetime(2026, 1, 10), "1.00"), (datetime(2026, 2, 10), "1.50"), (datetime(2026, 3, 10), "2.00")):
+            await crud_card_prices.record_prices([{"scryfall_id": "sid-01", "prices": {"usd": usd}}], at=at)
+
+        history = await crud_card_prices.get_price_history("sid-01", since=datetime(2026, 2, 1), until=datetime(2026, 3, 31))
+        assert [(point["at"], point["usd"]) for point in history] == [
+            (datetime(2026, 2, 10), 1.5),
+            (datetime(2026, 3, 10), 2.0),
+        ]
+
+        recent = await db.decks.count_documents({"created_at": {"$gte": datetime.now(timezone.utc) - timedelta(hours=1)}})
+        assert recent == 1
+
+    run(scenario())
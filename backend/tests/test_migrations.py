@@ -0,0 +1,22 @@
+"""
+Migrações versionadas (app.core.migrations) no backend em memória
+"""
+from app.core.db import db
+from app.core.indexes import INDEXES, list_indexes
+from app.core.migrations import SCHEMA_VERSION, get_schema_version
+
+
+def test_migrations_reach_the_index_spec(run):
+    # Cada migração congela os próprios índices: juntas, devem chegar exatamente a INDEXES
+    async def scenario():
+        assert await get_schema_version() == SCHEMA_VERSION
+
+        existing = await list_indexes()
+        for collection, specs in INDEXES.items():
+            assert set(existing[collection]) - {"_id_"} == {spec.name for spec in specs}, collection
+            for spec in specs:
+                assert existing[collection][spec.name] == spec.keys
+
+        assert "expires_at_1" in await db.query_cache.index_information()
+
+    run(scenario())